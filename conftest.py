@@ -0,0 +1,95 @@
+"""
+Configuración de las pruebas (pytest)
+Cada prueba trabaja sobre una carpeta de datos temporal: utils.rutas.obtener_ruta_data
+apunta a ella y los repositorios del catálogo se descartan antes y después, así nunca
+se leen ni se modifican los archivos de data/
+"""
+import json
+
+import pytest
+
+from utils import catalogo, persistencia, rutas
+import utils.productos  # noqa: F401 (crea el repositorio de productos)
+import utils.ingredientes  # noqa: F401 (crea el repositorio de ingredientes)
+
+
+# Catálogo chico con precios conocidos para las pruebas
+INGREDIENTES_PRUEBA = {
+    "ingredientes": [
+        {"id": 1, "nombre": "Medallón", "categorias": ["Hamburguesas"], "precio_extra": 1000.0, "precio_resta": 500.0},
+        {"id": 2, "nombre": "Tomáte", "categorias": ["Hamburguesas", "Lomitos"], "precio_extra": 500.0, "precio_resta": 500.0},
+        {"id": 3, "nombre": "Queso", "categorias": ["Hamburguesas", "Lomitos"], "precio_extra": 300.0, "precio_resta": 300.0},
+        {"id": 4, "nombre": "Panceta", "categorias": ["Hamburguesas"], "precio_extra": 700.0, "precio_resta": 0.0}
+    ]
+}
+
+PRODUCTOS_PRUEBA = {
+    "categorias": [
+        {
+            "nombre": "Hamburguesas",
+            "productos": [
+                {
+                    "id": 1, "nombre": "Hamburguesa Completa", "precio": 8800.0, "descripcion": "",
+                    "ingredientes": [
+                        {"nombre": "Medallón", "cantidad_base": 1},
+                        {"nombre": "Tomáte", "cantidad_base": 1}
+                    ]
+                },
+                {
+                    "id": 2, "nombre": "Hamburguesa Doble", "precio": 9900.0, "descripcion": "",
+                    "ingredientes": [
+                        {"nombre": "Medallón", "cantidad_base": 2},
+                        {"nombre": "Queso", "cantidad_base": 1}
+                    ]
+                }
+            ]
+        },
+        {
+            "nombre": "Lomitos",
+            "productos": [
+                {
+                    "id": 3, "nombre": "Lomito", "precio": 12000.0, "descripcion": "",
+                    "ingredientes": [
+                        {"nombre": "Queso", "cantidad_base": 1},
+                        {"nombre": "Fantasma", "cantidad_base": 1}
+                    ]
+                }
+            ]
+        }
+    ]
+}
+
+
+def _descartar_catalogos():
+    """Descarta la copia en memoria de todos los repositorios del catálogo"""
+    for repositorio in catalogo._repositorios:
+        repositorio.invalidar()
+
+
+@pytest.fixture
+def carpeta_datos(tmp_path, monkeypatch):
+    """Carpeta de datos temporal y vacía"""
+    carpeta = tmp_path / "data"
+    carpeta.mkdir()
+    monkeypatch.setattr(rutas, "obtener_ruta_data", lambda: str(carpeta))
+    # Verificar el disco en cada lectura: las pruebas cambian los archivos
+    monkeypatch.setattr(catalogo, "INTERVALO_VERIFICACION", 0)
+    _descartar_catalogos()
+    yield carpeta
+    # Escribir lo pendiente mientras la ruta sigue apuntando a la carpeta temporal
+    persistencia.flush()
+    _descartar_catalogos()
+
+
+@pytest.fixture
+def catalogo_de_prueba(carpeta_datos):
+    """Carpeta de datos temporal con PRODUCTOS_PRUEBA e INGREDIENTES_PRUEBA"""
+    escribir_json(carpeta_datos / "productos.json", PRODUCTOS_PRUEBA)
+    escribir_json(carpeta_datos / "ingredientes.json", INGREDIENTES_PRUEBA)
+    return carpeta_datos
+
+
+def escribir_json(ruta, datos):
+    """Escribe un JSON como lo haría otra caja o una edición a mano"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
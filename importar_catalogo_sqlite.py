@@ -0,0 +1,25 @@
+"""
+Script para pasar el catálogo (productos.json e ingredientes.json) a SQLite
+Crea data/catalogo.db; a partir de ahí la aplicación guarda el catálogo en la base.
+Para volver a usar los JSON alcanza con borrar data/catalogo.db
+"""
+import sys
+
+from utils.catalogo_sqlite import importar_desde_json, obtener_ruta_base_datos
+
+
+def importar_catalogo():
+    """Importa el catálogo JSON a SQLite (con --reemplazar pisa una base existente)"""
+    reemplazar = "--reemplazar" in sys.argv[1:]
+    resultado = importar_desde_json(reemplazar=reemplazar)
+
+    if resultado is None:
+        print(f"La base {obtener_ruta_base_datos()} ya existe")
+        print("Use --reemplazar para volver a importar los JSON (se pierden los cambios hechos en la base)")
+        return
+
+    print(f"Importados {resultado['productos']} productos y {resultado['ingredientes']} ingredientes")
+    print(f"Base de datos: {obtener_ruta_base_datos()}")
+
+if __name__ == "__main__":
+    importar_catalogo()
@@ -1,31 +1,24 @@
 """
 Script para limpiar todos los ingredientes de los productos
 """
-import json
-import os
+from utils import catalogo
+from utils.productos import obtener_todos_los_productos, eliminar_ingrediente_producto
 
 def limpiar_ingredientes():
     """Elimina todos los ingredientes de todos los productos"""
-    ruta_productos = os.path.join('data', 'productos.json')
-    
-    # Cargar productos
-    with open(ruta_productos, 'r', encoding='utf-8') as f:
-        productos_data = json.load(f)
-    
     productos_limpiados = 0
     
-    # Recorrer todas las categorías y productos
-    for categoria in productos_data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if "ingredientes" in producto:
-                del producto["ingredientes"]
+    # Todos los cambios se guardan juntos (una sola escritura; si algo falla no se guarda nada)
+    with catalogo.transaccion():
+        # Recorrer todos los productos de todas las categorías
+        for producto in obtener_todos_los_productos():
+            ingredientes = producto.get("ingredientes", [])
+            if ingredientes:
+                for indice in reversed(range(len(ingredientes))):
+                    eliminar_ingrediente_producto(producto["id"], indice)
                 productos_limpiados += 1
                 print(f"  - Limpiado: {producto.get('nombre', 'Sin nombre')}")
     
-    # Guardar productos actualizados
-    with open(ruta_productos, 'w', encoding='utf-8') as f:
-        json.dump(productos_data, f, indent=2, ensure_ascii=False)
-    
     print(f"\nTotal: {productos_limpiados} productos limpiados")
     print("Todos los ingredientes han sido eliminados de los productos")
 
@@ -6,6 +6,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
 import os
+import threading
 import time
 
 # Agregar el directorio raíz al path para importar módulos
@@ -17,8 +18,14 @@ from ui.seleccion import Seleccion
 from ui.carrito import Carrito
 from ui.administracion import VentanaAdministracion
 from ui.splash import SplashScreen
-from utils.productos import cargar_productos, guardar_productos
-from utils.ingredientes import cargar_ingredientes, guardar_ingredientes
+from utils.productos import obtener_nombres_categorias
+from utils.ingredientes import cargar_ingredientes
+from utils import persistencia, catalogo, vigilante_datos
+from utils.esquema_catalogo import obtener_problemas, obtener_ruta_registro_problemas
+
+
+# Cada cuánto (en ms) el thread de la interfaz revisa si el catálogo cambió
+INTERVALO_REVISION_CAMBIOS_MS = 100
 
 
 class AplicacionCaja:
@@ -76,13 +83,11 @@ class AplicacionCaja:
     def guardar_todos_los_datos(self):
         """Fuerza el guardado de todos los datos (productos e ingredientes)"""
         try:
-            # Recargar y guardar productos (fuerza sincronización)
-            productos_data = cargar_productos()
-            guardar_productos(productos_data)
-            
-            # Recargar y guardar ingredientes (fuerza sincronización)
-            ingredientes_data = cargar_ingredientes()
-            guardar_ingredientes(ingredientes_data)
+            vigilante_datos.detener()
+            # Escribir en disco los cambios que el persistidor diferido tenga pendientes
+            persistencia.flush()
+            # Dejar los JSON al día con los cambios del diario
+            catalogo.compactar_diarios()
         except Exception as e:
             print(f"Error al guardar datos al cerrar: {e}")
             raise
@@ -114,6 +119,16 @@ class AplicacionCaja:
         
         # Conectar navegador con administración
         self.navegador.callback_administracion = self.abrir_administracion
+        
+        # Actualizar la selección y el carrito cuando cambia el catálogo: los eventos
+        # llegan desde cualquier thread y solo marcan el cambio; el thread de la
+        # interfaz lo revisa periódicamente (Tk no se puede usar desde otros threads)
+        self._cambio_catalogo = threading.Event()
+        catalogo.suscribir_cambios(self.on_cambio_catalogo)
+        self.root.after(INTERVALO_REVISION_CAMBIOS_MS, self.revisar_cambios_catalogo)
+        
+        # Releer el catálogo si otra caja lo modifica en la carpeta de datos compartida
+        vigilante_datos.iniciar()
     
     def abrir_administracion(self):
         """Abre la ventana de administración"""
@@ -122,9 +137,30 @@ class AplicacionCaja:
             callback_actualizar=self.actualizar_productos
         )
     
+    def on_cambio_catalogo(self, eventos):
+        """
+        Recibe los eventos del catálogo (desde cualquier thread, incluidos el vigilante
+        de datos y el persistidor): solo marca el cambio, sin tocar la interfaz
+        """
+        self._cambio_catalogo.set()
+    
+    def revisar_cambios_catalogo(self):
+        """
+        Loop en el thread de la interfaz: si el catálogo cambió desde la última revisión,
+        hace una sola sincronización para todos los cambios cercanos
+        """
+        if self._cambio_catalogo.is_set():
+            self._cambio_catalogo.clear()
+            self.actualizar_productos()
+        self.root.after(INTERVALO_REVISION_CAMBIOS_MS, self.revisar_cambios_catalogo)
+    
     def actualizar_productos(self):
-        """Actualiza los productos en la selección cuando se modifican en administración"""
-        self.seleccion.recargar_productos()
+        """
+        Actualiza la selección y el carrito con los cambios del catálogo
+        (solo lo que cambió; si el catálogo no cambió no hace nada)
+        """
+        self.seleccion.sincronizar_catalogo()
+        self.carrito.sincronizar_catalogo()
     
     def configurar_layout(self):
         """Configura el layout usando grid"""
@@ -154,6 +190,25 @@ class AplicacionCaja:
         self.root.rowconfigure(1, weight=1)
 
 
+def mostrar_problemas_catalogo(root, maximo=5):
+    """Avisa al iniciar si los catálogos tienen filas inválidas (el detalle queda en el registro)"""
+    problemas = obtener_problemas("productos") + obtener_problemas("ingredientes")
+    if not problemas:
+        return
+    detalle = "\n".join(
+        f"- {problema[:150]}{'...' if len(problema) > 150 else ''}" for problema in problemas[:maximo]
+    )
+    if len(problemas) > maximo:
+        detalle += f"\n- ... y {len(problemas) - maximo} más"
+    messagebox.showwarning(
+        "Problemas en el catálogo",
+        f"Se encontraron {len(problemas)} filas inválidas en el catálogo. No se muestran en la caja, "
+        f"pero se conservan en el archivo (clave '_filas_invalidas') hasta que se corrijan.\n\n"
+        f"{detalle}\n\nDetalle completo en:\n{obtener_ruta_registro_problemas()}",
+        parent=root
+    )
+
+
 def main():
     """Función principal"""
     # Crear ventana principal pero ocultarla inmediatamente (debe existir para el splash)
@@ -181,7 +236,8 @@ def main():
         time.sleep(0.2)
         
         # Asegurar que las categorías fijas existan al iniciar
-        cargar_productos()
+        # (con el catálogo particionado solo se lee el manifiesto: cada categoría se lee al mostrarla)
+        obtener_nombres_categorias()
         
         splash.actualizar_progreso(35, "Cargando ingredientes...")
         splash.splash.update()
@@ -223,6 +279,7 @@ def main():
             root.deiconify()
             root.lift()
             root.focus_set()
+            mostrar_problemas_catalogo(root)
         
         splash.splash.after(200, cerrar_splash_y_mostrar)
     except Exception as e:
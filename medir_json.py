@@ -0,0 +1,92 @@
+"""
+Micro-benchmark del codec JSON de los catálogos (utils.codec_json)
+Compara el tiempo de serializar y parsear un catálogo de 100 y de 10.000 productos
+con la biblioteca estándar y con orjson (si está instalado), en modo legible y compacto,
+la carga del snapshot binario que se usa al arrancar (utils.snapshot_catalogo) y lo que
+cuesta guardar la modificación de un producto: registro del diario (utils.diario_catalogo)
+contra reescribir el JSON completo.
+Los catálogos se arman en memoria repitiendo los productos reales: no modifica los datos.
+"""
+import marshal
+import os
+import sys
+import timeit
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils import codec_json, diario_catalogo, snapshot_catalogo
+from utils.productos import cargar_productos
+
+
+def armar_catalogo(cantidad):
+    """Arma un catálogo con la estructura de productos.json y la cantidad de productos indicada"""
+    originales = cargar_productos()
+    modelos = [p for cat in originales.get("categorias", []) for p in cat.get("productos", [])]
+    if not modelos:
+        modelos = [{"nombre": "Producto", "precio": 1000.0, "descripcion": ""}]
+
+    categorias = [{"nombre": cat["nombre"], "productos": []} for cat in originales.get("categorias", [])]
+    if not categorias:
+        categorias = [{"nombre": "Hamburguesas", "productos": []}]
+
+    for indice in range(cantidad):
+        producto = dict(modelos[indice % len(modelos)])
+        producto["id"] = indice + 1
+        producto["nombre"] = f"{producto['nombre']} {indice + 1}"
+        categorias[indice % len(categorias)]["productos"].append(producto)
+    return {"categorias": categorias, "ultimo_id": cantidad}
+
+
+def medir(cantidad):
+    datos = armar_catalogo(cantidad)
+    repeticiones = max(1, 2000 // cantidad)
+
+    codecs = [("json", False)]
+    if codec_json.ORJSON_AVAILABLE:
+        codecs.append(("orjson", True))
+
+    print(f"\n{cantidad} productos")
+    print(f"{'codec':<8}{'modo':<10}{'tamaño':>10}{'serializar':>14}{'parsear':>12}")
+    for nombre, usar_orjson in codecs:
+        for modo in codec_json.MODOS:
+            contenido = codec_json.codificar(datos, modo, usar_orjson)
+            assert codec_json.decodificar(contenido, usar_orjson) == datos
+
+            tiempo_serializar = min(timeit.repeat(
+                lambda: codec_json.codificar(datos, modo, usar_orjson), number=repeticiones, repeat=5
+            )) / repeticiones
+            tiempo_parsear = min(timeit.repeat(
+                lambda: codec_json.decodificar(contenido, usar_orjson), number=repeticiones, repeat=5
+            )) / repeticiones
+
+            print(f"{nombre:<8}{modo:<10}{len(contenido) / 1024:>8.1f}KB"
+                  f"{tiempo_serializar * 1000:>12.2f}ms{tiempo_parsear * 1000:>10.2f}ms")
+
+    serializado = snapshot_catalogo.serializar_datos(datos)
+    tiempo_serializar = min(timeit.repeat(
+        lambda: snapshot_catalogo.serializar_datos(datos), number=repeticiones, repeat=5
+    )) / repeticiones
+    tiempo_cargar = min(timeit.repeat(
+        lambda: marshal.loads(serializado), number=repeticiones, repeat=5
+    )) / repeticiones
+    print(f"{'snapshot':<18}{len(serializado) / 1024:>8.1f}KB"
+          f"{tiempo_serializar * 1000:>12.2f}ms{tiempo_cargar * 1000:>10.2f}ms")
+
+    # Guardar la modificación de un producto (sin contar el fsync, que es igual en los dos casos)
+    modo = codec_json.obtener_modo()
+    tiempo_completo = min(timeit.repeat(
+        lambda: codec_json.codificar(datos, modo), number=repeticiones, repeat=5
+    )) / repeticiones
+    registro = lambda: diario_catalogo.codificar_registro(diario_catalogo.preparar_productos(datos, {1}))
+    tiempo_registro = min(timeit.repeat(registro, number=repeticiones, repeat=5)) / repeticiones
+    print(f"Modificar un producto: JSON completo {len(codec_json.codificar(datos, modo)) / 1024:.1f}KB "
+          f"en {tiempo_completo * 1000:.2f}ms - registro del diario {len(registro())}B "
+          f"en {tiempo_registro * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    print(f"orjson instalado: {'sí' if codec_json.ORJSON_AVAILABLE else 'no'} - "
+          f"modo configurado: {codec_json.obtener_modo()}")
+    for cantidad in (100, 10000):
+        medir(cantidad)
@@ -0,0 +1,180 @@
+"""
+Micro-benchmark del cálculo de precios con ingredientes
+Compara el cálculo original (arma un dict de ingredientes y busca los precios en cada
+llamada) con el plan de precio compilado de utils.precios, sobre los productos con
+ingredientes del catálogo y con modificaciones al azar. También mide el cálculo en
+lote (carrito completo y pedidos históricos) y el caché de precios de items con un
+carrito que se vuelve a calcular muchas veces. Solo lee el catálogo.
+"""
+import os
+import random
+import sys
+import timeit
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.productos import obtener_todos_los_productos
+from utils.ingredientes import obtener_ingredientes_por_nombre, obtener_todos_los_ingredientes
+from utils.precios import (
+    calcular_precio, obtener_plan_precio, calcular_precios_lote, recalcular_pedidos,
+    obtener_estadisticas_memo, reiniciar_estadisticas_memo
+)
+from utils import precios
+
+
+def calcular_precio_sin_plan(producto, modificaciones_ingredientes=None):
+    """Cálculo original, sin plan compilado (referencia para comparar)"""
+    precio_base = producto.get("precio", 0.0)
+    ingredientes = producto.get("ingredientes", [])
+
+    if not modificaciones_ingredientes:
+        return precio_base
+
+    ajuste_total = 0.0
+    ingredientes_por_nombre = obtener_ingredientes_por_nombre()
+    ingredientes_producto_dict = {ing.get("nombre", ""): ing for ing in ingredientes}
+
+    for ingrediente in ingredientes:
+        nombre = ingrediente.get("nombre", "")
+        cantidad_base = ingrediente.get("cantidad_base", 1)
+
+        ingrediente_actualizado = ingredientes_por_nombre.get(nombre)
+        if not ingrediente_actualizado:
+            precio_extra = 0.0
+            precio_resta = 0.0
+        else:
+            precio_extra = ingrediente_actualizado.get("precio_extra", 0.0)
+            precio_resta = ingrediente_actualizado.get("precio_resta", 0.0)
+
+        cantidad_modificada = modificaciones_ingredientes.get(nombre, cantidad_base)
+
+        if cantidad_modificada > cantidad_base:
+            ajuste_total += (cantidad_modificada - cantidad_base) * precio_extra
+        elif cantidad_modificada < cantidad_base:
+            ajuste_total -= (cantidad_base - cantidad_modificada) * precio_resta
+
+    for nombre, cantidad_adicional in modificaciones_ingredientes.items():
+        if nombre not in ingredientes_producto_dict and cantidad_adicional > 0:
+            ingrediente_actualizado = ingredientes_por_nombre.get(nombre)
+            if ingrediente_actualizado:
+                ajuste_total += cantidad_adicional * ingrediente_actualizado.get("precio_extra", 0.0)
+
+    return precio_base + ajuste_total
+
+
+def armar_casos(cantidad=1000):
+    """Arma items (producto, modificaciones) como los del carrito, con cambios al azar"""
+    random.seed(1)
+    productos = [p for p in obtener_todos_los_productos() if p.get("ingredientes")]
+    nombres_ingredientes = [ing["nombre"] for ing in obtener_todos_los_ingredientes()]
+    if not productos:
+        return []
+
+    casos = []
+    for _ in range(cantidad):
+        producto = random.choice(productos)
+        modificaciones = {
+            ing["nombre"]: max(0, ing.get("cantidad_base", 1) + random.choice((-1, 0, 0, 1, 2)))
+            for ing in producto["ingredientes"]
+        }
+        if nombres_ingredientes and random.random() < 0.3:
+            modificaciones[random.choice(nombres_ingredientes)] = random.randint(1, 2)
+        casos.append((producto, modificaciones))
+    return casos
+
+
+def medir():
+    casos = armar_casos()
+    if not casos:
+        print("No hay productos con ingredientes para medir")
+        return
+
+    # Verificar que ambos cálculos dan lo mismo
+    diferencias = sum(
+        1 for producto, modificaciones in casos
+        if calcular_precio_sin_plan(producto, modificaciones) != calcular_precio(producto, modificaciones)
+    )
+    print(f"Casos: {len(casos)} - diferencias entre cálculos: {diferencias}")
+
+    repeticiones = 20
+    def correr(funcion):
+        return lambda: [funcion(producto, modificaciones) for producto, modificaciones in casos]
+
+    tiempo_original = min(timeit.repeat(correr(calcular_precio_sin_plan), number=repeticiones, repeat=5))
+    tiempo_plan = min(timeit.repeat(correr(calcular_precio), number=repeticiones, repeat=5))
+    total = len(casos) * repeticiones
+
+    print(f"Sin plan:  {tiempo_original / total * 1e6:.2f} µs por item")
+    print(f"Con plan:  {tiempo_plan / total * 1e6:.2f} µs por item")
+    print(f"Mejora:    x{tiempo_original / tiempo_plan:.2f}")
+
+    # Solo el recorrido del plan (sin verificar el catálogo ni buscar el plan en el caché)
+    planes = [(obtener_plan_precio(producto), modificaciones) for producto, modificaciones in casos]
+    adicionales = precios._precios_extra_adicionales
+    tiempo_recorrido = min(timeit.repeat(
+        lambda: [plan.calcular(modificaciones, adicionales) for plan, modificaciones in planes],
+        number=repeticiones, repeat=5
+    ))
+    print(f"Recorrido del plan: {tiempo_recorrido / total * 1e6:.2f} µs por item "
+          f"(x{tiempo_original / tiempo_recorrido:.2f})")
+
+
+def medir_lote():
+    casos = armar_casos(5000)
+    if not casos:
+        return
+    lineas = [
+        {'producto': producto, 'cantidad': 1 + indice % 3, 'modificaciones_ingredientes': modificaciones}
+        for indice, (producto, modificaciones) in enumerate(casos)
+    ]
+
+    def total_item_por_item():
+        total = 0
+        for linea in lineas:
+            total += calcular_precio_sin_plan(linea['producto'], linea['modificaciones_ingredientes']) * linea['cantidad']
+        return total
+
+    total_original = total_item_por_item()
+    total_lote = calcular_precios_lote(lineas)['total']
+    print(f"\nLote de {len(lineas)} líneas - NumPy: {'sí' if precios.NUMPY_AVAILABLE else 'no'} - "
+          f"totales iguales: {total_original == total_lote}")
+
+    tiempo_original = min(timeit.repeat(total_item_por_item, number=3, repeat=3)) / 3
+    tiempo_lote = min(timeit.repeat(lambda: calcular_precios_lote(lineas), number=3, repeat=3)) / 3
+    print(f"Item por item: {tiempo_original * 1000:.2f} ms")
+    print(f"En lote:       {tiempo_lote * 1000:.2f} ms (x{tiempo_original / tiempo_lote:.2f})")
+
+    # Pedidos históricos: 2000 pedidos de 1 a 4 líneas
+    pedidos = []
+    indice = 0
+    while indice < len(lineas) and len(pedidos) < 2000:
+        tamanio = 1 + indice % 4
+        pedidos.append({'items': lineas[indice:indice + tamanio]})
+        indice += tamanio
+    tiempo_pedidos = min(timeit.repeat(lambda: recalcular_pedidos(pedidos), number=3, repeat=3)) / 3
+    print(f"Recalcular {len(pedidos)} pedidos: {tiempo_pedidos * 1000:.2f} ms")
+
+
+def medir_memo():
+    # Un carrito de 10 items que se vuelve a calcular (vista, total, tickets)
+    casos = armar_casos(10)
+    if not casos:
+        return
+    precios.TAMANIO_MEMO, tamanio_original = 0, precios.TAMANIO_MEMO
+    correr = lambda: [calcular_precio(producto, modificaciones) for producto, modificaciones in casos]
+    tiempo_sin_memo = min(timeit.repeat(correr, number=500, repeat=3)) / (500 * len(casos))
+    precios.TAMANIO_MEMO = tamanio_original
+
+    reiniciar_estadisticas_memo()
+    tiempo_con_memo = min(timeit.repeat(correr, number=500, repeat=3)) / (500 * len(casos))
+    estadisticas = obtener_estadisticas_memo()
+    print(f"\nCarrito de {len(casos)} items calculado {3 * 500} veces")
+    print(f"Sin caché: {tiempo_sin_memo * 1e6:.2f} µs por item")
+    print(f"Con caché: {tiempo_con_memo * 1e6:.2f} µs por item (x{tiempo_sin_memo / tiempo_con_memo:.2f})")
+    print(f"Aciertos: {estadisticas['aciertos']} - fallos: {estadisticas['fallos']}")
+
+if __name__ == "__main__":
+    medir()
+    medir_lote()
+    medir_memo()
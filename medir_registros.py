@@ -0,0 +1,89 @@
+"""
+Micro-benchmark de los registros inmutables del carrito (utils.registros)
+Compara memoria y tiempo de armar muchas líneas de pedido como antes (cada item con su
+copia del producto y sus diccionarios) y con LineaCarrito que comparten un mismo Producto,
+más la memoria de un catálogo grande en diccionarios y en registros Producto.
+Los productos se toman del catálogo real: no modifica los datos.
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+# Agregar el directorio raíz al path para importar módulos
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.productos import cargar_productos
+from utils.registros import LineaCarrito, Producto, producto_de_catalogo
+
+
+def obtener_modelos():
+    """Productos del catálogo real con su categoría"""
+    modelos = [
+        (producto, categoria["nombre"])
+        for categoria in cargar_productos().get("categorias", []) for producto in categoria.get("productos", [])
+    ]
+    if not modelos:
+        modelos = [({"id": 1, "nombre": "Producto", "precio": 1000.0, "descripcion": "", "ingredientes": []}, "")]
+    return modelos
+
+
+def lineas_con_diccionarios(modelos, cantidad):
+    """Líneas como las armaba el carrito antes: copia del producto y dicts por item"""
+    lineas = []
+    for indice in range(cantidad):
+        producto, categoria = modelos[indice % len(modelos)]
+        copia = producto.copy()
+        copia["categoria"] = categoria
+        lineas.append({
+            "producto": copia,
+            "cantidad": 1,
+            "modificaciones_ingredientes": {ing["nombre"]: ing["cantidad_base"] for ing in copia["ingredientes"]}
+        })
+    # pedido_info['items'] copiaba la lista otra vez
+    return lineas.copy()
+
+
+def lineas_con_registros(modelos, cantidad):
+    """Líneas como las arma el carrito ahora: LineaCarrito con el Producto compartido"""
+    lineas = []
+    for indice in range(cantidad):
+        producto, categoria = modelos[indice % len(modelos)]
+        lineas.append(LineaCarrito.nueva(producto_de_catalogo(producto, categoria), 1))
+    return tuple(lineas)
+
+
+def medir_memoria(funcion):
+    """Retorna los bytes que quedan reservados por el resultado de la función"""
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    resultado = funcion()
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del resultado
+    return usado
+
+
+def medir(cantidad):
+    modelos = obtener_modelos()
+    print(f"--- {cantidad} líneas de pedido ({len(modelos)} productos distintos) ---")
+
+    for nombre, funcion in (("diccionarios", lineas_con_diccionarios), ("registros", lineas_con_registros)):
+        memoria = medir_memoria(lambda: funcion(modelos, cantidad))
+        tiempo = min(timeit.repeat(lambda: funcion(modelos, cantidad), number=3, repeat=3)) / 3
+        print(f"{nombre:<14}{memoria / 1024:>10.1f}KB{memoria / cantidad:>10.0f}B por línea"
+              f"{tiempo * 1000:>10.2f}ms")
+
+    # Catálogo grande: diccionarios contra registros Producto (cada producto con sus ingredientes)
+    catalogo = [dict(modelos[indice % len(modelos)][0], id=indice + 1) for indice in range(cantidad)]
+    memoria_dicts = medir_memoria(lambda: [
+        dict(producto, ingredientes=[dict(ing) for ing in producto["ingredientes"]]) for producto in catalogo
+    ])
+    memoria_registros = medir_memoria(lambda: [Producto.desde_dict(producto) for producto in catalogo])
+    print(f"Catálogo de {cantidad} productos: diccionarios {memoria_dicts / 1024:.1f}KB - "
+          f"registros {memoria_registros / 1024:.1f}KB")
+
+
+if __name__ == "__main__":
+    for cantidad in (1000, 100000):
+        medir(cantidad)
@@ -0,0 +1,34 @@
+"""
+Script para guardar los productos en un archivo por categoría
+Crea data/productos/ (manifiesto.json y un JSON por categoría); a partir de ahí la
+aplicación lee cada categoría recién cuando se muestra y al guardar reescribe solo
+la categoría que cambió. Con --unir vuelve a guardar todo en data/productos.json.
+"""
+import sys
+
+from utils.catalogo_particionado import particionar_desde_json, unir_en_json, obtener_ruta_carpeta
+
+
+def particionar_productos():
+    """Particiona el catálogo de productos (con --reemplazar lo vuelve a armar, con --unir lo deshace)"""
+    if "--unir" in sys.argv[1:]:
+        cantidad = unir_en_json()
+        if cantidad is None:
+            print("Los productos no están particionados")
+        else:
+            print(f"Guardados {cantidad} productos en productos.json")
+        return
+
+    reemplazar = "--reemplazar" in sys.argv[1:]
+    resultado = particionar_desde_json(reemplazar=reemplazar)
+
+    if resultado is None:
+        print(f"La carpeta {obtener_ruta_carpeta()} ya existe")
+        print("Use --reemplazar para volver a armarla o --unir para volver a productos.json")
+        return
+
+    print(f"Particionados {resultado['productos']} productos en {resultado['categorias']} categorías")
+    print(f"Carpeta: {obtener_ruta_carpeta()}")
+
+if __name__ == "__main__":
+    particionar_productos()
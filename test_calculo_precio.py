@@ -1,5 +1,7 @@
 """
 Script de prueba para verificar el cálculo de precios con ingredientes
+Los precios de extra y resta se leen del catálogo de ingredientes: la prueba usa el
+catálogo de conftest.py, con los mismos precios que este producto de ejemplo
 """
 from utils.productos import calcular_precio_con_ingredientes
 
@@ -24,25 +26,27 @@ producto = {
     ]
 }
 
-# Caso 1: Sin modificaciones (debería retornar precio base)
-modificaciones1 = {"Medallón": 1, "Tomáte": 1}
-precio1 = calcular_precio_con_ingredientes(producto, modificaciones1)
-print(f"Caso 1 - Sin modificaciones: ${precio1:.2f} (esperado: $8800.00)")
 
-# Caso 2: Agregar 1 medallón extra
-modificaciones2 = {"Medallón": 2, "Tomáte": 1}
-precio2 = calcular_precio_con_ingredientes(producto, modificaciones2)
-print(f"Caso 2 - 1 medallón extra: ${precio2:.2f} (esperado: $9800.00)")
+def test_calculo_precio(catalogo_de_prueba):
+    # Caso 1: Sin modificaciones (debería retornar precio base)
+    modificaciones1 = {"Medallón": 1, "Tomáte": 1}
+    precio1 = calcular_precio_con_ingredientes(producto, modificaciones1)
+    assert precio1 == 8800.00, f"Caso 1 - Sin modificaciones: ${precio1:.2f} (esperado: $8800.00)"
 
-# Caso 3: Quitar 1 tomáte
-modificaciones3 = {"Medallón": 1, "Tomáte": 0}
-precio3 = calcular_precio_con_ingredientes(producto, modificaciones3)
-print(f"Caso 3 - Quitar 1 tomáte: ${precio3:.2f} (esperado: $8300.00)")
+    # Caso 2: Agregar 1 medallón extra
+    modificaciones2 = {"Medallón": 2, "Tomáte": 1}
+    precio2 = calcular_precio_con_ingredientes(producto, modificaciones2)
+    assert precio2 == 9800.00, f"Caso 2 - 1 medallón extra: ${precio2:.2f} (esperado: $9800.00)"
 
-# Caso 4: Sin modificaciones dict (debería usar cantidad_base)
-precio4 = calcular_precio_con_ingredientes(producto, None)
-print(f"Caso 4 - Sin dict modificaciones: ${precio4:.2f} (esperado: $8800.00)")
+    # Caso 3: Quitar 1 tomáte
+    modificaciones3 = {"Medallón": 1, "Tomáte": 0}
+    precio3 = calcular_precio_con_ingredientes(producto, modificaciones3)
+    assert precio3 == 8300.00, f"Caso 3 - Quitar 1 tomáte: ${precio3:.2f} (esperado: $8300.00)"
 
-# Caso 5: Modificaciones vacías
-precio5 = calcular_precio_con_ingredientes(producto, {})
-print(f"Caso 5 - Dict vacío: ${precio5:.2f} (esperado: $8800.00)")
+    # Caso 4: Sin modificaciones dict (debería usar cantidad_base)
+    precio4 = calcular_precio_con_ingredientes(producto, None)
+    assert precio4 == 8800.00, f"Caso 4 - Sin dict modificaciones: ${precio4:.2f} (esperado: $8800.00)"
+
+    # Caso 5: Modificaciones vacías
+    precio5 = calcular_precio_con_ingredientes(producto, {})
+    assert precio5 == 8800.00, f"Caso 5 - Dict vacío: ${precio5:.2f} (esperado: $8800.00)"
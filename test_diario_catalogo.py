@@ -0,0 +1,121 @@
+"""
+Pruebas del diario de cambios del catálogo (utils.diario_catalogo)
+Los cambios puntuales se agregan al diario sin reescribir el JSON y se vuelven a
+aplicar al releerlo; un diario de otra versión del JSON (base vieja) se ignora y
+nunca se le agregan registros
+"""
+import json
+import os
+
+from utils import catalogo, persistencia, snapshot_catalogo
+from utils.diario_catalogo import obtener_ruta_diario
+import utils.productos as productos
+from conftest import escribir_json
+
+
+def _ids(datos):
+    return {producto["id"]: producto["nombre"] for categoria in datos["categorias"] for producto in categoria["productos"]}
+
+
+def _encabezado(ruta_json):
+    with open(obtener_ruta_diario(ruta_json), 'rb') as f:
+        return json.loads(f.readline())
+
+
+def _preparar(ruta):
+    """Carga el catálogo de prueba y escribe la migración inicial (categorías fijas)"""
+    productos.cargar_productos()
+    persistencia.flush()
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+def test_el_diario_se_aplica_al_releer(catalogo_de_prueba):
+    ruta = productos.obtener_ruta_json()
+    contenido = _preparar(ruta)
+
+    nuevo = productos.agregar_producto("Lomitos", "Lomo del diario", 1234, "")
+    productos.modificar_producto(1, "Hamburguesas", "Completa renombrada", 8900, "")
+    productos.eliminar_producto(2)
+    persistencia.flush()
+
+    # El JSON no se reescribió: los cambios están en el diario
+    with open(ruta, 'rb') as f:
+        assert f.read() == contenido
+    assert _encabezado(ruta)["base"] == snapshot_catalogo.calcular_hash(contenido)
+    esperado = _ids(productos.cargar_productos())
+
+    productos._repositorio.invalidar()
+    releido = _ids(productos.cargar_productos())
+    assert releido == esperado
+    assert releido[nuevo["id"]] == "Lomo del diario"
+    assert releido[1] == "Completa renombrada"
+    assert 2 not in releido
+    assert productos.buscar_producto_por_id(nuevo["id"])["categoria"] == "Lomitos"
+    # La lectura sin repositorio (importar a SQLite) también aplica el diario
+    assert _ids(catalogo.leer_json_con_diario(ruta, "productos")) == esperado
+
+
+def test_el_diario_de_otro_json_se_ignora(catalogo_de_prueba):
+    ruta = productos.obtener_ruta_json()
+    contenido = _preparar(ruta)
+    nuevo = productos.agregar_producto("Lomitos", "Lomo del diario", 1234, "")
+    persistencia.flush()
+    with open(obtener_ruta_diario(ruta), 'rb') as f:
+        diario_viejo = f.read()
+
+    # Otra caja compacta el catálogo con otro contenido: el diario queda con la base vieja
+    datos = json.loads(contenido)
+    datos["categorias"][0]["productos"][0]["nombre"] = "Cambiada por otra caja"
+    escribir_json(ruta, datos)
+
+    releido = _ids(productos.cargar_productos())
+    assert nuevo["id"] not in releido
+    assert releido[1] == "Cambiada por otra caja"
+    # Se ignora pero no se borra al leer (otra caja puede estar reemplazando el JSON)
+    with open(obtener_ruta_diario(ruta), 'rb') as f:
+        assert f.read() == diario_viejo
+
+    # El próximo registro reemplaza el diario viejo por uno sobre el JSON actual
+    productos.modificar_producto(3, "Lomitos", "Lomito nuevo", 12500, "")
+    persistencia.flush()
+    with open(ruta, 'rb') as f:
+        base = snapshot_catalogo.calcular_hash(f.read())
+    with open(obtener_ruta_diario(ruta), 'rb') as f:
+        lineas = f.read().splitlines()
+    assert len(lineas) == 2
+    assert json.loads(lineas[0])["base"] == base
+
+    productos._repositorio.invalidar()
+    releido = _ids(productos.cargar_productos())
+    assert releido[3] == "Lomito nuevo"
+    assert releido[1] == "Cambiada por otra caja"
+    assert nuevo["id"] not in releido
+
+
+def test_no_se_agrega_al_diario_sobre_una_base_vieja(catalogo_de_prueba, monkeypatch):
+    ruta = productos.obtener_ruta_json()
+    contenido = _preparar(ruta)
+    # Sin verificar el disco: el cambio local se hace sobre los datos ya leídos
+    monkeypatch.setattr(catalogo, "INTERVALO_VERIFICACION", 3600)
+    productos.cargar_productos()
+    productos.modificar_producto(1, "Hamburguesas", "Cambio local", 9000, "")
+
+    # Mientras tanto otra caja reescribe el JSON con un producto nuevo
+    datos = json.loads(contenido)
+    datos["categorias"][1]["productos"].append(
+        {"id": 50, "nombre": "De otra caja", "precio": 100.0, "descripcion": "", "ingredientes": []}
+    )
+    escribir_json(ruta, datos)
+
+    persistencia.flush()
+    with open(ruta, 'rb') as f:
+        base = snapshot_catalogo.calcular_hash(f.read())
+    if os.path.exists(obtener_ruta_diario(ruta)):
+        assert _encabezado(ruta)["base"] == base
+
+    monkeypatch.setattr(catalogo, "INTERVALO_VERIFICACION", 0)
+    productos._repositorio.invalidar()
+    releido = _ids(productos.cargar_productos())
+    assert releido[1] == "Cambio local"
+    assert releido[50] == "De otra caja"
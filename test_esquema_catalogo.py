@@ -0,0 +1,137 @@
+"""
+Pruebas de la normalización de los catálogos (utils.esquema_catalogo)
+Las filas válidas se completan y se convierten a los tipos correctos; las inválidas
+se apartan sin modificarlas, se informan y se vuelven a guardar con el catálogo
+"""
+import copy
+import json
+
+import pytest
+
+from utils import catalogo, esquema_catalogo, persistencia
+from utils.esquema_catalogo import (
+    CLAVE_FILAS_INVALIDAS, normalizar_productos, normalizar_ingredientes, ids_apartados
+)
+import utils.productos as productos
+from conftest import escribir_json
+
+
+def _datos_con_problemas():
+    return {
+        "categorias": [
+            {
+                "nombre": " Hamburguesas ",
+                "productos": [
+                    {"id": "1", "nombre": "Simple", "precio": "1500,50", "ingredientes": [
+                        {"nombre": "Queso"},
+                        {"nombre": "", "cantidad_base": 1},
+                        {"nombre": "Tomate", "cantidad_base": "dos"}
+                    ]},
+                    {"id": 2, "nombre": "Sin precio", "precio": "barato"},
+                    {"id": 3, "precio": 100},
+                    {"id": 1, "nombre": "ID repetido", "precio": 100},
+                    {"id": 4.5, "nombre": "ID con decimales", "precio": 100},
+                    "no es un producto"
+                ]
+            },
+            {"productos": []},
+            {
+                "nombre": "Lomitos",
+                "productos": [{"id": 5, "nombre": "Lomito", "precio": 2000, "descripcion": None}]
+            }
+        ]
+    }
+
+
+def test_normalizar_productos_aparta_las_filas_invalidas():
+    datos = _datos_con_problemas()
+    original = copy.deepcopy(datos)
+    problemas = normalizar_productos(datos)
+
+    hamburguesas, lomitos = datos["categorias"]
+    assert hamburguesas["nombre"] == "Hamburguesas"
+    simple = hamburguesas["productos"][0]
+    assert len(hamburguesas["productos"]) == 1
+    assert simple["id"] == 1 and simple["precio"] == 1500.5 and simple["descripcion"] == ""
+    assert simple["ingredientes"] == [{"nombre": "Queso", "cantidad_base": 1}]
+    assert simple[CLAVE_FILAS_INVALIDAS] == original["categorias"][0]["productos"][0]["ingredientes"][1:]
+    assert lomitos["productos"][0]["descripcion"] == ""
+
+    # Las filas apartadas quedan tal cual estaban
+    assert hamburguesas[CLAVE_FILAS_INVALIDAS] == original["categorias"][0]["productos"][1:]
+    assert datos[CLAVE_FILAS_INVALIDAS] == [original["categorias"][1]]
+    assert ids_apartados(datos) == {1, 2, 3}
+    # Ingredientes: 2, productos: 5, categorías: 1
+    assert len(problemas) == 8
+
+
+def test_normalizar_de_nuevo_no_cambia_nada():
+    datos = _datos_con_problemas()
+    normalizar_productos(datos)
+    normalizado = copy.deepcopy(datos)
+    assert len(normalizar_productos(datos)) == 8
+    assert datos == normalizado
+
+
+def test_fila_corregida_vuelve_a_su_lista():
+    datos = _datos_con_problemas()
+    normalizar_productos(datos)
+    for fila in datos["categorias"][0][CLAVE_FILAS_INVALIDAS]:
+        if isinstance(fila, dict) and fila.get("nombre") == "Sin precio":
+            fila["precio"] = "2500"
+    normalizar_productos(datos)
+    corregido = [p for p in datos["categorias"][0]["productos"] if p["id"] == 2]
+    assert corregido and corregido[0]["precio"] == 2500.0
+
+
+def test_normalizar_ingredientes():
+    datos = {
+        "ingredientes": [
+            {"id": 1, "nombre": "Queso", "precio_extra": "300", "categorias": "Hamburguesas"},
+            {"id": 2, "nombre": "Panceta"},
+            {"id": 2, "nombre": "Repetido", "precio_extra": 1},
+            {"id": 3, "nombre": "Caro", "precio_extra": float("inf")},
+            {"id": "x", "nombre": "Sin ID"}
+        ]
+    }
+    problemas = normalizar_ingredientes(datos)
+    assert datos["ingredientes"] == [
+        {"id": 1, "nombre": "Queso", "precio_extra": 300.0, "precio_resta": 0.0, "categorias": ["Hamburguesas"]},
+        {"id": 2, "nombre": "Panceta", "precio_extra": 0.0, "precio_resta": 0.0, "categorias": []}
+    ]
+    assert [fila["nombre"] for fila in datos[CLAVE_FILAS_INVALIDAS]] == ["Repetido", "Caro", "Sin ID"]
+    assert len(problemas) == 3
+
+
+@pytest.mark.parametrize("valor, esperado", [(1500, 1500.0), ("1500", 1500.0), (" 1500,5 ", 1500.5), (2.25, 2.25)])
+def test_precios_validos(valor, esperado):
+    assert esquema_catalogo._precio(valor, "precio") == esperado
+
+
+@pytest.mark.parametrize("valor", [None, "", "abc", True, float("nan"), [1]])
+def test_precios_invalidos(valor):
+    with pytest.raises(esquema_catalogo.FilaInvalida):
+        esquema_catalogo._precio(valor, "precio")
+
+
+def test_las_filas_apartadas_se_conservan_al_guardar(carpeta_datos, monkeypatch):
+    monkeypatch.setattr(esquema_catalogo, "_informados", set())
+    escribir_json(carpeta_datos / "productos.json", _datos_con_problemas())
+
+    datos = productos.cargar_productos()
+    assert esquema_catalogo.obtener_problemas("productos")
+    # Los IDs apartados no se reasignan
+    nuevo = productos.agregar_producto("Lomitos", "Nuevo", 100, "")
+    assert nuevo["id"] not in ids_apartados(datos) and nuevo["id"] > 5
+    persistencia.flush()
+    catalogo.compactar_diarios()  # Reescribe el JSON completo
+
+    with open(carpeta_datos / "productos.json", encoding="utf-8") as f:
+        guardado = json.load(f)
+    assert ids_apartados(guardado) == {1, 2, 3}
+    hamburguesas = next(c for c in guardado["categorias"] if c["nombre"] == "Hamburguesas")
+    assert {"id": 2, "nombre": "Sin precio", "precio": "barato"} in hamburguesas[CLAVE_FILAS_INVALIDAS]
+
+    with open(esquema_catalogo.obtener_ruta_registro_problemas(), encoding="utf-8") as f:
+        registro = f.read()
+    assert "ID 1 repetido" in registro and "(productos)" in registro
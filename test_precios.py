@@ -0,0 +1,158 @@
+"""
+Pruebas de utils.precios: los planes compilados, el lote en Python puro y el lote
+vectorizado con NumPy dan el mismo precio que la fórmula original de
+calcular_precio_con_ingredientes (recorrer los ingredientes del producto y buscar
+los precios en el catálogo de ingredientes)
+"""
+import random
+
+import pytest
+
+from utils import precios
+from utils.ingredientes import obtener_ingredientes_por_nombre
+from utils.productos import cargar_productos
+from conftest import escribir_json
+
+
+def precio_formula_original(producto, modificaciones_ingredientes, ingredientes_por_nombre):
+    """Fórmula original de calcular_precio_con_ingredientes (antes de los planes compilados)"""
+    precio_base = producto.get("precio", 0.0)
+    ingredientes = producto.get("ingredientes", [])
+
+    if not modificaciones_ingredientes:
+        return precio_base
+
+    ajuste_total = 0.0
+    ingredientes_producto_dict = {ing.get("nombre", ""): ing for ing in ingredientes}
+
+    for ingrediente in ingredientes:
+        nombre = ingrediente.get("nombre", "")
+        cantidad_base = ingrediente.get("cantidad_base", 1)
+
+        ingrediente_actualizado = ingredientes_por_nombre.get(nombre)
+        if not ingrediente_actualizado:
+            precio_extra = 0.0
+            precio_resta = 0.0
+        else:
+            precio_extra = ingrediente_actualizado.get("precio_extra", 0.0)
+            precio_resta = ingrediente_actualizado.get("precio_resta", 0.0)
+
+        cantidad_modificada = modificaciones_ingredientes.get(nombre, cantidad_base)
+
+        if cantidad_modificada > cantidad_base:
+            extras = cantidad_modificada - cantidad_base
+            ajuste_total += extras * precio_extra
+        elif cantidad_modificada < cantidad_base:
+            quitados = cantidad_base - cantidad_modificada
+            ajuste_total -= quitados * precio_resta
+
+    for nombre, cantidad_adicional in modificaciones_ingredientes.items():
+        if nombre not in ingredientes_producto_dict and cantidad_adicional > 0:
+            ingrediente_actualizado = ingredientes_por_nombre.get(nombre)
+            if ingrediente_actualizado:
+                precio_extra = ingrediente_actualizado.get("precio_extra", 0.0)
+                ajuste_total += cantidad_adicional * precio_extra
+
+    return precio_base + ajuste_total
+
+
+@pytest.fixture
+def catalogo_aleatorio(carpeta_datos):
+    """Catálogo sintético con ingredientes repetidos, ausentes del catálogo y cantidades 0"""
+    azar = random.Random(13)
+    nombres = [f"Ingrediente {i}" for i in range(15)]
+    ingredientes = [
+        {
+            "id": i + 1,
+            "nombre": nombre,
+            "categorias": [],
+            "precio_extra": azar.choice([0.0, 150.0, 300.0, 512.5, 1000.0]),
+            "precio_resta": azar.choice([0.0, 100.0, 250.0, 333.3])
+        }
+        for i, nombre in enumerate(nombres)
+    ]
+    productos = []
+    for producto_id in range(1, 61):
+        usados = azar.sample(nombres + ["Fantasma"], azar.randint(0, 6))
+        productos.append({
+            "id": producto_id,
+            "nombre": f"Producto {producto_id}",
+            "precio": float(azar.randint(10, 200) * 50),
+            "descripcion": "",
+            "ingredientes": [{"nombre": nombre, "cantidad_base": azar.randint(0, 2)} for nombre in usados]
+        })
+    escribir_json(carpeta_datos / "ingredientes.json", {"ingredientes": ingredientes})
+    escribir_json(carpeta_datos / "productos.json", {"categorias": [{"nombre": "Hamburguesas", "productos": productos}]})
+
+    lineas = []
+    for _ in range(3 * precios.UMBRAL_NUMPY):
+        modificaciones = {
+            nombre: azar.randint(0, 4)
+            for nombre in azar.sample(nombres + ["Fantasma", "Desconocido"], azar.randint(0, 5))
+        }
+        lineas.append((azar.randrange(len(productos)), azar.randint(1, 3), modificaciones))
+    return lineas
+
+
+def _lineas_y_esperados(lineas):
+    """Líneas en el formato JSON de los items y el precio unitario de la fórmula original"""
+    productos = cargar_productos()["categorias"][0]["productos"]
+    ingredientes_por_nombre = obtener_ingredientes_por_nombre()
+    items = []
+    esperados = []
+    for posicion, cantidad, modificaciones in lineas:
+        producto = productos[posicion]
+        items.append({"producto": producto, "cantidad": cantidad, "modificaciones_ingredientes": modificaciones})
+        esperados.append(precio_formula_original(producto, modificaciones, ingredientes_por_nombre))
+    return items, esperados
+
+
+def test_calcular_precio_igual_a_la_formula_original(catalogo_aleatorio):
+    items, esperados = _lineas_y_esperados(catalogo_aleatorio)
+    # Dos vueltas: la segunda sale de los planes y del caché de precios
+    for _ in range(2):
+        obtenidos = [precios.calcular_precio(item["producto"], item["modificaciones_ingredientes"]) for item in items]
+        assert obtenidos == esperados
+
+
+def test_lote_en_python_igual_a_la_formula_original(catalogo_aleatorio, monkeypatch):
+    monkeypatch.setattr(precios, "NUMPY_AVAILABLE", False)
+    items, esperados = _lineas_y_esperados(catalogo_aleatorio)
+    resultado = precios.calcular_precios_lote(items)
+    assert resultado["precios_unitarios"] == esperados
+    assert resultado["total"] == pytest.approx(sum(p * item["cantidad"] for p, item in zip(esperados, items)))
+
+
+@pytest.mark.skipif(not precios.NUMPY_AVAILABLE, reason="NumPy no está instalado")
+def test_lote_vectorizado_igual_a_la_formula_original(catalogo_aleatorio):
+    items, esperados = _lineas_y_esperados(catalogo_aleatorio)
+    assert len(items) >= precios.UMBRAL_NUMPY
+    resultado = precios.calcular_precios_lote(items)
+    assert resultado["precios_unitarios"] == pytest.approx(esperados)
+    assert resultado["total"] == pytest.approx(sum(p * item["cantidad"] for p, item in zip(esperados, items)))
+
+
+def test_cambio_de_precio_invalida_los_planes(catalogo_de_prueba):
+    from utils.ingredientes import modificar_ingrediente
+    producto = cargar_productos()["categorias"][0]["productos"][0]
+    assert precios.calcular_precio(producto, {"Medallón": 2}) == 9800.0
+    modificar_ingrediente(1, "Medallón", ["Hamburguesas"], 1500.0, 500.0)
+    assert precios.calcular_precio(producto, {"Medallón": 2}) == 10300.0
+
+
+
+def test_recalcular_pedidos_con_precios_actuales(catalogo_de_prueba):
+    from utils.productos import modificar_producto
+    from utils.registros import LineaCarrito, producto_de_catalogo
+    guardado = dict(cargar_productos()["categorias"][0]["productos"][0])  # Completa: 8800
+    personalizado = {"id": -1, "nombre": "Especial", "precio": 500.0, "ingredientes": []}
+    eliminado = {"id": 99, "nombre": "Ya no existe", "precio": 700.0, "ingredientes": []}
+    pedidos = [
+        {"items": [{"producto": guardado, "cantidad": 2, "modificaciones_ingredientes": {"Medallón": 2}}]},
+        {"items": [LineaCarrito(producto_de_catalogo(guardado), 1)]},
+        {"items": [{"producto": personalizado, "cantidad": 1}, {"producto": eliminado, "cantidad": 2}]}
+    ]
+    assert precios.recalcular_pedidos(pedidos) == [2 * 9800.0, 8800.0, 500.0 + 2 * 700.0]
+
+    modificar_producto(1, "Hamburguesas", "Hamburguesa Completa", 9000, "")
+    assert precios.recalcular_pedidos(pedidos) == [2 * 10000.0, 9000.0, 500.0 + 2 * 700.0]
@@ -0,0 +1,50 @@
+"""
+Pruebas de los registros inmutables (utils.registros) y de las funciones que los reciben
+Los precios y los tickets aceptan tanto un Producto como cualquier dict de producto,
+aunque no traiga todas las claves
+"""
+import pytest
+
+from utils import precios
+from utils.productos import calcular_precio_con_ingredientes, cargar_productos
+from utils.registros import Producto, producto_de_catalogo
+from utils.tickets import tiene_modificaciones_reales
+
+
+@pytest.mark.parametrize("producto", [
+    {"id": 1, "precio": 100.0, "ingredientes": []},
+    {"id": 1, "precio": 100.0},
+    {"precio": 100.0},
+    {"precio": 100.0, "ingredientes": [{"cantidad_base": 1}]},
+])
+def test_precio_de_dicts_incompletos(catalogo_de_prueba, producto):
+    # Queso: extra de 300 (ver INGREDIENTES_PRUEBA en conftest.py)
+    assert calcular_precio_con_ingredientes(producto, {"Queso": 1}) == 400.0
+    assert calcular_precio_con_ingredientes(producto) == 100.0
+
+
+def test_producto_desde_dict_con_valores_por_defecto():
+    producto = Producto.desde_dict({"ingredientes": [{"nombre": "Queso"}]})
+    assert producto.id is None and producto.nombre == "" and producto.precio == 0.0
+    assert producto.ingredientes[0].cantidad_base == 1
+
+
+def test_tiene_modificaciones_reales_con_dict_o_producto(catalogo_de_prueba):
+    dict_producto = cargar_productos()["categorias"][0]["productos"][0]
+    for producto in (dict_producto, producto_de_catalogo(dict_producto)):
+        assert not tiene_modificaciones_reales(producto, {"Medallón": 1, "Tomáte": 1})
+        assert tiene_modificaciones_reales(producto, {"Medallón": 2})
+        assert tiene_modificaciones_reales(producto, {"Queso": 1})
+        assert not tiene_modificaciones_reales(producto, {"Queso": 0})
+
+
+def test_productos_personalizados_no_comparten_cache(catalogo_de_prueba):
+    # Todos los productos personalizados tienen el ID -1
+    primero = {"id": -1, "nombre": "Uno", "precio": 100.0, "ingredientes": []}
+    segundo = {"id": -1, "nombre": "Dos", "precio": 250.0, "ingredientes": []}
+    assert precios.calcular_precio(primero, {"Queso": 1}) == 400.0
+    planes = precios.obtener_estadisticas_planes()["planes"]
+    for _ in range(3):
+        assert precios.calcular_precio(primero, {"Queso": 1}) == 400.0
+        assert precios.calcular_precio(segundo, {"Queso": 1}) == 550.0
+    assert precios.obtener_estadisticas_planes()["planes"] == planes
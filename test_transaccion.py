@@ -0,0 +1,71 @@
+"""
+Pruebas de catalogo.transaccion(): al deshacerla vuelven los datos, los índices
+(producto por ID, productos por ingrediente, ingredientes por nombre) y la marca de
+agua de IDs, y no se escribe nada en disco
+"""
+import os
+
+import pytest
+
+from utils import catalogo, persistencia
+from utils.diario_catalogo import obtener_ruta_diario
+import utils.ingredientes as ingredientes
+import utils.productos as productos
+
+
+def _firmas():
+    rutas = [productos.obtener_ruta_json(), ingredientes.obtener_ruta_json()]
+    return [catalogo.obtener_firma_archivo(ruta) for ruta in rutas + [obtener_ruta_diario(ruta) for ruta in rutas]]
+
+
+def test_transaccion_deshecha_restaura_los_indices(catalogo_de_prueba):
+    productos.cargar_productos()
+    ingredientes.cargar_ingredientes()
+    persistencia.flush()
+
+    indice_productos = set(productos._indice_por_id)
+    con_queso = set(productos.obtener_ids_productos_con_ingrediente("Queso"))
+    con_medallon = set(productos.obtener_ids_productos_con_ingrediente("Medallón"))
+    nombres_ingredientes = set(ingredientes.obtener_ingredientes_por_nombre())
+    siguiente_producto = productos.obtener_siguiente_id()
+    siguiente_ingrediente = ingredientes.obtener_siguiente_id()
+    firmas = _firmas()
+
+    with pytest.raises(ValueError):
+        with catalogo.transaccion():
+            nuevo = productos.agregar_producto("Lomitos", "Lomo de prueba", 100, "")
+            productos.agregar_ingrediente_a_producto(nuevo["id"], {"nombre": "Queso", "cantidad_base": 1})
+            productos.eliminar_producto(1)
+            with catalogo.transaccion():
+                ingredientes.agregar_ingrediente("Trufa", ["Lomitos"], 100, 50)
+                ingredientes.modificar_ingrediente(1, "Medallón doble", ["Hamburguesas"], 2000, 1000)
+            raise ValueError("se deshace todo")
+
+    assert set(productos._indice_por_id) == indice_productos
+    assert productos.buscar_producto_por_id(nuevo["id"]) is None
+    assert productos.buscar_producto_por_id(1)["producto"]["nombre"] == "Hamburguesa Completa"
+    assert productos.obtener_ids_productos_con_ingrediente("Queso") == con_queso
+    assert productos.obtener_ids_productos_con_ingrediente("Medallón") == con_medallon
+    assert productos.obtener_ids_productos_con_ingrediente("Medallón doble") == set()
+    assert set(ingredientes.obtener_ingredientes_por_nombre()) == nombres_ingredientes
+    assert ingredientes.buscar_ingrediente_por_nombre("Trufa") is None
+    assert ingredientes.buscar_ingrediente_por_id(1)["precio_extra"] == 1000.0
+    assert productos.obtener_siguiente_id() == siguiente_producto
+    assert ingredientes.obtener_siguiente_id() == siguiente_ingrediente
+
+    persistencia.flush()
+    assert _firmas() == firmas
+
+
+def test_transaccion_confirmada_escribe_una_vez(catalogo_de_prueba):
+    productos.cargar_productos()
+    persistencia.flush()
+    escrituras = productos.obtener_estadisticas_productos()["registros_diario"]
+
+    with catalogo.transaccion():
+        for producto_id in (1, 2, 3):
+            productos.agregar_ingrediente_a_producto(producto_id, {"nombre": "Panceta", "cantidad_base": 1})
+
+    assert productos.obtener_estadisticas_productos()["registros_diario"] == escrituras + 1
+    assert productos.obtener_ids_productos_con_ingrediente("Panceta") == {1, 2, 3}
+    assert os.path.exists(obtener_ruta_diario(productos.obtener_ruta_json()))
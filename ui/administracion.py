@@ -7,13 +7,14 @@ from tkinter import ttk
 from tkinter import messagebox, filedialog
 import os
 import sys
+import threading
 
 # Agregar el directorio raíz al path para importar módulos
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from utils.productos import (
     cargar_productos, CATEGORIAS_FIJAS,
     agregar_producto, modificar_producto, eliminar_producto,
-    obtener_todos_los_productos
+    contar_productos_con_ingrediente
 )
 from utils.ingredientes import (
     cargar_ingredientes,
@@ -29,6 +30,12 @@ from utils.imagenes import (
     guardar_imagen_producto, guardar_imagen_ingrediente,
     cargar_imagen_tkinter, eliminar_imagen
 )
+from utils.busqueda import obtener_indice, BusquedaIncremental
+from utils import catalogo
+
+
+# Cada cuánto (en ms) la ventana revisa si el catálogo cambió fuera de ella
+INTERVALO_REVISION_CAMBIOS_MS = 100
 
 
 class VentanaAdministracion:
@@ -45,9 +52,69 @@ class VentanaAdministracion:
         self.parent = parent
         self.callback_actualizar = callback_actualizar
         self.producto_seleccionado = None
+        self._filas_productos = set()  # iids de todas las filas de productos (visibles u ocultas)
+        self._busqueda_productos = BusquedaIncremental()  # Filtra los resultados anteriores al seguir escribiendo
         
         self.crear_ventana()
         self.cargar_lista_productos()
+        
+        # Cambios del catálogo hechos fuera de esta ventana (scripts, otras pantallas, otra
+        # caja): los eventos llegan desde cualquier thread y solo marcan el cambio; el
+        # thread de la interfaz lo revisa periódicamente y sincroniza las listas
+        self._generacion_listas = catalogo.obtener_generacion()
+        self._cambio_catalogo = threading.Event()
+        catalogo.suscribir_cambios(self.on_cambio_catalogo)
+        self._revision_cambios = self.ventana.after(INTERVALO_REVISION_CAMBIOS_MS, self.revisar_cambios_catalogo)
+        self.ventana.bind('<Destroy>', self.on_destruir_ventana, add='+')
+    
+    def on_cambio_catalogo(self, eventos):
+        """Recibe los eventos del catálogo (desde cualquier thread): solo marca el cambio"""
+        self._cambio_catalogo.set()
+    
+    def revisar_cambios_catalogo(self):
+        """Loop en el thread de la interfaz: sincroniza las listas si el catálogo cambió"""
+        if self._cambio_catalogo.is_set():
+            self._cambio_catalogo.clear()
+            self.sincronizar_listas()
+        self._revision_cambios = self.ventana.after(INTERVALO_REVISION_CAMBIOS_MS, self.revisar_cambios_catalogo)
+    
+    def on_destruir_ventana(self, event):
+        """Deja de recibir cambios del catálogo al cerrar la ventana"""
+        if event.widget is self.ventana:
+            catalogo.cancelar_suscripcion(self.on_cambio_catalogo)
+            self.ventana.after_cancel(self._revision_cambios)
+    
+    def sincronizar_listas(self):
+        """
+        Aplica a las listas de productos e ingredientes solo los cambios del catálogo
+        posteriores a la última sincronización (no hace nada si no hubo cambios)
+        """
+        generacion = catalogo.obtener_generacion()
+        if generacion == self._generacion_listas:
+            return
+        eventos = catalogo.obtener_cambios_desde(self._generacion_listas)
+        self._generacion_listas = generacion
+        
+        if eventos is None or any(evento.tipo == catalogo.RECARGA for evento in eventos):
+            self.cargar_lista_productos()
+            self.cargar_lista_ingredientes()
+            return
+        
+        ids_productos = []
+        ids_ingredientes = []
+        for evento in eventos:
+            if evento.tipo in (catalogo.PRODUCTO_AGREGADO, catalogo.PRODUCTO_MODIFICADO, catalogo.PRODUCTO_ELIMINADO):
+                if evento.id not in ids_productos:
+                    ids_productos.append(evento.id)
+            elif evento.id not in ids_ingredientes:
+                ids_ingredientes.append(evento.id)
+        
+        if ids_productos:
+            self.actualizar_filas_productos(ids_productos)
+            # Puede haber cambiado cuántos productos usan cada ingrediente
+            self.actualizar_uso_ingredientes()
+        if ids_ingredientes:
+            self.actualizar_filas_ingredientes(ids_ingredientes)
     
     def crear_ventana(self):
         """Crea y configura la ventana de administración"""
@@ -129,7 +196,7 @@ class VentanaAdministracion:
             width=15
         )
         combo_filtro.grid(row=0, column=1, padx=5, sticky='w')
-        combo_filtro.bind('<<ComboboxSelected>>', lambda e: self.cargar_lista_productos())
+        combo_filtro.bind('<<ComboboxSelected>>', lambda e: self.filtrar_lista_productos())
         
         # Buscador
         ttk.Label(frame_filtros, text="🔍 Buscar:").grid(row=0, column=2, padx=(10, 5))
@@ -141,7 +208,7 @@ class VentanaAdministracion:
         )
         entry_buscador.grid(row=0, column=3, padx=5, sticky='ew')
         # Filtrar mientras se escribe
-        self.var_buscador.trace_add('write', lambda *args: self.cargar_lista_productos())
+        self.var_buscador.trace_add('write', lambda *args: self.filtrar_lista_productos())
         
         # Treeview para lista de productos
         frame_tree = ttk.Frame(frame_lista)
@@ -426,41 +493,101 @@ class VentanaAdministracion:
         combo_categoria.bind('<<ComboboxSelected>>', self.on_categoria_changed)
     
     def cargar_lista_productos(self):
-        """Carga la lista de productos en el treeview"""
-        # Limpiar treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Obtener productos
-        productos = obtener_todos_los_productos()
+        """
+        Vuelve a armar todas las filas del treeview (una por producto del catálogo) y aplica
+        el filtro; filtrar después solo oculta y vuelve a mostrar filas ya creadas
+        """
+        # Limpiar treeview (también las filas ocultas por el filtro)
+        existentes = [iid for iid in self._filas_productos if self.tree.exists(iid)]
+        if existentes:
+            self.tree.delete(*existentes)
+        self._filas_productos = set()
+        
+        # Agregar productos al treeview (el iid de cada fila es el ID del producto)
+        indice = obtener_indice()
+        for producto, categoria in zip(indice.productos, indice.categorias):
+            iid = str(producto['id'])
+            self.tree.insert('', 'end', iid=iid, values=self.valores_fila_producto(producto, categoria))
+            self._filas_productos.add(iid)
+        
+        self.filtrar_lista_productos()
+    
+    def ids_filas_visibles(self):
+        """
+        iids de las filas que corresponden al filtro de categoría y al texto de búsqueda,
+        en el orden del catálogo (usa el índice de búsqueda compartido con Selección)
+        """
+        texto_busqueda = self.var_buscador.get().strip()
+        if texto_busqueda:
+            indice, exactas = self._busqueda_productos.coincidencias_exactas(texto_busqueda)
+            posiciones = sorted(exactas)
+        else:
+            indice = obtener_indice()
+            posiciones = range(len(indice.productos))
         
         # Filtrar por categoría si es necesario
         filtro_categoria = self.var_filtro_categoria.get()
         if filtro_categoria != "Todas":
-            productos = [p for p in productos if p["categoria"] == filtro_categoria]
+            posiciones = [posicion for posicion in posiciones if indice.categorias[posicion] == filtro_categoria]
         
-        # Filtrar por texto de búsqueda si existe
-        texto_busqueda = self.var_buscador.get().strip().lower()
-        if texto_busqueda:
-            productos = [
-                p for p in productos
-                if texto_busqueda in p['nombre'].lower()
-                or texto_busqueda in p.get('descripcion', '').lower()
-            ]
+        return [str(indice.productos[posicion]['id']) for posicion in posiciones]
+    
+    def filtrar_lista_productos(self):
+        """
+        Aplica el filtro comparando las filas visibles con las que corresponden: oculta
+        (detach) las que sobran y vuelve a mostrar en su lugar las que faltan, sin borrar
+        ni volver a crear filas
+        """
+        visibles = self.ids_filas_visibles()
+        actuales = self.tree.get_children()
+        if list(actuales) == visibles:
+            return
         
-        # Agregar productos al treeview
-        for producto in productos:
-            self.tree.insert(
-                '',
-                'end',
-                values=(
-                    producto['id'],
-                    producto['categoria'],
-                    producto['nombre'],
-                    f"${producto['precio']:,.2f}",
-                    producto.get('descripcion', '')
-                )
-            )
+        ids_visibles = set(visibles)
+        ocultar = [iid for iid in actuales if iid not in ids_visibles]
+        if ocultar:
+            self.tree.detach(*ocultar)
+        
+        # Las filas que quedan y las que corresponden están en el orden del catálogo:
+        # alcanza con ubicar las que faltan, de arriba hacia abajo
+        mostradas = set(actuales).difference(ocultar)
+        for posicion, iid in enumerate(visibles):
+            if iid not in mostradas:
+                self.tree.move(iid, '', posicion)
+    
+    def valores_fila_producto(self, producto, categoria):
+        """Valores de la fila de un producto en el treeview"""
+        return (
+            producto['id'],
+            categoria,
+            producto['nombre'],
+            f"${producto['precio']:,.2f}",
+            producto['descripcion']
+        )
+    
+    def actualizar_filas_productos(self, ids_productos):
+        """Actualiza, agrega o quita solo las filas de los productos indicados y vuelve a filtrar"""
+        indice = obtener_indice()
+        for producto_id in ids_productos:
+            iid = str(producto_id)
+            posicion = indice.obtener_posicion(producto_id)
+            
+            if posicion is None:
+                if self.tree.exists(iid):
+                    self.tree.delete(iid)
+                self._filas_productos.discard(iid)
+                continue
+            
+            valores = self.valores_fila_producto(indice.productos[posicion], indice.categorias[posicion])
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=valores)
+            else:
+                self.tree.insert('', 'end', iid=iid, values=valores)
+                self._filas_productos.add(iid)
+            # Se oculta y el filtro la vuelve a ubicar (pudo cambiar de categoría o de texto)
+            self.tree.detach(iid)
+        
+        self.filtrar_lista_productos()
     
     def on_seleccionar_producto(self, event):
         """Callback cuando se selecciona un producto en la lista"""
@@ -571,7 +698,7 @@ class VentanaAdministracion:
                     messagebox.showwarning("Advertencia", f"Producto guardado pero error al guardar imagen: {str(e)}")
             
             messagebox.showinfo("Éxito", "Producto agregado correctamente")
-            self.cargar_lista_productos()
+            self.sincronizar_listas()
             self.limpiar_formulario()
             
             # Notificar actualización
@@ -612,7 +739,7 @@ class VentanaAdministracion:
         try:
             if modificar_producto(producto_id, categoria, nombre, precio, descripcion, ruta_imagen):
                 messagebox.showinfo("Éxito", "Producto modificado correctamente")
-                self.cargar_lista_productos()
+                self.sincronizar_listas()
                 
                 # Preparar formulario para crear un nuevo producto
                 self.nuevo_producto()
@@ -643,7 +770,7 @@ class VentanaAdministracion:
         try:
             if eliminar_producto(self.producto_seleccionado['id']):
                 messagebox.showinfo("Éxito", "Producto eliminado correctamente")
-                self.cargar_lista_productos()
+                self.sincronizar_listas()
                 self.limpiar_formulario()
                 
                 # Notificar actualización
@@ -680,7 +807,7 @@ class VentanaAdministracion:
         # Treeview
         self.tree_ingredientes = ttk.Treeview(
             frame_tree,
-            columns=('ID', 'Nombre', 'Categorías', 'Precio Extra', 'Precio Resta'),
+            columns=('ID', 'Nombre', 'Categorías', 'Precio Extra', 'Precio Resta', 'Usado en'),
             show='headings',
             yscrollcommand=scrollbar.set,
             selectmode='browse'
@@ -693,12 +820,14 @@ class VentanaAdministracion:
         self.tree_ingredientes.heading('Categorías', text='Categorías')
         self.tree_ingredientes.heading('Precio Extra', text='Precio Extra')
         self.tree_ingredientes.heading('Precio Resta', text='Precio Resta')
+        self.tree_ingredientes.heading('Usado en', text='Usado en')
         
         self.tree_ingredientes.column('ID', width=0, stretch=False)  # Ocultar
         self.tree_ingredientes.column('Nombre', width=200)
         self.tree_ingredientes.column('Categorías', width=250)
         self.tree_ingredientes.column('Precio Extra', width=120)
         self.tree_ingredientes.column('Precio Resta', width=120)
+        self.tree_ingredientes.column('Usado en', width=110)
         
         self.tree_ingredientes.grid(row=0, column=0, sticky='nsew')
         self.tree_ingredientes.bind('<<TreeviewSelect>>', self.on_seleccionar_ingrediente)
@@ -880,24 +1009,49 @@ class VentanaAdministracion:
         for item in self.tree_ingredientes.get_children():
             self.tree_ingredientes.delete(item)
         
-        # Obtener ingredientes
-        ingredientes = obtener_todos_los_ingredientes()
-        
-        # Agregar ingredientes al treeview
-        for ingrediente in ingredientes:
-            categorias_str = ", ".join(ingrediente.get("categorias", []))
+        # Agregar ingredientes al treeview (el iid de cada fila es el ID del ingrediente)
+        for ingrediente in obtener_todos_los_ingredientes():
             self.tree_ingredientes.insert(
                 '',
                 'end',
-                values=(
-                    ingrediente['id'],
-                    ingrediente['nombre'],
-                    categorias_str,
-                    f"${ingrediente['precio_extra']:.2f}",
-                    f"${ingrediente['precio_resta']:.2f}"
-                )
+                iid=str(ingrediente['id']),
+                values=self.valores_fila_ingrediente(ingrediente)
             )
     
+    def valores_fila_ingrediente(self, ingrediente):
+        """Valores de la fila de un ingrediente en el treeview"""
+        categorias_str = ", ".join(ingrediente.get("categorias", []))
+        return (
+            ingrediente['id'],
+            ingrediente['nombre'],
+            categorias_str,
+            f"${ingrediente['precio_extra']:.2f}",
+            f"${ingrediente['precio_resta']:.2f}",
+            f"{contar_productos_con_ingrediente(ingrediente['nombre'])} productos"
+        )
+    
+    def actualizar_filas_ingredientes(self, ids_ingredientes):
+        """Actualiza, agrega o quita solo las filas de los ingredientes indicados"""
+        for ingrediente_id in ids_ingredientes:
+            iid = str(ingrediente_id)
+            ingrediente = buscar_ingrediente_por_id(ingrediente_id)
+            if ingrediente is None:
+                if self.tree_ingredientes.exists(iid):
+                    self.tree_ingredientes.delete(iid)
+            elif self.tree_ingredientes.exists(iid):
+                self.tree_ingredientes.item(iid, values=self.valores_fila_ingrediente(ingrediente))
+            else:
+                # Los ingredientes nuevos se agregan al final del catálogo
+                self.tree_ingredientes.insert('', 'end', iid=iid, values=self.valores_fila_ingrediente(ingrediente))
+    
+    def actualizar_uso_ingredientes(self):
+        """Actualiza la columna 'Usado en' (solo las filas cuyo valor cambió)"""
+        for iid in self.tree_ingredientes.get_children():
+            nombre = self.tree_ingredientes.set(iid, 'Nombre')
+            uso = f"{contar_productos_con_ingrediente(nombre)} productos"
+            if self.tree_ingredientes.set(iid, 'Usado en') != uso:
+                self.tree_ingredientes.set(iid, 'Usado en', uso)
+    
     def on_seleccionar_ingrediente(self, event):
         """Callback cuando se selecciona un ingrediente en la lista"""
         seleccion = self.tree_ingredientes.selection()
@@ -1020,7 +1174,7 @@ class VentanaAdministracion:
                     messagebox.showwarning("Advertencia", f"Ingrediente guardado pero error al guardar imagen: {str(e)}")
             
             messagebox.showinfo("Éxito", "Ingrediente agregado correctamente")
-            self.cargar_lista_ingredientes()
+            self.sincronizar_listas()
             self.limpiar_formulario_ingrediente()
         except Exception as e:
             messagebox.showerror("Error", f"Error al agregar ingrediente: {str(e)}")
@@ -1057,7 +1211,7 @@ class VentanaAdministracion:
         try:
             if modificar_ingrediente(ingrediente_id, nombre, categorias, precio_extra, precio_resta, ruta_imagen):
                 messagebox.showinfo("Éxito", "Ingrediente modificado correctamente")
-                self.cargar_lista_ingredientes()
+                self.sincronizar_listas()
                 self.nuevo_ingrediente()
                 # Si hay un producto seleccionado, recargar sus ingredientes para mostrar cambios
                 if self.producto_seleccionado:
@@ -1077,11 +1231,13 @@ class VentanaAdministracion:
             messagebox.showerror("Error", "Debe seleccionar un ingrediente")
             return
         
-        # Confirmar eliminación
-        respuesta = messagebox.askyesno(
-            "Confirmar Eliminación",
-            f"¿Está seguro de eliminar el ingrediente '{self.ingrediente_seleccionado['nombre']}'?"
-        )
+        # Confirmar eliminación (avisando si hay productos que lo usan)
+        nombre_ingrediente = self.ingrediente_seleccionado['nombre']
+        mensaje = f"¿Está seguro de eliminar el ingrediente '{nombre_ingrediente}'?"
+        cantidad_productos = contar_productos_con_ingrediente(nombre_ingrediente)
+        if cantidad_productos:
+            mensaje += f"\n\nSe quitará de {cantidad_productos} producto(s) que lo usan."
+        respuesta = messagebox.askyesno("Confirmar Eliminación", mensaje)
         
         if not respuesta:
             return
@@ -1089,7 +1245,7 @@ class VentanaAdministracion:
         try:
             if eliminar_ingrediente(self.ingrediente_seleccionado['id']):
                 messagebox.showinfo("Éxito", "Ingrediente eliminado correctamente")
-                self.cargar_lista_ingredientes()
+                self.sincronizar_listas()
                 self.limpiar_formulario_ingrediente()
             else:
                 messagebox.showerror("Error", "No se pudo eliminar el ingrediente")
@@ -1114,19 +1270,20 @@ class VentanaAdministracion:
         if not self.producto_seleccionado:
             return
         
-        # Importar función para buscar ingrediente por nombre
-        from utils.ingredientes import buscar_ingrediente_por_nombre
+        # Índice de ingredientes por nombre para obtener precios
+        from utils.ingredientes import obtener_ingredientes_por_nombre
+        ingredientes_por_nombre = obtener_ingredientes_por_nombre()
         
-        ingredientes = self.producto_seleccionado.get('ingredientes', [])
+        ingredientes = self.producto_seleccionado['ingredientes']
         for ingrediente in ingredientes:
-            nombre_ing = ingrediente.get('nombre', '')
-            cantidad_base_ing = ingrediente.get('cantidad_base', 1)
+            nombre_ing = ingrediente['nombre']
+            cantidad_base_ing = ingrediente['cantidad_base']
             
             # Buscar el ingrediente actualizado desde ingredientes.json para obtener precios
-            ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+            ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
             if ingrediente_actualizado:
-                precio_extra_ing = ingrediente_actualizado.get('precio_extra', 0.0)
-                precio_resta_ing = ingrediente_actualizado.get('precio_resta', 0.0)
+                precio_extra_ing = ingrediente_actualizado['precio_extra']
+                precio_resta_ing = ingrediente_actualizado['precio_resta']
             else:
                 # Si el ingrediente no existe, mostrar 0.0
                 precio_extra_ing = 0.0
@@ -3,7 +3,7 @@ Funciones auxiliares para gestionar ingredientes en productos
 """
 import tkinter as tk
 from tkinter import messagebox
-from utils.ingredientes import obtener_todos_los_ingredientes, buscar_ingrediente_por_nombre
+from utils.ingredientes import obtener_ingredientes_por_categoria, buscar_ingrediente_por_nombre
 from utils.productos import agregar_ingrediente_a_producto, eliminar_ingrediente_producto
 
 
@@ -13,13 +13,10 @@ def cargar_ingredientes_por_categoria(combo, categoria):
         combo['values'] = []
         return
     
-    todos_ingredientes = obtener_todos_los_ingredientes()
-    ingredientes_disponibles = []
-    
-    for ingrediente in todos_ingredientes:
-        categorias = ingrediente.get("categorias", [])
-        if categoria in categorias:
-            ingredientes_disponibles.append(ingrediente['nombre'])
+    # Lista precalculada por categoría: cambiar de categoría no recorre el catálogo
+    ingredientes_disponibles = [
+        ingrediente['nombre'] for ingrediente in obtener_ingredientes_por_categoria(categoria)
+    ]
     
     combo['values'] = ingredientes_disponibles
 
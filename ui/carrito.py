@@ -13,10 +13,14 @@ from PIL import Image, ImageTk
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from utils.orden import leer_numero_orden, incrementar_orden
 from utils.tickets import generar_tickets_pedido
-from utils.productos import calcular_precio_con_ingredientes
+from utils.precios import calcular_precios_lote, calcular_total_lote
 from utils.tickets import tiene_modificaciones_reales
-from utils.ingredientes import buscar_ingrediente_por_nombre
+from utils.ingredientes import obtener_ingredientes_por_nombre
+from utils.esquema_catalogo import normalizar_producto
+from utils.registros import Producto, LineaCarrito, IngredienteBase, producto_de_catalogo
+from utils.ventas import registrar_venta
 from utils.imagenes import obtener_ruta_completa_imagen, cargar_imagen_tkinter
+from utils import catalogo
 
 
 class Carrito(ttk.Frame):
@@ -24,10 +28,37 @@ class Carrito(ttk.Frame):
     
     def __init__(self, parent):
         super().__init__(parent)
-        self.items = []  # Lista de items en el carrito
+        self.items = []  # Lista de items en el carrito (LineaCarrito, ver utils.registros)
         self.numero_orden = leer_numero_orden()  # Cargar número de orden
+        self._generacion = catalogo.obtener_generacion()
         self.configurar_carrito()
     
+    def sincronizar_catalogo(self):
+        """
+        Vuelve a mostrar el carrito solo si un cambio del catálogo afecta sus precios:
+        cambios de ingredientes (precios de extras y restas) o de productos que están
+        en el carrito. Si el catálogo no cambió no hace nada.
+        """
+        generacion = catalogo.obtener_generacion()
+        if generacion == self._generacion:
+            return
+        eventos = catalogo.obtener_cambios_desde(self._generacion)
+        self._generacion = generacion
+        if not self.items:
+            return
+        
+        if eventos is None:
+            self.actualizar_vista()
+            return
+        
+        ids_carrito = {item.producto.id for item in self.items}
+        for evento in eventos:
+            if evento.tipo in (catalogo.PRODUCTO_AGREGADO, catalogo.PRODUCTO_MODIFICADO, catalogo.PRODUCTO_ELIMINADO):
+                if evento.id not in ids_carrito:
+                    continue
+            self.actualizar_vista()
+            return
+    
     def configurar_carrito(self):
         """Configura el diseño del carrito"""
         # Configurar estilo del frame y grid
@@ -182,29 +213,16 @@ class Carrito(ttk.Frame):
         from utils.productos import buscar_producto_por_id
         resultado = buscar_producto_por_id(producto['id'])
         if resultado:
-            # Usar el producto actualizado del JSON
-            producto_actualizado = resultado['producto'].copy()
-            producto_actualizado['categoria'] = resultado.get('categoria', '')
+            # Usar el producto actualizado del JSON (un solo Producto inmutable compartido
+            # por todos los items del mismo producto mientras el catálogo no cambie)
+            producto_actualizado = producto_de_catalogo(resultado['producto'], resultado['categoria'])
         else:
-            # Si no se encuentra, usar el producto original pero asegurar que tenga categoría
-            producto_actualizado = producto.copy()
-            if 'categoria' not in producto_actualizado:
-                producto_actualizado['categoria'] = ''
-        
-        # Siempre agregar un nuevo item base (sin modificaciones)
-        # Inicializar modificaciones_ingredientes: dict con {nombre_ingrediente: cantidad_actual}
-        modificaciones_ingredientes = {}
-        ingredientes = producto_actualizado.get("ingredientes", [])
-        for ingrediente in ingredientes:
-            nombre = ingrediente.get("nombre", "")
-            cantidad_base = ingrediente.get("cantidad_base", 1)
-            modificaciones_ingredientes[nombre] = cantidad_base
-        
-        self.items.append({
-            'producto': producto_actualizado,
-            'cantidad': cantidad,
-            'modificaciones_ingredientes': modificaciones_ingredientes
-        })
+            # Si no se encuentra, usar el producto original (normalizado como los del catálogo)
+            producto_actualizado = Producto.desde_dict(normalizar_producto(producto.copy()))
+        
+        # Siempre agregar un nuevo item base (sin modificaciones): cada ingrediente en su
+        # cantidad base, mapeo compartido por todos los items nuevos del producto
+        self.items.append(LineaCarrito.nueva(producto_actualizado, cantidad))
         self.actualizar_vista()
     
     def eliminar_item(self, item_idx):
@@ -219,21 +237,13 @@ class Carrito(ttk.Frame):
             if nueva_cantidad <= 0:
                 self.eliminar_item(item_idx)
             else:
-                self.items[item_idx]['cantidad'] = nueva_cantidad
+                self.items[item_idx] = self.items[item_idx].reemplazar(cantidad=nueva_cantidad)
             self.actualizar_vista()
     
     def calcular_total(self):
         """Calcula el total del carrito considerando modificaciones de ingredientes"""
-        total = 0
-        for item in self.items:
-            producto = item['producto']
-            cantidad = item['cantidad']
-            modificaciones = item.get('modificaciones_ingredientes', {})
-            
-            # Calcular precio unitario con ingredientes
-            precio_unitario = calcular_precio_con_ingredientes(producto, modificaciones)
-            total += precio_unitario * cantidad
-        return total
+        # Todos los items en un solo lote (una sola verificación del catálogo)
+        return calcular_total_lote(self.items)
     
     def actualizar_estilo_boton_confirmar(self):
         """Actualiza el estilo del botón de confirmar según el estado del carrito"""
@@ -336,6 +346,12 @@ class Carrito(ttk.Frame):
         # Configurar grid del frame de items para que ocupen todo el ancho
         self.frame_items.columnconfigure(0, weight=1)
         
+        # Índice de ingredientes por nombre (una sola consulta al catálogo por renderizado)
+        ingredientes_por_nombre = obtener_ingredientes_por_nombre()
+        
+        # Precios unitarios de todos los items en un solo lote
+        precios_unitarios = calcular_precios_lote(self.items)['precios_unitarios']
+        
         # Mostrar cada item
         for idx, item in enumerate(self.items):
             frame_item = ttk.Frame(self.frame_items, relief='raised', borderwidth=1)
@@ -349,25 +365,25 @@ class Carrito(ttk.Frame):
             
             ttk.Label(
                 info_frame,
-                text=item['producto']['nombre'],
+                text=item.producto.nombre,
                 font=('Arial', 10, 'bold')
             ).grid(row=0, column=0, sticky='w')
             
             # Calcular precio unitario y subtotal considerando ingredientes
-            modificaciones = item.get('modificaciones_ingredientes', {})
-            precio_unitario = calcular_precio_con_ingredientes(item['producto'], modificaciones)
-            subtotal = precio_unitario * item['cantidad']
+            modificaciones = item.modificaciones
+            precio_unitario = precios_unitarios[idx]
+            subtotal = precio_unitario * item.cantidad
             
             # Mostrar precio base y ajustes si hay modificaciones
-            precio_base = item['producto']['precio']
+            precio_base = item.producto.precio
             fila_precio = 1
             
             # Verificar si hay modificaciones reales (cambios en ingredientes, independientemente del precio)
-            tiene_modificaciones = tiene_modificaciones_reales(item['producto'], modificaciones)
+            tiene_modificaciones = tiene_modificaciones_reales(item.producto, modificaciones)
             
             # También verificar si hay ingredientes adicionales que no están en el producto
-            ingredientes = item['producto'].get('ingredientes', [])
-            ingredientes_producto_dict = {ing.get('nombre', '') for ing in ingredientes}
+            ingredientes = item.producto.ingredientes
+            ingredientes_producto_dict = {ing.nombre for ing in ingredientes}
             tiene_ingredientes_adicionales = any(
                 nombre_ing not in ingredientes_producto_dict and cantidad_actual > 0
                 for nombre_ing, cantidad_actual in modificaciones.items()
@@ -378,7 +394,7 @@ class Carrito(ttk.Frame):
                 if precio_unitario != precio_base:
                     ttk.Label(
                         info_frame,
-                        text=f"Base: ${precio_base:.2f} → ${precio_unitario:.2f} x {item['cantidad']} = ${subtotal:.2f}",
+                        text=f"Base: ${precio_base:.2f} → ${precio_unitario:.2f} x {item.cantidad} = ${subtotal:.2f}",
                         font=('Arial', 9),
                         foreground='#e67e22'
                     ).grid(row=fila_precio, column=0, sticky='w')
@@ -386,7 +402,7 @@ class Carrito(ttk.Frame):
                     # Precio no cambió pero hay modificaciones (impacto neto = 0)
                     ttk.Label(
                         info_frame,
-                        text=f"${precio_unitario:.2f} x {item['cantidad']} = ${subtotal:.2f} (modificado)",
+                        text=f"${precio_unitario:.2f} x {item.cantidad} = ${subtotal:.2f} (modificado)",
                         font=('Arial', 9),
                         foreground='#e67e22'
                     ).grid(row=fila_precio, column=0, sticky='w')
@@ -394,23 +410,17 @@ class Carrito(ttk.Frame):
                 # Mostrar detalle de ingredientes modificados (extras y quitados)
                 fila_detalle = fila_precio + 1
                 
-                # Importar función para buscar ingrediente por nombre
-                from utils.ingredientes import buscar_ingrediente_por_nombre
-                
-                # Crear diccionario de ingredientes del producto por nombre
-                ingredientes_producto_dict = {ing.get('nombre', ''): ing for ing in ingredientes}
-                
                 # Procesar ingredientes del producto
                 for ingrediente in ingredientes:
-                    nombre_ing = ingrediente.get('nombre', '')
-                    cantidad_base = ingrediente.get('cantidad_base', 1)
+                    nombre_ing = ingrediente.nombre
+                    cantidad_base = ingrediente.cantidad_base
                     cantidad_actual = modificaciones.get(nombre_ing, cantidad_base)
                     
                     # Buscar el ingrediente actualizado desde ingredientes.json para obtener precios
-                    ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                    ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                     if ingrediente_actualizado:
-                        precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
-                        precio_resta = ingrediente_actualizado.get('precio_resta', 0.0)
+                        precio_extra = ingrediente_actualizado['precio_extra']
+                        precio_resta = ingrediente_actualizado['precio_resta']
                     else:
                         # Si el ingrediente no existe, usar 0.0
                         precio_extra = 0.0
@@ -419,7 +429,7 @@ class Carrito(ttk.Frame):
                     if cantidad_actual > cantidad_base:
                         # Extras agregados
                         extras = cantidad_actual - cantidad_base
-                        precio_total_extra = precio_extra * extras * item['cantidad']
+                        precio_total_extra = precio_extra * extras * item.cantidad
                         if extras > 1:
                             texto_detalle = f"  {extras} Extra {nombre_ing} +${precio_total_extra:.2f}"
                         else:
@@ -435,7 +445,7 @@ class Carrito(ttk.Frame):
                     elif cantidad_actual < cantidad_base:
                         # Ingredientes quitados
                         quitados = cantidad_base - cantidad_actual
-                        precio_total_resta = precio_resta * quitados * item['cantidad']
+                        precio_total_resta = precio_resta * quitados * item.cantidad
                         if quitados > 1:
                             texto_detalle = f"  {quitados} Sin {nombre_ing} -${precio_total_resta:.2f}"
                         else:
@@ -453,14 +463,14 @@ class Carrito(ttk.Frame):
                 for nombre_ing, cantidad_actual in modificaciones.items():
                     if nombre_ing not in ingredientes_producto_dict and cantidad_actual > 0:
                         # Este es un ingrediente adicional que no está en el producto
-                        ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                        ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                         if ingrediente_actualizado:
-                            precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
+                            precio_extra = ingrediente_actualizado['precio_extra']
                         else:
                             precio_extra = 0.0
                         
                         # Mostrar siempre los ingredientes adicionales si tienen cantidad > 0, independientemente del precio
-                        precio_total_extra = precio_extra * cantidad_actual * item['cantidad']
+                        precio_total_extra = precio_extra * cantidad_actual * item.cantidad
                         if cantidad_actual > 1:
                             if precio_extra > 0:
                                 texto_detalle = f"  {cantidad_actual} Extra {nombre_ing} +${precio_total_extra:.2f}"
@@ -482,7 +492,7 @@ class Carrito(ttk.Frame):
             else:
                 ttk.Label(
                     info_frame,
-                    text=f"${precio_unitario:.2f} x {item['cantidad']} = ${subtotal:.2f}",
+                    text=f"${precio_unitario:.2f} x {item.cantidad} = ${subtotal:.2f}",
                     font=('Arial', 11),
                     foreground='gray'
                 ).grid(row=fila_precio, column=0, sticky='w')
@@ -496,17 +506,18 @@ class Carrito(ttk.Frame):
             
             # Botón editar ingredientes (a la izquierda del botón menos)
             # SOLO mostrar el botón si el producto tiene ingredientes definidos
-            ingredientes = item['producto'].get('ingredientes', [])
+            ingredientes = item.producto.ingredientes
             
             # Obtener categoría del producto si no está en el item (para uso futuro)
-            categoria = item['producto'].get('categoria', '')
+            categoria = item.producto.categoria
             if not categoria:
                 # Buscar la categoría del producto
                 from utils.productos import buscar_producto_por_id
-                resultado = buscar_producto_por_id(item['producto']['id'])
+                resultado = buscar_producto_por_id(item.producto.id)
                 if resultado:
                     categoria = resultado.get('categoria', '')
-                    item['producto']['categoria'] = categoria
+                    item = item.reemplazar(producto=item.producto.reemplazar(categoria=categoria))
+                    self.items[idx] = item
             
             # SOLO mostrar botón si tiene ingredientes (sin lógica hardcodeada)
             columna_actual = 0
@@ -525,14 +536,14 @@ class Carrito(ttk.Frame):
                 controles_frame,
                 text="-",
                 width=3,
-                command=lambda idx=item_index: self.actualizar_cantidad(idx, self.items[idx]['cantidad'] - 1)
+                command=lambda idx=item_index: self.actualizar_cantidad(idx, self.items[idx].cantidad - 1)
             )
             btn_menos.grid(row=0, column=columna_actual, padx=2)
             columna_actual += 1
             
             ttk.Label(
                 controles_frame,
-                text=str(item['cantidad']),
+                text=str(item.cantidad),
                 width=3
             ).grid(row=0, column=columna_actual, padx=2)
             columna_actual += 1
@@ -542,7 +553,7 @@ class Carrito(ttk.Frame):
                 controles_frame,
                 text="+",
                 width=3,
-                command=lambda idx=item_index: self.actualizar_cantidad(idx, self.items[idx]['cantidad'] + 1)
+                command=lambda idx=item_index: self.actualizar_cantidad(idx, self.items[idx].cantidad + 1)
             )
             btn_mas.grid(row=0, column=columna_actual, padx=2)
             columna_actual += 1
@@ -577,25 +588,21 @@ class Carrito(ttk.Frame):
         
         # Recargar el producto desde el JSON para obtener ingredientes actualizados
         from utils.productos import buscar_producto_por_id
-        resultado = buscar_producto_por_id(item['producto']['id'])
+        resultado = buscar_producto_por_id(item.producto.id)
         if resultado:
             # Actualizar el producto en el item con la versión más reciente
-            producto_actualizado = resultado['producto']
-            self.items[item_index]['producto'] = producto_actualizado
-            item = self.items[item_index]  # Actualizar referencia local
+            producto_actualizado = producto_de_catalogo(resultado['producto'], resultado['categoria'])
             # Si hay nuevos ingredientes, inicializar sus modificaciones
-            modificaciones = item.get('modificaciones_ingredientes', {})
-            ingredientes_actuales = producto_actualizado.get('ingredientes', [])
-            for ingrediente in ingredientes_actuales:
-                nombre = ingrediente.get('nombre', '')
-                if nombre not in modificaciones:
+            modificaciones = dict(item.modificaciones)
+            for ingrediente in producto_actualizado.ingredientes:
+                if ingrediente.nombre not in modificaciones:
                     # Inicializar con cantidad_base si es un ingrediente nuevo
-                    modificaciones[nombre] = ingrediente.get('cantidad_base', 1)
-            self.items[item_index]['modificaciones_ingredientes'] = modificaciones
-            item = self.items[item_index]  # Actualizar referencia local
+                    modificaciones[ingrediente.nombre] = ingrediente.cantidad_base
+            item = item.reemplazar(producto=producto_actualizado, modificaciones=modificaciones)
+            self.items[item_index] = item
         
-        producto = item['producto']
-        ingredientes = producto.get('ingredientes', [])
+        producto = item.producto
+        ingredientes = producto.ingredientes
         
         if not ingredientes or len(ingredientes) == 0:
             mensaje = "Este producto no tiene ingredientes configurables.\n\n"
@@ -608,7 +615,7 @@ class Carrito(ttk.Frame):
         
         # Crear ventana modal (diseño más simple)
         ventana = tk.Toplevel(self)
-        ventana.title(f"Editar Ingredientes - {producto['nombre']}")
+        ventana.title(f"Editar Ingredientes - {producto.nombre}")
         ventana.geometry("850x650")
         ventana.resizable(True, True)
         ventana.transient(self.winfo_toplevel())
@@ -635,7 +642,7 @@ class Carrito(ttk.Frame):
 
         ttk.Label(
             frame_principal,
-            text=producto['nombre'],
+            text=producto.nombre,
             font=('Arial', 12),
             foreground='gray'
         ).grid(row=1, column=0, pady=(0, 10))
@@ -669,7 +676,7 @@ class Carrito(ttk.Frame):
 
         # Variables para almacenar las cantidades actuales
         variables_cantidad = {}
-        modificaciones_actuales = item.get('modificaciones_ingredientes', {}).copy()
+        modificaciones_actuales = dict(item.modificaciones)
         # Lista para guardar referencias a los traces y poder eliminarlos
         traces_activos = []
 
@@ -681,7 +688,7 @@ class Carrito(ttk.Frame):
 
         label_precio_base = ttk.Label(
             frame_precio_total,
-            text=f"Precio base: ${producto['precio']:.2f}",
+            text=f"Precio base: ${producto.precio:.2f}",
             font=('Arial', 10)
         )
         label_precio_base.pack()
@@ -696,11 +703,12 @@ class Carrito(ttk.Frame):
 
         # Función para calcular precio total
         def actualizar_precio_total():
-            precio_base = producto.get('precio', 0.0)
+            precio_base = producto.precio
             ajuste_total = 0.0
 
             # Crear diccionario de ingredientes del producto por nombre para búsqueda rápida
-            ingredientes_producto_dict = {ing.get('nombre', ''): ing for ing in ingredientes}
+            ingredientes_producto_dict = {ing.nombre: ing for ing in ingredientes}
+            ingredientes_por_nombre = obtener_ingredientes_por_nombre()
 
             for nombre_ing, var in variables_cantidad.items():
                 if isinstance(nombre_ing, str):
@@ -708,16 +716,16 @@ class Carrito(ttk.Frame):
                     ingrediente_producto = ingredientes_producto_dict.get(nombre_ing)
                     
                     if ingrediente_producto:
-                        cantidad_base = ingrediente_producto.get('cantidad_base', 1)
+                        cantidad_base = ingrediente_producto.cantidad_base
                     else:
                         # Si no está en el producto, cantidad_base = 0
                         cantidad_base = 0
                     
                     # Obtener precios desde ingredientes.json
-                    ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                    ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                     if ingrediente_actualizado:
-                        precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
-                        precio_resta = ingrediente_actualizado.get('precio_resta', 0.0)
+                        precio_extra = ingrediente_actualizado['precio_extra']
+                        precio_resta = ingrediente_actualizado['precio_resta']
                     else:
                         precio_extra = 0.0
                         precio_resta = 0.0
@@ -744,7 +752,7 @@ class Carrito(ttk.Frame):
 
         # Detectar si hay ingredientes adicionales (que no están en el producto)
         # Si los hay, activar automáticamente "mostrar todos los ingredientes"
-        ingredientes_producto_nombres = {ing.get('nombre', '') for ing in ingredientes}
+        ingredientes_producto_nombres = {ing.nombre for ing in ingredientes}
         tiene_ingredientes_adicionales = False
         
         for nombre_ing, cantidad in modificaciones_actuales.items():
@@ -809,24 +817,20 @@ class Carrito(ttk.Frame):
                 todos_ingredientes_db = obtener_todos_los_ingredientes()
                 
                 # Crear un diccionario de ingredientes del producto por nombre para búsqueda rápida
-                ingredientes_producto_dict = {ing.get('nombre', ''): ing for ing in ingredientes}
+                ingredientes_producto_dict = {ing.nombre: ing for ing in ingredientes}
                 
                 # Combinar: primero los del producto, luego los demás
                 nombres_ya_agregados = set()
                 for ing_producto in ingredientes:
                     ingredientes_a_mostrar.append(ing_producto)
-                    nombres_ya_agregados.add(ing_producto.get('nombre', ''))
+                    nombres_ya_agregados.add(ing_producto.nombre)
                 
                 # Agregar los que no están en el producto (con cantidad_base = 0)
                 for ing_db in todos_ingredientes_db:
-                    nombre_ing = ing_db.get('nombre', '')
+                    nombre_ing = ing_db['nombre']
                     if nombre_ing not in nombres_ya_agregados:
                         # Crear un ingrediente con cantidad_base = 0 para los que no están en el producto
-                        ing_adicional = {
-                            'nombre': nombre_ing,
-                            'cantidad_base': 0
-                        }
-                        ingredientes_a_mostrar.append(ing_adicional)
+                        ingredientes_a_mostrar.append(IngredienteBase(nombre_ing, 0))
             else:
                 # Mostrar solo los ingredientes del producto
                 ingredientes_a_mostrar = ingredientes
@@ -852,15 +856,16 @@ class Carrito(ttk.Frame):
                 if isinstance(nombre_ing, str):
                     variables_cantidad_por_nombre[nombre_ing] = var
             
+            ingredientes_por_nombre = obtener_ingredientes_por_nombre()
             for idx, ingrediente in enumerate(ingredientes_a_mostrar):
-                nombre = ingrediente.get('nombre', '')
-                cantidad_base = ingrediente.get('cantidad_base', 0 if mostrar_todos_ingredientes.get() and nombre not in [ing.get('nombre', '') for ing in ingredientes] else ingrediente.get('cantidad_base', 1))
+                nombre = ingrediente.nombre
+                cantidad_base = ingrediente.cantidad_base
                 
                 # Obtener precios desde ingredientes.json (no desde el producto)
-                ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre)
+                ingrediente_actualizado = ingredientes_por_nombre.get(nombre)
                 if ingrediente_actualizado:
-                    precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
-                    precio_resta = ingrediente_actualizado.get('precio_resta', 0.0)
+                    precio_extra = ingrediente_actualizado['precio_extra']
+                    precio_resta = ingrediente_actualizado['precio_resta']
                 else:
                     precio_extra = 0.0
                     precio_resta = 0.0
@@ -1039,7 +1044,7 @@ class Carrito(ttk.Frame):
             
             # Convertir modificaciones a formato por nombre
             # Crear diccionario de ingredientes del producto por nombre
-            ingredientes_producto_dict = {ing.get('nombre', ''): ing for ing in ingredientes}
+            ingredientes_producto_dict = {ing.nombre: ing for ing in ingredientes}
             modificaciones_por_nombre = {}
             
             for nombre_ing, var in variables_cantidad.items():
@@ -1051,7 +1056,7 @@ class Carrito(ttk.Frame):
                     ingrediente_producto = ingredientes_producto_dict.get(nombre_ing)
                     
                     if ingrediente_producto:
-                        cantidad_base = ingrediente_producto.get('cantidad_base', 1)
+                        cantidad_base = ingrediente_producto.cantidad_base
                         # Guardar siempre los ingredientes del producto
                         modificaciones_por_nombre[nombre_ing] = cantidad_actual
                     else:
@@ -1060,7 +1065,7 @@ class Carrito(ttk.Frame):
                             modificaciones_por_nombre[nombre_ing] = cantidad_actual
             
             # Actualizar el item usando el índice para asegurar que es el correcto
-            self.items[item_index]['modificaciones_ingredientes'] = modificaciones_por_nombre
+            self.items[item_index] = self.items[item_index].reemplazar(modificaciones=modificaciones_por_nombre)
             self.actualizar_vista()
             ventana.destroy()
         
@@ -1550,13 +1555,19 @@ class Carrito(ttk.Frame):
             'hora_estimada': hora_estimada_final,
             'forma_pago': forma_pago,
             'estado_pago': estado_pago,
-            'items': self.items.copy(),
+            'items': tuple(self.items),  # Las líneas son inmutables: se comparten sin copiarlas
             'total': total
         }
         
         # Cerrar ventana de confirmación
         ventana.destroy()
         
+        # Sumar las ventas para ordenar la búsqueda por popularidad
+        try:
+            registrar_venta(pedido_info['items'])
+        except Exception as e:
+            print(f"Advertencia: No se pudieron registrar las ventas del pedido: {e}")
+        
         # Generar tickets (COCINA y CLIENTE) e imprimir automáticamente
         # Los tickets se imprimen directamente usando Win32Raw sin previsualización
         try:
@@ -10,34 +10,131 @@ import threading
 
 # Agregar el directorio raíz al path para importar módulos
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from utils.productos import cargar_productos
+from utils.productos import (
+    buscar_producto_por_id, obtener_nombres_categorias, obtener_productos_categoria
+)
+from utils.busqueda import buscar_productos, BusquedaIncremental
 from utils.imagenes import cargar_imagen_tkinter
+from utils import catalogo
 
 
+# Espera (en ms) desde la última tecla antes de buscar: una ráfaga de teclas hace una sola búsqueda
+DEMORA_BUSQUEDA_MS = 150
+
+# Productos que se arman por vez al mostrar una lista; el resto se arma en los siguientes
+# ciclos de Tk, así una tecla nueva puede cancelar una lista que todavía se está armando
+PRODUCTOS_POR_LOTE = 15
+
 class Seleccion(ttk.Frame):
     """Frame central para selección de productos"""
     
     def __init__(self, parent):
         super().__init__(parent)
-        self.productos_data = self.cargar_productos()
+        self._generacion = catalogo.obtener_generacion()
         self.categoria_actual = None
         self._imagenes_productos = []  # Lista para mantener referencias de imágenes
         self._imagenes_cargando = {}  # Dict para rastrear qué imágenes se están cargando
+        self._nombres_categorias = []  # Categorías con botón
+        self._widgets_productos = {}  # producto_id -> widgets del producto mostrado
+        self._busqueda = BusquedaIncremental()  # Filtra los resultados anteriores al seguir escribiendo
+        self._texto_buscado = ""  # Texto de la última búsqueda mostrada
+        self._busqueda_programada = None  # after() pendiente de la búsqueda
+        self._lote_programado = None  # after() pendiente del siguiente lote de productos
+        self._numero_lista = 0  # Se incrementa con cada lista mostrada (las anteriores quedan canceladas)
         self.configurar_seleccion()
     
     def recargar_productos(self):
         """Recarga los productos desde el archivo JSON"""
-        self.productos_data = self.cargar_productos()
+        self._generacion = catalogo.obtener_generacion()
         self.cargar_categorias()
         # Si hay una categoría actual, recargarla
         if self.categoria_actual:
             self.mostrar_productos(self.categoria_actual)
-        elif self.productos_data.get("categorias"):
-            self.mostrar_productos(self.productos_data["categorias"][0]["nombre"])
+        elif self._nombres_categorias:
+            self.mostrar_productos(self._nombres_categorias[0])
+    
+    def sincronizar_catalogo(self):
+        """
+        Aplica solo los cambios del catálogo posteriores a la última sincronización:
+        actualiza en su lugar los productos mostrados que cambiaron y vuelve a armar la
+        lista únicamente si entra, sale o se mueve un producto de la vista actual.
+        Si el catálogo no cambió no hace nada.
+        """
+        generacion = catalogo.obtener_generacion()
+        if generacion == self._generacion:
+            return
+        eventos = catalogo.obtener_cambios_desde(self._generacion)
+        
+        if eventos is None or any(evento.tipo == catalogo.RECARGA for evento in eventos):
+            self.recargar_productos()
+            return
+        self._generacion = generacion
+        
+        ids_productos = []
+        for evento in eventos:
+            # Los cambios de ingredientes no modifican lo que se muestra aquí
+            if evento.tipo in (catalogo.PRODUCTO_AGREGADO, catalogo.PRODUCTO_MODIFICADO, catalogo.PRODUCTO_ELIMINADO):
+                if evento.id not in ids_productos:
+                    ids_productos.append(evento.id)
+        if not ids_productos:
+            return
+        
+        if obtener_nombres_categorias() != self._nombres_categorias:
+            self.cargar_categorias()
+        
+        # Una sola búsqueda para todos los productos que cambiaron
+        ids_busqueda = self.ids_busqueda_actual()
+        rearmar_vista = False
+        for producto_id in ids_productos:
+            resultado = buscar_producto_por_id(producto_id)
+            en_vista = resultado is not None and self.producto_en_vista(
+                resultado['producto'], resultado['categoria'], ids_busqueda
+            )
+            widgets = self._widgets_productos.get(producto_id)
+            
+            if widgets is None:
+                # Un producto que no se mostraba: solo importa si ahora entra en la vista
+                rearmar_vista = rearmar_vista or en_vista
+            elif not en_vista or widgets['imagen'] != resultado['producto'].get("imagen"):
+                rearmar_vista = True
+            else:
+                self.actualizar_widgets_producto(widgets, resultado['producto'])
+        
+        if rearmar_vista:
+            self.mostrar_vista_actual()
+    
+    def ids_busqueda_actual(self):
+        """IDs de los resultados de la búsqueda en curso, o None si no se está buscando"""
+        busqueda = self.entry_buscador.get().strip()
+        if not busqueda:
+            return None
+        return {encontrado["id"] for encontrado in buscar_productos(busqueda)}
+    
+    def producto_en_vista(self, producto, categoria_nombre, ids_busqueda):
+        """
+        Indica si un producto corresponde a lo que se está mostrando (búsqueda o categoría)
+        
+        Args:
+            ids_busqueda: Resultado de ids_busqueda_actual() (None si no se está buscando)
+        """
+        if ids_busqueda is not None:
+            return producto["id"] in ids_busqueda
+        return categoria_nombre == self.categoria_actual
+    
+    def mostrar_vista_actual(self):
+        """Vuelve a mostrar la búsqueda en curso o la categoría actual"""
+        if self.entry_buscador.get().strip():
+            self.on_buscar()
+        elif self.categoria_actual:
+            self.mostrar_productos(self.categoria_actual)
+        elif self._nombres_categorias:
+            self.mostrar_productos(self._nombres_categorias[0])
     
-    def cargar_productos(self):
-        """Carga los productos desde el archivo JSON usando el módulo de productos"""
-        return cargar_productos()
+    def actualizar_widgets_producto(self, widgets, producto):
+        """Actualiza los textos de un producto ya mostrado (sin volver a armar la lista)"""
+        widgets['nombre'].config(text=producto["nombre"])
+        widgets['descripcion'].config(text=producto["descripcion"])
+        widgets['precio'].config(text=f"${producto['precio']:,.2f}")
     
     def configurar_seleccion(self):
         """Configura el diseño de la sección de selección"""
@@ -58,7 +155,7 @@ class Seleccion(ttk.Frame):
         
         self.entry_buscador = ttk.Entry(frame_buscador, width=30)
         self.entry_buscador.grid(row=0, column=1, sticky='ew', padx=5)
-        self.entry_buscador.bind('<KeyRelease>', self.on_buscar)
+        self.entry_buscador.bind('<KeyRelease>', self.programar_busqueda)
         # Frame para categorías
         frame_categorias = ttk.LabelFrame(self, text="Categorías", padding=10)
         frame_categorias.grid(row=1, column=0, sticky='ew', padx=10, pady=5)
@@ -132,15 +229,16 @@ class Seleccion(ttk.Frame):
         frame_productos.rowconfigure(0, weight=1)
         
         # Cargar productos de la primera categoría por defecto
-        if self.productos_data.get("categorias"):
-            self.mostrar_productos(self.productos_data["categorias"][0]["nombre"])
+        if self._nombres_categorias:
+            self.mostrar_productos(self._nombres_categorias[0])
     
     def cargar_categorias(self):
         """Carga los botones de categorías en dos filas responsivas"""
         for widget in self.frame_categorias_btns.winfo_children():
             widget.destroy()
         
-        categorias = self.productos_data.get("categorias", [])
+        categorias = obtener_nombres_categorias()
+        self._nombres_categorias = categorias
         
         if not categorias:
             return
@@ -160,24 +258,24 @@ class Seleccion(ttk.Frame):
             self.frame_categorias_btns.rowconfigure(i, weight=1)
         
         # Distribuir categorías en filas
-        for idx, categoria in enumerate(categorias):
+        for idx, nombre_categoria in enumerate(categorias):
             # Calcular fila y columna
             fila = idx // num_columnas
             columna = idx % num_columnas
             
             # Comportamiento especial para "Otros"
-            if categoria["nombre"].lower() == "personalizados":
+            if nombre_categoria.lower() == "personalizados":
                 btn = ttk.Button(
                     self.frame_categorias_btns,
-                    text=categoria["nombre"],
+                    text=nombre_categoria,
                     command=self.mostrar_ventana_producto_personalizado,
                     width=15
                 )
             else:
                 btn = ttk.Button(
                     self.frame_categorias_btns,
-                    text=categoria["nombre"],
-                    command=lambda c=categoria["nombre"]: self.mostrar_productos(c),
+                    text=nombre_categoria,
+                    command=lambda c=nombre_categoria: self.mostrar_productos(c),
                     width=15
                 )
             btn.grid(row=fila, column=columna, sticky='ew', padx=5, pady=5)
@@ -198,24 +296,30 @@ class Seleccion(ttk.Frame):
         self.canvas_productos.update_idletasks()
         self.canvas_productos.configure(scrollregion=self.canvas_productos.bbox("all"))
         
-        # Buscar la categoría
-        categoria = None
-        for cat in self.productos_data.get("categorias", []):
-            if cat["nombre"] == categoria_nombre:
-                categoria = cat
-                break
+        # Buscar la categoría (con el catálogo particionado se lee solo su archivo)
+        productos = obtener_productos_categoria(categoria_nombre)
         
-        if not categoria:
+        if productos is None:
             return
         
         # Mostrar productos de la categoría
-        self.mostrar_lista_productos(categoria.get("productos", []))
+        self.mostrar_lista_productos(productos)
     
     def mostrar_lista_productos(self, productos):
-        """Muestra una lista de productos (usado tanto para categorías como para búsqueda)"""
+        """
+        Muestra una lista de productos (usado tanto para categorías como para búsqueda)
+        Los productos se arman de a PRODUCTOS_POR_LOTE; mostrar otra lista cancela los
+        lotes pendientes de la anterior.
+        """
+        self._numero_lista += 1
+        if self._lote_programado is not None:
+            self.after_cancel(self._lote_programado)
+            self._lote_programado = None
+        
         # Limpiar productos actuales
         for widget in self.frame_productos.winfo_children():
             widget.destroy()
+        self._widgets_productos.clear()
         
         # Limpiar referencias de imágenes anteriores
         self._imagenes_productos.clear()
@@ -228,80 +332,109 @@ class Seleccion(ttk.Frame):
         # Configurar grid del frame de productos para que ocupen todo el ancho
         self.frame_productos.columnconfigure(0, weight=1)
         
+        self.mostrar_lote_productos(productos, 0, self._numero_lista)
+    
+    def mostrar_lote_productos(self, productos, inicio, numero_lista):
+        """Arma el siguiente lote de productos de una lista y programa el resto"""
+        self._lote_programado = None
+        if numero_lista != self._numero_lista:
+            return  # Ya se está mostrando otra lista
+        
+        fin = min(inicio + PRODUCTOS_POR_LOTE, len(productos))
+        for idx in range(inicio, fin):
+            self.mostrar_producto(idx, productos[idx], numero_lista)
+        
+        if fin < len(productos):
+            self._lote_programado = self.after(
+                1, lambda: self.mostrar_lote_productos(productos, fin, numero_lista)
+            )
+    
+    def mostrar_producto(self, idx, producto, numero_lista):
+        """Arma la fila de un producto en la posición idx de la lista"""
         # Tamaño fijo para las imágenes (cuadrado 80x80 píxeles)
         TAMANO_IMAGEN = 80
         
-        # Mostrar productos
-        for idx, producto in enumerate(productos):
-            frame_producto = ttk.Frame(self.frame_productos, relief='raised', borderwidth=1)
-            frame_producto.grid(row=idx, column=0, sticky='ew', padx=5, pady=5)
-            frame_producto.columnconfigure(1, weight=1)  # Columna de información con peso
-            
-            # Frame para imagen (tamaño fijo a la izquierda)
-            frame_imagen = tk.Frame(frame_producto, width=TAMANO_IMAGEN, height=TAMANO_IMAGEN, bg='#d3d3d3', relief='sunken', borderwidth=1)
-            frame_imagen.grid(row=0, column=0, padx=5, pady=5, sticky='nw')
-            frame_imagen.grid_propagate(False)  # Mantener tamaño fijo
-            frame_imagen.pack_propagate(False)
-            
-            # Label para imagen (siempre ocupa el mismo espacio)
-            label_imagen = tk.Label(
-                frame_imagen,
-                text="Cargando...",
-                font=('Arial', 8),
-                foreground='gray',
-                background='#d3d3d3',
-                anchor='center',
-                justify='center'
-            )
-            label_imagen.pack(fill='both', expand=True)
-            
-            # Cargar imagen de forma diferida (lazy loading)
-            ruta_imagen = producto.get("imagen")
-            producto_id = producto.get("id", idx)
-            
-            if ruta_imagen:
-                # Marcar como cargando
-                self._imagenes_cargando[producto_id] = True
-                # Cargar imagen en thread separado
-                self.cargar_imagen_diferida(label_imagen, ruta_imagen, TAMANO_IMAGEN, producto_id)
-            else:
-                # No hay imagen, mostrar placeholder
-                label_imagen.config(text="Sin\nimagen")
-            
-            # Información del producto (se mueve a la derecha)
-            info_frame = ttk.Frame(frame_producto)
-            info_frame.grid(row=0, column=1, sticky='ew', padx=10, pady=5)
-            info_frame.columnconfigure(0, weight=1)
-            
-            ttk.Label(
-                info_frame,
-                text=producto["nombre"],
-                font=('Arial', 11, 'bold')
-            ).grid(row=0, column=0, sticky='w')
-            
-            ttk.Label(
-                info_frame,
-                text=producto.get("descripcion", ""),
-                font=('Arial', 10),
-                foreground='gray'
-            ).grid(row=1, column=0, sticky='w')
-            
-            ttk.Label(
-                info_frame,
-                text=f"${producto['precio']:,.2f}",
-                font=('Arial', 12, 'bold'),
-                foreground='#27ae60'
-            ).grid(row=2, column=0, sticky='w')
-            
-            # Botón agregar
-            btn_agregar = ttk.Button(
-                frame_producto,
-                text="➕ Agregar",
-                command=lambda p=producto: self.on_agregar_producto(p)
-            )
-            btn_agregar.grid(row=0, column=2, padx=10, pady=5, sticky='e')
+        frame_producto = ttk.Frame(self.frame_productos, relief='raised', borderwidth=1)
+        frame_producto.grid(row=idx, column=0, sticky='ew', padx=5, pady=5)
+        frame_producto.columnconfigure(1, weight=1)  # Columna de información con peso
+        
+        # Frame para imagen (tamaño fijo a la izquierda)
+        frame_imagen = tk.Frame(frame_producto, width=TAMANO_IMAGEN, height=TAMANO_IMAGEN, bg='#d3d3d3', relief='sunken', borderwidth=1)
+        frame_imagen.grid(row=0, column=0, padx=5, pady=5, sticky='nw')
+        frame_imagen.grid_propagate(False)  # Mantener tamaño fijo
+        frame_imagen.pack_propagate(False)
+        
+        # Label para imagen (siempre ocupa el mismo espacio)
+        label_imagen = tk.Label(
+            frame_imagen,
+            text="Cargando...",
+            font=('Arial', 8),
+            foreground='gray',
+            background='#d3d3d3',
+            anchor='center',
+            justify='center'
+        )
+        label_imagen.pack(fill='both', expand=True)
+        
+        # Cargar imagen de forma diferida (lazy loading)
+        ruta_imagen = producto.get("imagen")
+        producto_id = producto.get("id", idx)
+        
+        if ruta_imagen:
+            # Marcar como cargando
+            self._imagenes_cargando[producto_id] = True
+            # Cargar imagen en thread separado
+            self.cargar_imagen_diferida(label_imagen, ruta_imagen, TAMANO_IMAGEN, producto_id, numero_lista)
+        else:
+            # No hay imagen, mostrar placeholder
+            label_imagen.config(text="Sin\nimagen")
+        
+        # Información del producto (se mueve a la derecha)
+        info_frame = ttk.Frame(frame_producto)
+        info_frame.grid(row=0, column=1, sticky='ew', padx=10, pady=5)
+        info_frame.columnconfigure(0, weight=1)
+        
+        label_nombre = ttk.Label(
+            info_frame,
+            text=producto["nombre"],
+            font=('Arial', 11, 'bold')
+        )
+        label_nombre.grid(row=0, column=0, sticky='w')
+        
+        label_descripcion = ttk.Label(
+            info_frame,
+            text=producto["descripcion"],
+            font=('Arial', 10),
+            foreground='gray'
+        )
+        label_descripcion.grid(row=1, column=0, sticky='w')
+        
+        label_precio = ttk.Label(
+            info_frame,
+            text=f"${producto['precio']:,.2f}",
+            font=('Arial', 12, 'bold'),
+            foreground='#27ae60'
+        )
+        label_precio.grid(row=2, column=0, sticky='w')
+        
+        # Guardar los widgets para actualizarlos si el producto cambia en el catálogo
+        if "id" in producto:
+            self._widgets_productos[producto["id"]] = {
+                'nombre': label_nombre,
+                'descripcion': label_descripcion,
+                'precio': label_precio,
+                'imagen': ruta_imagen
+            }
+        
+        # Botón agregar
+        btn_agregar = ttk.Button(
+            frame_producto,
+            text="➕ Agregar",
+            command=lambda p=producto: self.on_agregar_producto(p)
+        )
+        btn_agregar.grid(row=0, column=2, padx=10, pady=5, sticky='e')
     
-    def cargar_imagen_diferida(self, label_imagen, ruta_imagen, tamano, producto_id):
+    def cargar_imagen_diferida(self, label_imagen, ruta_imagen, tamano, producto_id, numero_lista=None):
         """
         Carga una imagen de forma diferida en un thread separado
         
@@ -310,9 +443,12 @@ class Seleccion(ttk.Frame):
             ruta_imagen: Ruta de la imagen a cargar
             tamano: Tamaño de la imagen (ancho y alto)
             producto_id: ID del producto para rastrear
+            numero_lista: Lista a la que pertenece el label (si ya se muestra otra, no se carga)
         """
         def cargar():
             """Función que se ejecuta en el thread separado"""
+            if numero_lista is not None and numero_lista != self._numero_lista:
+                return  # La lista se reemplazó antes de empezar a cargar
             try:
                 # Cargar la imagen
                 imagen_tk = cargar_imagen_tkinter(ruta_imagen, tamano, tamano)
@@ -340,6 +476,8 @@ class Seleccion(ttk.Frame):
     
     def actualizar_imagen_label(self, label_imagen, imagen_tk, producto_id):
         """Actualiza el label con la imagen cargada (se ejecuta en el thread principal)"""
+        if not label_imagen.winfo_exists():
+            return  # El producto ya no se muestra
         try:
             label_imagen.config(image=imagen_tk, text='', background='white')
             # Mantener referencia para evitar que se elimine por el garbage collector
@@ -350,7 +488,8 @@ class Seleccion(ttk.Frame):
     
     def actualizar_imagen_error(self, label_imagen, producto_id):
         """Actualiza el label cuando hay error al cargar la imagen"""
-        label_imagen.config(text="Sin\nimagen")
+        if label_imagen.winfo_exists():
+            label_imagen.config(text="Sin\nimagen")
     
     def on_agregar_producto(self, producto):
         """Callback cuando se agrega un producto al carrito"""
@@ -359,28 +498,41 @@ class Seleccion(ttk.Frame):
         if hasattr(self, 'callback_agregar_carrito'):
             self.callback_agregar_carrito(producto)
     
+    def programar_busqueda(self, event=None):
+        """
+        Callback cuando se escribe en el buscador: programa la búsqueda DEMORA_BUSQUEDA_MS
+        después de la última tecla (cada tecla reinicia la espera)
+        """
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+            self._busqueda_programada = None
+        
+        # Teclas que no cambian el texto (flechas, Shift...) no vuelven a buscar
+        if self.entry_buscador.get().strip() == self._texto_buscado:
+            return
+        self._busqueda_programada = self.after(DEMORA_BUSQUEDA_MS, self.on_buscar)
+    
     def on_buscar(self, event=None):
-        """Callback cuando se escribe en el buscador"""
-        busqueda = self.entry_buscador.get().strip().lower()
+        """Busca el texto del buscador y muestra los resultados"""
+        if self._busqueda_programada is not None:
+            self.after_cancel(self._busqueda_programada)
+            self._busqueda_programada = None
+        busqueda = self.entry_buscador.get().strip()
+        self._texto_buscado = busqueda
         
         # Si no hay búsqueda, mostrar la categoría actual
         if not busqueda:
+            self._busqueda.reiniciar()
             if self.categoria_actual:
                 self.mostrar_productos(self.categoria_actual)
-            elif self.productos_data.get("categorias"):
-                self.mostrar_productos(self.productos_data["categorias"][0]["nombre"])
+            elif self._nombres_categorias:
+                self.mostrar_productos(self._nombres_categorias[0])
             return
         
-        # Buscar en todos los productos de todas las categorías
-        productos_encontrados = []
-        for categoria in self.productos_data.get("categorias", []):
-            for producto in categoria.get("productos", []):
-                nombre = producto.get("nombre", "").lower()
-                descripcion = producto.get("descripcion", "").lower()
-                
-                # Buscar en nombre o descripción
-                if busqueda in nombre or busqueda in descripcion:
-                    productos_encontrados.append(producto)
+        # Buscar en el índice de todas las categorías (palabras sin acentos, tolera errores
+        # de tipeo; los más relevantes y vendidos primero). Si el texto extiende al de la
+        # búsqueda anterior, solo se filtran los resultados anteriores
+        productos_encontrados = self._busqueda.buscar(busqueda)
         
         # Mostrar productos encontrados
         self.mostrar_lista_productos(productos_encontrados)
@@ -509,7 +661,8 @@ class Seleccion(ttk.Frame):
             'id': -1,  # ID negativo para identificar productos personalizados
             'nombre': nombre.strip(),
             'precio': precio,
-            'descripcion': 'Producto personalizado'
+            'descripcion': 'Producto personalizado',
+            'ingredientes': []
         }
         
         # Agregar al carrito
@@ -0,0 +1,520 @@
+"""
+Módulo de búsqueda de productos con índice invertido
+El índice se arma una sola vez por generación del catálogo (ver catalogo.obtener_generacion):
+cada palabra del nombre y de la descripción de los productos, sin acentos y en minúsculas
+("Tomáte" -> "tomate"), apunta a los productos que la contienen. Las palabras se guardan
+ordenadas, así una palabra incompleta de la búsqueda ("hamb") se resuelve con una búsqueda
+binaria sobre el rango de palabras que empiezan así, sin recorrer los productos.
+
+Una búsqueda de varias palabras retorna los productos que tienen todas (cada una como
+palabra completa o como comienzo de una palabra), ordenados por relevancia:
+coincidencias en el nombre antes que en la descripción, palabras completas antes que
+comienzos, y los productos más vendidos (ver utils.ventas) para desempatar.
+
+Si faltan resultados (por ejemplo "hamburgesa" o "milaneza", mal escritas) se completan
+con una búsqueda aproximada por trigramas: cada palabra del índice se separa en grupos de
+3 letras ("  h", " ha", "ham", "amb"...) y las palabras de la búsqueda se comparan con las
+que comparten más trigramas. Los resultados aproximados van después de los exactos,
+ordenados por similitud combinada con la popularidad.
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+from utils import catalogo
+from utils.ventas import obtener_popularidad
+
+
+# Puntaje de cada palabra de la búsqueda según dónde coincide
+PUNTAJE_NOMBRE_EXACTO = 4
+PUNTAJE_NOMBRE_PREFIJO = 3
+PUNTAJE_DESCRIPCION_EXACTO = 2
+PUNTAJE_DESCRIPCION_PREFIJO = 1
+
+# Bonificación si el nombre empieza con la primera palabra de la búsqueda
+PUNTAJE_COMIENZO_NOMBRE = 2
+
+# Búsqueda aproximada: similitud mínima (coeficiente de Dice de los trigramas, 0 a 1) para
+# considerar que dos palabras coinciden, y largo mínimo de una palabra para buscarla así
+SIMILITUD_MINIMA = 0.5
+LARGO_MINIMO_APROXIMADO = 3
+
+# Peso de una coincidencia en la descripción respecto de una en el nombre
+PESO_DESCRIPCION = 0.7
+
+# Peso de la popularidad en el orden de los resultados aproximados (el resto es la similitud)
+PESO_POPULARIDAD = 0.2
+
+# Búsqueda incremental: costo de revisar un resultado anterior por cada palabra, medido en
+# elementos de los conjuntos del índice que se unen (revisar uno por uno es unas 20 veces más lento)
+COSTO_FILTRAR_CANDIDATO = 20
+
+# Cantidad de resultados que muestra el buscador
+LIMITE_RESULTADOS = 60
+
+_PATRON_PALABRA = re.compile(r"\w+")
+
+# Último carácter posible: "hamb" + _FIN_PREFIJO es mayor que cualquier palabra que empiece con "hamb"
+_FIN_PREFIJO = "\U0010ffff"
+
+
+def normalizar_texto(texto):
+    """Pasa un texto a minúsculas y le quita los acentos ("Tomáte" -> "tomate", "Ñandú" -> "nandu")"""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter)).casefold()
+
+
+def separar_palabras(texto):
+    """Retorna las palabras normalizadas de un texto, en orden"""
+    return _PATRON_PALABRA.findall(normalizar_texto(texto))
+
+
+def obtener_trigramas(palabra):
+    """Trigramas de una palabra normalizada, con espacios en los bordes ("pan" -> "  p", " pa", "pan", "an ")"""
+    relleno = f"  {palabra} "
+    return {relleno[inicio:inicio + 3] for inicio in range(len(relleno) - 2)}
+
+
+def _sumar(puntajes, posiciones, puntos):
+    """Suma puntos al puntaje de cada posición (Counter.update cuenta de a uno, en C)"""
+    for _ in range(puntos):
+        puntajes.update(posiciones)
+
+
+def _normalizar_popularidad(popularidad):
+    """Retorna una función producto_id -> popularidad entre 0 y 1 (escala logarítmica)"""
+    if not popularidad:
+        return lambda producto_id: 0.0
+    maximo = math.log1p(max(popularidad.values()))
+    if maximo <= 0:
+        return lambda producto_id: 0.0
+    return lambda producto_id: math.log1p(popularidad.get(producto_id, 0)) / maximo
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de los productos de una generación del catálogo
+
+    Atributos:
+        generacion: Generación del catálogo con la que se armó
+        productos: Productos en el orden del catálogo
+        categorias: Nombre de la categoría de cada producto (mismo orden)
+        palabras: Palabras de todos los productos, ordenadas
+        en_nombre / en_descripcion: Palabra -> posiciones de los productos que la tienen
+        en_comienzo: Primera palabra del nombre -> posiciones de los productos
+        trigramas: Trigrama -> índices (en palabras) de las palabras que lo tienen
+    """
+
+    def __init__(self, datos, generacion=None):
+        self.generacion = generacion
+        self.productos = []
+        self.categorias = []
+        self.en_nombre = {}
+        self.en_descripcion = {}
+        self.en_comienzo = {}
+        self._posicion_por_id = {}
+        self._palabras_producto = []  # (palabras del nombre, palabras de la descripción) por posición
+
+        for categoria in datos.get("categorias", []):
+            for producto in categoria.get("productos", []):
+                posicion = len(self.productos)
+                self.productos.append(producto)
+                self.categorias.append(categoria["nombre"])
+                self._posicion_por_id[producto["id"]] = posicion
+                palabras_nombre = tuple(separar_palabras(producto["nombre"]))
+                palabras_descripcion = tuple(separar_palabras(producto["descripcion"]))
+                self._palabras_producto.append((palabras_nombre, palabras_descripcion))
+                for palabra in palabras_nombre:
+                    self.en_nombre.setdefault(palabra, set()).add(posicion)
+                if palabras_nombre:
+                    self.en_comienzo.setdefault(palabras_nombre[0], set()).add(posicion)
+                for palabra in palabras_descripcion:
+                    self.en_descripcion.setdefault(palabra, set()).add(posicion)
+
+        self.palabras = sorted(self.en_nombre.keys() | self.en_descripcion.keys())
+
+        # Tamaño acumulado de los conjuntos de las palabras (ordenadas): el de un rango de prefijo
+        # se obtiene con una resta
+        self._tamanio_acumulado = list(accumulate(
+            (len(self.en_nombre.get(palabra, ())) + len(self.en_descripcion.get(palabra, ()))
+             for palabra in self.palabras),
+            initial=0
+        ))
+
+        self.trigramas = {}
+        self._cantidad_trigramas = []
+        for numero, palabra in enumerate(self.palabras):
+            trigramas = obtener_trigramas(palabra)
+            self._cantidad_trigramas.append(len(trigramas))
+            for trigrama in trigramas:
+                self.trigramas.setdefault(trigrama, []).append(numero)
+
+    def _rango_prefijo(self, prefijo):
+        """Rango (inicio, fin) de las palabras del índice que empiezan con prefijo"""
+        inicio = bisect_left(self.palabras, prefijo)
+        return inicio, bisect_left(self.palabras, prefijo + _FIN_PREFIJO, inicio)
+
+    def _palabras_con_prefijo(self, prefijo):
+        """Palabras del índice que empiezan con prefijo (incluida la palabra igual al prefijo)"""
+        inicio, fin = self._rango_prefijo(prefijo)
+        return self.palabras[inicio:fin]
+
+    def _conviene_filtrar(self, consulta, candidatos):
+        """
+        Indica si es más rápido revisar los candidatos uno por uno que unir los conjuntos de
+        todas las palabras del índice que empiezan con cada palabra de la búsqueda
+        """
+        tamanio = 0
+        for palabra in consulta:
+            inicio, fin = self._rango_prefijo(palabra)
+            tamanio += self._tamanio_acumulado[fin] - self._tamanio_acumulado[inicio]
+        return len(candidatos) * len(consulta) * COSTO_FILTRAR_CANDIDATO < tamanio
+
+    def _palabras_similares(self, palabra):
+        """
+        Palabras del índice parecidas a palabra
+
+        Returns:
+            dict: Índice de la palabra (en self.palabras) -> similitud entre 0 y 1; las que
+                  empiezan con palabra tienen similitud 1
+        """
+        inicio, fin = self._rango_prefijo(palabra)
+        similares = dict.fromkeys(range(inicio, fin), 1.0)
+        if len(palabra) < LARGO_MINIMO_APROXIMADO:
+            return similares
+
+        trigramas = obtener_trigramas(palabra)
+        compartidos = {}
+        for trigrama in trigramas:
+            for numero in self.trigramas.get(trigrama, ()):
+                compartidos[numero] = compartidos.get(numero, 0) + 1
+
+        cantidad = len(trigramas)
+        for numero, comunes in compartidos.items():
+            similitud = 2 * comunes / (cantidad + self._cantidad_trigramas[numero])
+            if similitud >= SIMILITUD_MINIMA and numero not in similares:
+                similares[numero] = similitud
+        return similares
+
+    def _coincidencias(self, prefijo):
+        """
+        Posiciones de los productos que tienen una palabra que empieza con prefijo
+
+        Returns:
+            tuple: (todas, en el nombre, en el nombre como palabra completa, en la descripción
+                   como palabra completa)
+        """
+        en_nombre = set()
+        en_descripcion = set()
+        for palabra in self._palabras_con_prefijo(prefijo):
+            en_nombre |= self.en_nombre.get(palabra, set())
+            en_descripcion |= self.en_descripcion.get(palabra, set())
+        vacio = frozenset()
+        return (
+            en_nombre | en_descripcion,
+            en_nombre,
+            self.en_nombre.get(prefijo, vacio),
+            self.en_descripcion.get(prefijo, vacio)
+        )
+
+    def _puntaje_producto(self, posicion, consulta):
+        """Puntaje de un producto para las palabras de la búsqueda (None si le falta alguna)"""
+        nombre, descripcion = self._palabras_producto[posicion]
+        puntaje = 0
+        for palabra in consulta:
+            if palabra in nombre:
+                puntaje += PUNTAJE_NOMBRE_EXACTO
+            elif any(propia.startswith(palabra) for propia in nombre):
+                puntaje += PUNTAJE_NOMBRE_PREFIJO
+            elif palabra in descripcion:
+                puntaje += PUNTAJE_DESCRIPCION_EXACTO
+            elif any(propia.startswith(palabra) for propia in descripcion):
+                puntaje += PUNTAJE_DESCRIPCION_PREFIJO
+            else:
+                return None
+        if nombre and nombre[0].startswith(consulta[0]):
+            puntaje += PUNTAJE_COMIENZO_NOMBRE
+        return puntaje
+
+    def coincidencias_exactas(self, texto, candidatos=None):
+        """
+        Productos que tienen todas las palabras de texto (como palabra completa o comienzo)
+
+        Args:
+            texto: Texto de la búsqueda
+            candidatos: Posiciones entre las que buscar (None: todo el catálogo). Si la búsqueda
+                        agrega letras o palabras a una anterior, sus resultados solo pueden estar
+                        entre los de la anterior: si son pocos se revisan uno por uno, y si no
+                        se cruzan los conjuntos del índice empezando por ellos
+
+        Returns:
+            dict: Posición -> puntaje (para comparar entre sí); vacío si texto no tiene palabras
+        """
+        consulta = list(dict.fromkeys(separar_palabras(texto)))
+        if not consulta:
+            return {}
+
+        if candidatos is not None and self._conviene_filtrar(consulta, candidatos):
+            puntajes = {}
+            for posicion in candidatos:
+                puntaje = self._puntaje_producto(posicion, consulta)
+                if puntaje is not None:
+                    puntajes[posicion] = puntaje
+            return puntajes
+
+        coincidencias = [self._coincidencias(palabra) for palabra in consulta]
+
+        # Intersección empezando por el conjunto más chico
+        conjuntos = [todas for todas, _, _, _ in coincidencias]
+        if candidatos is not None:
+            conjuntos.append(candidatos.keys() if isinstance(candidatos, dict) else candidatos)
+        conjuntos.sort(key=len)
+        posiciones = set(conjuntos[0])
+        for conjunto in conjuntos[1:]:
+            posiciones &= conjunto
+            if not posiciones:
+                return {}
+
+        # Puntaje de cada producto: por cada palabra, dónde coincide (la mejor ubicación).
+        # Se suma por niveles con operaciones de conjuntos, sin recorrer los productos uno por uno
+        puntajes = Counter(dict.fromkeys(posiciones, PUNTAJE_DESCRIPCION_PREFIJO * len(consulta)))
+        for _, en_nombre, nombre_exacto, descripcion_exacto in coincidencias:
+            _sumar(puntajes, (en_nombre | descripcion_exacto) & posiciones,
+                   PUNTAJE_DESCRIPCION_EXACTO - PUNTAJE_DESCRIPCION_PREFIJO)
+            _sumar(puntajes, en_nombre & posiciones, PUNTAJE_NOMBRE_PREFIJO - PUNTAJE_DESCRIPCION_EXACTO)
+            _sumar(puntajes, nombre_exacto & posiciones, PUNTAJE_NOMBRE_EXACTO - PUNTAJE_NOMBRE_PREFIJO)
+        comienzo = set()
+        for palabra in self._palabras_con_prefijo(consulta[0]):
+            comienzo |= self.en_comienzo.get(palabra, set())
+        _sumar(puntajes, comienzo & posiciones, PUNTAJE_COMIENZO_NOMBRE)
+        return puntajes
+
+    def buscar_posiciones(self, texto, limite=None, popularidad=None, exactas=None):
+        """
+        Posiciones de los productos que coinciden con todas las palabras de texto, por relevancia
+
+        Args:
+            texto: Texto de la búsqueda
+            limite: Cantidad máxima de posiciones a retornar (None: todas)
+            popularidad: {producto_id: unidades vendidas} para desempatar (opcional)
+            exactas: Resultado de coincidencias_exactas(texto), si ya se calculó
+
+        Returns:
+            list: Posiciones (índices en self.productos); vacía si texto no tiene palabras
+        """
+        puntajes = self.coincidencias_exactas(texto) if exactas is None else exactas
+
+        # Agrupar por puntaje y ordenar de a un grupo hasta completar el límite
+        grupos = {}
+        for posicion, puntaje in puntajes.items():
+            grupos.setdefault(puntaje, set()).add(posicion)
+
+        vendidos = self._posiciones_vendidas(popularidad)
+        resultado = []
+        for puntaje in sorted(grupos, reverse=True):
+            grupo = grupos[puntaje]
+            faltan = None if limite is None else limite - len(resultado)
+            # Dentro del grupo: los más vendidos primero y después el orden del catálogo
+            con_ventas = sorted(grupo & vendidos.keys(), key=lambda posicion: (-vendidos[posicion], posicion))
+            resultado += con_ventas[:faltan]
+            if faltan is not None and len(con_ventas) >= faltan:
+                break
+            resto = grupo - vendidos.keys()
+            if faltan is None:
+                resultado += sorted(resto)
+            else:
+                resultado += heapq.nsmallest(faltan - len(con_ventas), resto)
+                if len(resultado) >= limite:
+                    break
+        return resultado
+
+    def _posiciones_vendidas(self, popularidad):
+        """Posición -> unidades vendidas de los productos del índice con ventas"""
+        if not popularidad:
+            return {}
+        return {
+            self._posicion_por_id[producto_id]: unidades
+            for producto_id, unidades in popularidad.items() if producto_id in self._posicion_por_id
+        }
+
+    def buscar_similares(self, texto, limite=None, popularidad=None, excluir=()):
+        """
+        Búsqueda aproximada: productos con palabras parecidas a todas las palabras de texto
+
+        Cada palabra de la búsqueda toma la palabra más parecida del producto (del nombre, o de
+        la descripción con PESO_DESCRIPCION); la similitud del producto es el promedio, y se
+        combina con la popularidad según PESO_POPULARIDAD.
+
+        Args:
+            texto: Texto de la búsqueda
+            limite: Cantidad máxima de posiciones a retornar (None: todas)
+            popularidad: {producto_id: unidades vendidas} (opcional)
+            excluir: Posiciones que no se retornan (por ejemplo, las ya encontradas exactas)
+
+        Returns:
+            list: Posiciones de los productos, de la más a la menos relevante
+        """
+        consulta = list(dict.fromkeys(separar_palabras(texto)))
+        if not consulta:
+            return []
+
+        totales = None
+        for palabra in consulta:
+            mejores = {}
+            for numero, similitud in self._palabras_similares(palabra).items():
+                palabra_indice = self.palabras[numero]
+                for posicion in self.en_nombre.get(palabra_indice, ()):
+                    if similitud > mejores.get(posicion, 0.0):
+                        mejores[posicion] = similitud
+                similitud_descripcion = similitud * PESO_DESCRIPCION
+                for posicion in self.en_descripcion.get(palabra_indice, ()):
+                    if similitud_descripcion > mejores.get(posicion, 0.0):
+                        mejores[posicion] = similitud_descripcion
+
+            # Solo siguen los productos que coinciden con todas las palabras
+            if totales is None:
+                totales = mejores
+            else:
+                totales = {posicion: total + mejores[posicion]
+                           for posicion, total in totales.items() if posicion in mejores}
+            if not totales:
+                return []
+
+        normalizada = _normalizar_popularidad(popularidad)
+        cantidad = len(consulta)
+        productos = self.productos
+        puntajes = {
+            posicion: (1 - PESO_POPULARIDAD) * total / cantidad
+                      + PESO_POPULARIDAD * normalizada(productos[posicion]["id"])
+            for posicion, total in totales.items() if posicion not in excluir
+        }
+
+        def clave(posicion):
+            return (-puntajes[posicion], posicion)
+
+        if limite is not None and limite < len(puntajes):
+            return heapq.nsmallest(limite, puntajes, key=clave)
+        return sorted(puntajes, key=clave)
+
+    def buscar(self, texto, limite=None, popularidad=None, exactas=None):
+        """
+        Productos que coinciden con la búsqueda: primero los exactos (todas las palabras como
+        palabra completa o comienzo de palabra) y después los aproximados, cada grupo por relevancia
+
+        Args:
+            texto: Texto de la búsqueda (sin importar mayúsculas ni acentos)
+            limite: Cantidad máxima de productos a retornar (None: todos)
+            popularidad: {producto_id: unidades vendidas} (opcional)
+            exactas: Resultado de coincidencias_exactas(texto), si ya se calculó
+        """
+        posiciones = self.buscar_posiciones(texto, limite, popularidad, exactas)
+        if limite is None or len(posiciones) < limite:
+            faltan = None if limite is None else limite - len(posiciones)
+            posiciones += self.buscar_similares(texto, faltan, popularidad, excluir=set(posiciones))
+        return [self.productos[posicion] for posicion in posiciones]
+
+    def buscar_ids(self, texto, limite=None, popularidad=None):
+        """IDs de los productos que retorna buscar() (conjunto, sin ordenar)"""
+        return {producto["id"] for producto in self.buscar(texto, limite, popularidad)}
+
+    def obtener_posicion(self, producto_id):
+        """Posición de un producto en el índice (orden del catálogo; None si no está)"""
+        return self._posicion_por_id.get(producto_id)
+
+    def obtener_categoria(self, producto_id):
+        """Nombre de la categoría de un producto del índice (None si no está)"""
+        posicion = self._posicion_por_id.get(producto_id)
+        return self.categorias[posicion] if posicion is not None else None
+
+
+# Índice de la generación actual del catálogo y categorías con las que se armó
+_indice = None
+_categorias_indice = ()
+_bloqueo_indice = threading.Lock()
+
+
+def _vigente(indice, categorias, generacion):
+    """Indica si el índice se armó con esta generación y con estas mismas categorías"""
+    return (indice is not None and indice.generacion == generacion
+            and len(categorias) == len(_categorias_indice)
+            and all(categoria is anterior for categoria, anterior in zip(categorias, _categorias_indice)))
+
+
+def obtener_indice():
+    """
+    Retorna el índice de búsqueda de la generación actual del catálogo (lo arma si cambió)
+    Con el catálogo particionado las categorías se leen de a una (solo las que no se
+    leyeron o cambiaron en disco): buscar no arma el catálogo completo
+    """
+    global _indice, _categorias_indice
+
+    # Importar aquí para evitar importación circular
+    from utils.productos import obtener_categorias
+
+    categorias = obtener_categorias()  # Verifica si los archivos cambiaron en disco
+    generacion = catalogo.obtener_generacion()
+    indice = _indice
+    if _vigente(indice, categorias, generacion):
+        return indice
+    with _bloqueo_indice:
+        if not _vigente(_indice, categorias, generacion):
+            _indice = IndiceBusqueda({"categorias": categorias}, generacion)
+            _categorias_indice = tuple(categorias)
+        return _indice
+
+
+def buscar_productos(texto, limite=LIMITE_RESULTADOS):
+    """Busca productos por nombre y descripción, con la popularidad reciente (ver IndiceBusqueda.buscar)"""
+    return obtener_indice().buscar(texto, limite, obtener_popularidad())
+
+
+class BusquedaIncremental:
+    """
+    Búsquedas sucesivas de un buscador mientras se escribe
+    Si el texto nuevo extiende al anterior ("ham" -> "hamb", "hamb" -> "hamb doble") los
+    resultados exactos solo pueden estar entre los anteriores: se filtran esos productos en
+    lugar de volver a buscar en todo el catálogo. Si el catálogo cambió se busca de nuevo.
+    """
+
+    def __init__(self):
+        self._indice = None
+        self._texto = None
+        self._exactas = None
+
+    def coincidencias_exactas(self, texto):
+        """
+        IndiceBusqueda.coincidencias_exactas() en el índice actual, filtrando los resultados
+        anteriores cuando se puede
+
+        Returns:
+            tuple: (índice usado, {posición: puntaje})
+        """
+        indice = obtener_indice()
+        normalizado = normalizar_texto(texto)
+
+        candidatos = None
+        if indice is self._indice and self._texto and normalizado.startswith(self._texto):
+            candidatos = self._exactas
+        exactas = indice.coincidencias_exactas(normalizado, candidatos)
+
+        self._indice = indice
+        # Sin palabras no hay resultados que filtrar después
+        self._texto = normalizado if _PATRON_PALABRA.search(normalizado) else None
+        self._exactas = exactas
+        return indice, exactas
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Igual que buscar_productos(), filtrando los resultados anteriores cuando se puede"""
+        indice, exactas = self.coincidencias_exactas(texto)
+        return indice.buscar(texto, limite, obtener_popularidad(), exactas)
+
+    def reiniciar(self):
+        """Olvida la búsqueda anterior (la próxima busca en todo el catálogo)"""
+        self._indice = None
+        self._texto = None
+        self._exactas = None
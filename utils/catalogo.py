@@ -0,0 +1,796 @@
+"""
+Módulo con el repositorio en memoria de los catálogos JSON
+Parsea cada archivo una sola vez por proceso y sirve las lecturas desde memoria,
+volviendo a leer el archivo solo cuando cambia en disco (fecha de modificación o tamaño)
+Las escrituras se delegan al persistidor diferido de utils.persistencia: los cambios de
+productos o ingredientes puntuales se agregan al diario del catálogo y el JSON completo
+solo se reescribe al compactarlo (ver utils.diario_catalogo)
+Cada cambio del catálogo avanza su generación y queda registrado como evento
+(producto agregado/modificado/eliminado, ingrediente..., recarga completa) para que
+la interfaz actualice solo lo que cambió
+"""
+import copy
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from utils import codec_json, diario_catalogo, snapshot_catalogo
+from utils.persistencia import persistidor, escribir_archivo_atomico, bloqueo_archivo
+
+
+def obtener_firma_archivo(ruta):
+    """
+    Obtiene la firma de un archivo para detectar cambios en disco
+
+    Args:
+        ruta: Ruta completa del archivo
+
+    Returns:
+        tuple: (fecha de modificación en ns, tamaño en bytes) o None si el archivo no existe
+    """
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+# Clave de cada catálogo donde se guarda el último ID asignado (marca de agua)
+CLAVE_ULTIMO_ID = "ultimo_id"
+
+
+def ajustar_ultimo_id(datos, max_id):
+    """
+    Asegura que la marca de agua de IDs no quede por debajo del mayor ID existente
+    (archivos anteriores sin la clave o editados a mano). Solo toca la memoria:
+    el valor llega al disco con la próxima escritura del catálogo.
+
+    Args:
+        datos: Datos del catálogo
+        max_id: Mayor ID presente en los datos
+    """
+    ultimo_id = datos.get(CLAVE_ULTIMO_ID)
+    if not isinstance(ultimo_id, int) or ultimo_id < max_id:
+        datos[CLAVE_ULTIMO_ID] = max_id
+
+
+def _marca_de_agua(datos):
+    """Marca de agua de IDs de los datos (0 si no tiene)"""
+    ultimo_id = datos.get(CLAVE_ULTIMO_ID)
+    return ultimo_id if isinstance(ultimo_id, int) else 0
+
+
+def asignar_id(datos):
+    """
+    Reserva un nuevo ID en O(1) incrementando la marca de agua del catálogo
+    Los IDs nunca se reutilizan, aunque se elimine el elemento que tenía el último.
+
+    Args:
+        datos: Datos del catálogo (ya ajustados con ajustar_ultimo_id)
+
+    Returns:
+        int: ID reservado
+    """
+    datos[CLAVE_ULTIMO_ID] = datos.get(CLAVE_ULTIMO_ID, 0) + 1
+    return datos[CLAVE_ULTIMO_ID]
+
+
+# Guardar junto a cada JSON un snapshot binario de sus datos para arrancar más rápido
+# (ver utils.snapshot_catalogo); si está desactualizado se usa el JSON
+USAR_SNAPSHOT = True
+
+# Agregar los cambios puntuales al diario del catálogo en lugar de reescribir el JSON
+# (ver utils.diario_catalogo); con False cada escritura reescribe el JSON completo
+USAR_DIARIO = True
+
+# Tiempo mínimo (en segundos) entre dos verificaciones de cambios en disco.
+# Las lecturas dentro de ese intervalo se sirven de memoria sin consultar el disco
+INTERVALO_VERIFICACION = 0.5
+
+# Repositorios creados en el proceso (los agrupa transaccion())
+_repositorios = []
+
+# Generación del catálogo: cambia cada vez que se modifican o se releen productos o ingredientes.
+# Permite a los cachés derivados (planes de precios, etc.) saber si siguen vigentes
+_contador_generacion = itertools.count(1)
+_generacion = 0
+
+# Tipos de evento de cambio del catálogo
+PRODUCTO_AGREGADO = "producto_agregado"
+PRODUCTO_MODIFICADO = "producto_modificado"
+PRODUCTO_ELIMINADO = "producto_eliminado"
+INGREDIENTE_AGREGADO = "ingrediente_agregado"
+INGREDIENTE_MODIFICADO = "ingrediente_modificado"
+INGREDIENTE_ELIMINADO = "ingrediente_eliminado"
+# Cambio sin detalle (archivo releído, datos reemplazados, transacción deshecha):
+# quien lo reciba debe volver a leer todo
+RECARGA = "recarga"
+
+EventoCatalogo = namedtuple("EventoCatalogo", ["generacion", "tipo", "id"])
+
+# Últimos eventos del catálogo (los más viejos se descartan)
+MAX_EVENTOS = 500
+_eventos = deque()
+_generacion_descartada = 0  # Generación más nueva con eventos ya descartados
+_suscriptores = []
+_bloqueo_eventos = threading.Lock()
+
+
+def obtener_generacion():
+    """Retorna la generación actual del catálogo (cambia con cada modificación o relectura)"""
+    return _generacion
+
+
+def _nueva_generacion(tipo=RECARGA, ids=None):
+    """
+    Avanza la generación y registra un evento del tipo indicado por cada ID
+    (sin IDs, un solo evento sin ID; con un conjunto vacío, ninguno)
+    """
+    global _generacion, _generacion_descartada
+
+    with _bloqueo_eventos:
+        _generacion = next(_contador_generacion)
+        if ids is None:
+            nuevos = [EventoCatalogo(_generacion, tipo, None)]
+        else:
+            nuevos = [EventoCatalogo(_generacion, tipo, elemento_id) for elemento_id in ids]
+        _eventos.extend(nuevos)
+        while len(_eventos) > MAX_EVENTOS:
+            _generacion_descartada = _eventos.popleft().generacion
+        suscriptores = list(_suscriptores)
+
+    if not nuevos:
+        return
+    for funcion in suscriptores:
+        try:
+            funcion(nuevos)
+        except Exception as e:
+            print(f"Error al notificar un cambio del catálogo: {e}")
+
+
+def obtener_cambios_desde(generacion):
+    """
+    Retorna los eventos posteriores a una generación del catálogo
+
+    Args:
+        generacion: Generación que el llamador ya tiene al día (obtener_generacion())
+
+    Returns:
+        list: Eventos en orden (vacía si no hubo cambios), o None si algunos ya se
+              descartaron y hay que volver a leer todo
+    """
+    with _bloqueo_eventos:
+        if generacion == _generacion:
+            return []
+        if generacion < _generacion_descartada:
+            return None
+        return [evento for evento in _eventos if evento.generacion > generacion]
+
+
+def suscribir_cambios(funcion):
+    """
+    Registra una función que recibe la lista de eventos de cada cambio del catálogo
+    Se llama en el thread que hizo el cambio: la interfaz debe pasar a su thread con after()
+    """
+    with _bloqueo_eventos:
+        if funcion not in _suscriptores:
+            _suscriptores.append(funcion)
+
+
+def cancelar_suscripcion(funcion):
+    """Deja de notificar cambios del catálogo a una función registrada con suscribir_cambios()"""
+    with _bloqueo_eventos:
+        if funcion in _suscriptores:
+            _suscriptores.remove(funcion)
+
+
+class RepositorioJSON:
+    """
+    Repositorio en memoria para un archivo JSON del catálogo (productos o ingredientes)
+
+    Los datos retornados por cargar() son compartidos por todo el proceso:
+    quien los modifique debe hacerlo dentro de `with repositorio.bloqueo:` y
+    registrarlos con guardar() para que memoria y disco no queden desincronizados.
+
+    Las lecturas nunca escriben en disco: la migración se ejecuta una sola vez por
+    cada parseo del archivo y solo se guarda si efectivamente modificó los datos.
+    Las escrituras son diferidas (ver utils.persistencia): guardar() marca los datos
+    como modificados y el persistidor los escribe agrupados y de forma atómica.
+    Los contadores lecturas_disco y escrituras_disco permiten verificarlo.
+    """
+
+    def __init__(self, obtener_ruta, crear_estructura_inicial, migrar=None, al_cargar=None, nombre=None):
+        """
+        Args:
+            obtener_ruta: Función que retorna la ruta completa del archivo JSON
+            crear_estructura_inicial: Función que retorna los datos vacíos del catálogo
+            migrar: Función opcional que recibe los datos recién parseados, los
+                    completa/corrige y retorna True si los modificó
+            al_cargar: Función opcional que recibe los datos cada vez que se reemplazan
+                       (nuevo parseo del archivo); se usa para reconstruir índices
+            nombre: "productos" o "ingredientes" para usar el diario de cambios de ese
+                    catálogo; sin nombre cada escritura reescribe el JSON completo
+        """
+        self.obtener_ruta = obtener_ruta
+        self.crear_estructura_inicial = crear_estructura_inicial
+        self.migrar = migrar
+        self.al_cargar = al_cargar
+        self.datos = None
+        self.firma = None
+        self.modificado = False
+        self.escribiendo = False
+        self.lecturas_disco = 0
+        self.lecturas_snapshot = 0
+        self.escrituras_disco = 0
+        self.registros_diario = 0
+        # IDs modificados pendientes de escribir; None = reescribir todo
+        self._cambios = set()
+        # Funciones (preparar, aplicar, recorrer elementos) del diario de este catálogo
+        self._diario = diario_catalogo.CATALOGOS.get(nombre)
+        self._hash_base = None  # Hash del JSON sobre el que se aplica el diario
+        # Marca de agua de IDs leída o escrita por última vez: los IDs mayores son altas
+        # que todavía no llegaron al disco (otra caja puede haber usado los mismos)
+        self._ultimo_id_base = 0
+        # La reescritura pendiente es una compactación (los datos en memoria son los del disco)
+        self._compactando = False
+        # Protege los datos en memoria entre la interfaz y el thread de escritura
+        self.bloqueo = threading.RLock()
+        # Serializa las escrituras de este archivo (thread de escritura y flush)
+        self._bloqueo_escritura = threading.Lock()
+        # Profundidad de transaccion() en curso: mientras sea > 0 no se programan escrituras
+        self.en_transaccion = 0
+        self._ultima_verificacion = 0.0
+        self._leido = False  # Si ya se parseó el archivo alguna vez
+        _repositorios.append(self)
+
+    def _verificado_recientemente(self):
+        """
+        Indica si el disco se verificó hace menos de INTERVALO_VERIFICACION segundos
+        (si no, registra que se va a verificar ahora)
+        """
+        ahora = time.monotonic()
+        if self.datos is not None and ahora - self._ultima_verificacion < INTERVALO_VERIFICACION:
+            return True
+        self._ultima_verificacion = ahora
+        return False
+
+    def _datos_vigentes(self):
+        """
+        Retorna los datos en memoria si se pueden usar sin consultar el disco, o None
+        No toma el bloqueo: es el camino rápido de cargar() para las lecturas repetidas
+        (precios, carrito, tickets). Durante una transacción siempre se toma el bloqueo.
+        """
+        datos = self.datos
+        if datos is None or self.en_transaccion:
+            return None
+        if self.modificado or self.escribiendo:
+            return datos
+        if time.monotonic() - self._ultima_verificacion < INTERVALO_VERIFICACION:
+            return datos
+        return None
+
+    def _firma_actual(self, ruta):
+        """Firma del JSON y de su diario: (firma del JSON, firma del diario)"""
+        firma_diario = None
+        if self._diario is not None:
+            firma_diario = obtener_firma_archivo(diario_catalogo.obtener_ruta_diario(ruta))
+        return (obtener_firma_archivo(ruta), firma_diario)
+
+    def cargar(self):
+        """Retorna los datos del catálogo, releyendo el archivo solo si cambió en disco"""
+        datos = self._datos_vigentes()
+        if datos is not None:
+            return datos
+
+        with self.bloqueo:
+            if self.datos is not None and (self.modificado or self.escribiendo):
+                # Hay cambios en memoria que todavía no llegaron al disco: mandan los de memoria
+                return self.datos
+            if self._verificado_recientemente():
+                return self.datos
+
+            ruta = self.obtener_ruta()
+            firma = self._firma_actual(ruta)
+
+            if self.datos is not None and firma[0] is not None and firma == self.firma:
+                return self.datos
+
+            self.copiar_desde_instalacion(ruta)
+
+            # Primero el snapshot binario (una sola lectura, sin parsear); si no corresponde
+            # al JSON actual se parsea el JSON y se regenera el snapshot
+            snapshot = snapshot_catalogo.leer_snapshot(ruta, firma[0]) if USAR_SNAPSHOT else None
+            contenido = None
+            hash_base = None
+            if snapshot is not None:
+                datos, hash_base = snapshot
+                self.lecturas_disco += 1
+                self.lecturas_snapshot += 1
+            else:
+                try:
+                    with open(ruta, 'rb') as f:
+                        contenido = f.read()
+                    datos = codec_json.decodificar(contenido)
+                    hash_base = snapshot_catalogo.calcular_hash(contenido)
+                    self.lecturas_disco += 1
+                except FileNotFoundError:
+                    # Crear estructura inicial
+                    datos = self.crear_estructura_inicial()
+                    self.modificado = True
+                    self._cambios = None
+                    contenido = None
+                except (codec_json.ErrorDecodificacion, UnicodeDecodeError):
+                    print(f"Error: El archivo {os.path.basename(ruta)} no es válido. Se creará uno nuevo.")
+                    datos = self.crear_estructura_inicial()
+                    self.modificado = True
+                    self._cambios = None
+                    contenido = None
+
+            if contenido is not None and USAR_SNAPSHOT:
+                # Antes de aplicar el diario y migrar: el snapshot guarda lo mismo que el JSON
+                snapshot_catalogo.escribir_snapshot(
+                    ruta, snapshot_catalogo.serializar_datos(datos), obtener_firma_archivo(ruta), contenido
+                )
+
+            # Aplicar los cambios del diario que todavía no se compactaron en el JSON
+            if self._diario is not None:
+                aplicar = self._diario[1]
+                for registro in diario_catalogo.leer_diario(ruta, hash_base):
+                    aplicar(datos, registro)
+
+            self.datos = datos
+            # La firma tomada antes de leer: si otra caja escribió mientras tanto, la
+            # próxima verificación lo detecta
+            self.firma = firma
+            self._hash_base = hash_base
+
+            # Migrar una sola vez por parseo y escribir solo si algo cambió
+            if self.migrar and self.migrar(datos):
+                self.modificado = True
+                self._cambios = None
+            if self.al_cargar:
+                self.al_cargar(datos)
+            self._ultimo_id_base = _marca_de_agua(datos)
+            self._marcar_lectura()
+            if self.modificado:
+                self._programar()
+            return datos
+
+    def verificar_cambios(self):
+        """
+        Relee los datos si otro proceso los cambió en disco, sin esperar a la próxima
+        lectura (lo usa el vigilante de utils.vigilante_datos, fuera de la interfaz).
+        No hace nada si los datos todavía no se leyeron o tienen cambios sin guardar.
+
+        Returns:
+            bool: True si se releyeron (se notificó una RECARGA)
+        """
+        with self.bloqueo:
+            if self.datos is None or self.en_transaccion:
+                return False
+            anteriores = self.datos
+            self._ultima_verificacion = 0.0
+            return self.cargar() is not anteriores
+
+    def guardar(self, datos, cambios=None, evento=None):
+        """
+        Registra los datos como la nueva versión del catálogo
+        La escritura en disco se hace en forma diferida y agrupada
+
+        Args:
+            datos: Datos del catálogo
+            cambios: IDs de los elementos modificados (altas, modificaciones o bajas),
+                     que se escriben en el diario; None reescribe el catálogo completo
+            evento: Tipo de evento (PRODUCTO_MODIFICADO, ...) que se notifica para cada ID
+                    de cambios; sin evento se notifica una RECARGA
+        """
+        with self.bloqueo:
+            if datos is not self.datos:
+                cambios = None
+                if self.al_cargar:
+                    # Se reemplazó el objeto completo: reconstruir índices
+                    self.al_cargar(datos)
+            if cambios is None:
+                self._cambios = None
+            elif self._cambios is not None:
+                self._cambios.update(cambios)
+            self.datos = datos
+            self.modificado = True
+            self._compactando = False
+            if evento is None or cambios is None:
+                self._marcar_nueva_generacion()
+            else:
+                self._marcar_nueva_generacion(evento, cambios)
+        self._programar()
+
+    def _marcar_nueva_generacion(self, evento=RECARGA, ids=None):
+        """Registra que los datos cambiaron (invalida los cachés derivados y notifica el cambio)"""
+        _nueva_generacion(evento, ids)
+
+    def _marcar_lectura(self):
+        """
+        Registra un nuevo parseo de los datos: es una RECARGA salvo la primera lectura,
+        que no cambia nada que otros ya tuvieran
+        """
+        self._marcar_nueva_generacion(RECARGA, None if self._leido else ())
+        self._leido = True
+
+    def _programar(self):
+        """Programa la escritura diferida (dentro de una transacción se hace al confirmarla)"""
+        if not self.en_transaccion:
+            persistidor.programar(self)
+
+    def _estado_transaccion(self):
+        """Copia del estado en memoria para poder deshacer una transacción"""
+        return {
+            "datos": copy.deepcopy(self.datos),
+            "modificado": self.modificado,
+            "cambios": copy.copy(self._cambios)
+        }
+
+    def _restaurar_estado(self, estado):
+        """Deshace una transacción volviendo al estado guardado por _estado_transaccion()"""
+        self.datos = estado["datos"]
+        self.modificado = estado["modificado"]
+        self._cambios = estado["cambios"]
+        if self.al_cargar and self.datos is not None:
+            self.al_cargar(self.datos)
+        self._marcar_nueva_generacion()
+
+    def marcar_modificado(self):
+        """Marca los datos en memoria como pendientes de guardar"""
+        self.guardar(self.datos)
+
+    def _usar_diario(self, cambios):
+        """Indica si los cambios pendientes se pueden agregar al diario en lugar de reescribir el JSON"""
+        if not USAR_DIARIO or self._diario is None or cambios is None or self._hash_base is None:
+            return False
+        firma_diario = self.firma[1] if self.firma else None
+        return firma_diario is None or firma_diario[1] < diario_catalogo.TAMANIO_MAXIMO_DIARIO
+
+    def _leer_disco(self, ruta):
+        """
+        Lee el JSON y le aplica su diario tal como están en disco
+
+        Returns:
+            tuple: (datos, hash del JSON) o None si el JSON no existe o no es válido
+        """
+        leido = _leer_json_con_diario(ruta, self._diario[1] if self._diario is not None else None)
+        if leido is not None:
+            self.lecturas_disco += 1
+        return leido
+
+    def _renumerar_altas(self, datos_disco):
+        """
+        Reasigna los IDs de las altas pendientes que otra caja ya usó en el disco
+        (las dos reservaron el mismo ID a partir de la misma marca de agua)
+        """
+        elementos = self._diario[2]
+        ids_disco = {elemento.get("id") for elemento in elementos(datos_disco)}
+        siguiente = max(
+            [_marca_de_agua(datos_disco), _marca_de_agua(self.datos)]
+            + [elemento_id for elemento_id in ids_disco if isinstance(elemento_id, int)]
+        )
+        for elemento in elementos(self.datos):
+            elemento_id = elemento.get("id")
+            if (elemento_id in self._cambios and elemento_id in ids_disco
+                    and isinstance(elemento_id, int) and elemento_id > self._ultimo_id_base):
+                siguiente += 1
+                print(f"Advertencia: otra caja ya usó el ID {elemento_id}, se reasignó como {siguiente}")
+                elemento["id"] = siguiente
+                self._cambios.discard(elemento_id)
+                self._cambios.add(siguiente)
+        self.datos[CLAVE_ULTIMO_ID] = siguiente
+
+    def _incorporar_cambios_externos(self, ruta, firma):
+        """
+        Otra caja escribió el JSON o su diario después de la última lectura: vuelve a
+        leerlos y les aplica los cambios pendientes de memoria, para no agregar un
+        registro sobre una base vieja ni pisar lo que escribió la otra caja.
+        Se llama con el bloqueo entre procesos y el bloqueo del repositorio tomados.
+
+        Args:
+            ruta: Ruta del JSON
+            firma: Firma actual del JSON y su diario
+        """
+        leido = self._leer_disco(ruta)
+        if leido is None:
+            # El JSON ya no existe o no es válido: se reescribe completo con lo de memoria
+            self._cambios = None
+            self.firma = firma
+            self._hash_base = None
+            return
+
+        datos, hash_base = leido
+        if not self._compactando:
+            if self._cambios is None or self._diario is None:
+                # Reescritura completa (migración o reemplazo de todos los datos): manda
+                # lo de memoria, escrito en forma atómica con el bloqueo tomado
+                self.firma = firma
+                self._hash_base = hash_base
+                return
+            # Volver a aplicar los elementos modificados sobre lo que hay en disco
+            preparar, aplicar, _ = self._diario
+            self._renumerar_altas(datos)
+            ultimo_id_disco = _marca_de_agua(datos)
+            aplicar(datos, preparar(self.datos, self._cambios))
+        else:
+            # Compactación: lo que hay en disco ya incluye todo lo escrito
+            ultimo_id_disco = _marca_de_agua(datos)
+
+        self.datos = datos
+        self.firma = firma
+        self._hash_base = hash_base
+        if self.migrar and self.migrar(datos):
+            self._cambios = None
+        if self.al_cargar:
+            self.al_cargar(datos)
+        self._ultimo_id_base = ultimo_id_disco
+        self._marcar_nueva_generacion()
+
+    def escribir_pendiente(self):
+        """
+        Escribe los cambios pendientes: los de elementos puntuales como un registro del
+        diario y el resto (o si el diario ya es grande) reescribiendo el JSON completo
+        (atómico: temporal + renombrado), lo que compacta el diario
+
+        Todo con el bloqueo entre procesos del JSON tomado: si otra caja lo escribió
+        desde la última lectura, primero se incorporan sus cambios (nunca se agrega un
+        registro sobre una base vieja)
+
+        Returns:
+            bool: True si escribió en disco
+        """
+        if not self.modificado:
+            return False
+        with self._bloqueo_escritura:
+            ruta = self.obtener_ruta()
+            with bloqueo_archivo(ruta):
+                return self._escribir_bloqueado(ruta)
+
+    def _escribir_bloqueado(self, ruta):
+        """Cuerpo de escribir_pendiente() (con el bloqueo de escritura y el del archivo tomados)"""
+        with self.bloqueo:
+            if not self.modificado or self.datos is None:
+                return False
+            firma_disco = self._firma_actual(ruta)
+            if firma_disco != self.firma:
+                self._incorporar_cambios_externos(ruta, firma_disco)
+            cambios = self._cambios
+            compactando = self._compactando
+            usar_diario = self._usar_diario(cambios)
+            if usar_diario:
+                linea = diario_catalogo.codificar_registro(self._diario[0](self.datos, cambios))
+                hash_base = self._hash_base
+            else:
+                contenido = codec_json.codificar(self.datos, codec_json.obtener_modo())
+                datos_snapshot = snapshot_catalogo.serializar_datos(self.datos) if USAR_SNAPSHOT else None
+            ultimo_id = _marca_de_agua(self.datos)
+            self._cambios = set()
+            self.modificado = False
+            self._compactando = False
+            self.escribiendo = True
+
+        try:
+            if usar_diario:
+                diario_catalogo.agregar_registro(ruta, linea, hash_base)
+            else:
+                escribir_archivo_atomico(ruta, contenido)
+                # Después del JSON: si se corta aquí, el diario viejo no corresponde
+                # al JSON nuevo y se ignora al cargar
+                diario_catalogo.eliminar_diario(ruta)
+        except Exception:
+            with self.bloqueo:
+                # Reintentar con la próxima escritura
+                if cambios is None or self._cambios is None:
+                    self._cambios = None
+                else:
+                    self._cambios.update(cambios)
+                # Sigue siendo una compactación si no se guardó nada mientras tanto
+                self._compactando = compactando and self._cambios is None and not self.modificado
+                self.modificado = True
+                self.escribiendo = False
+            raise
+
+        with self.bloqueo:
+            if usar_diario:
+                self.registros_diario += 1
+            else:
+                self.escrituras_disco += 1
+                self._hash_base = snapshot_catalogo.calcular_hash(contenido)
+            self.firma = self._firma_actual(ruta)
+            self._ultimo_id_base = ultimo_id
+            self.escribiendo = False
+            firma = self.firma
+
+        if not usar_diario:
+            # El snapshot acompaña a cada versión escrita del JSON (el próximo arranque lo usa)
+            snapshot_catalogo.escribir_snapshot(ruta, datos_snapshot, firma[0], contenido)
+        return True
+
+    def compactar(self):
+        """
+        Reescribe el JSON completo con los cambios del diario y elimina el diario
+
+        Returns:
+            bool: True si había un diario para compactar
+        """
+        with self.bloqueo:
+            if self._diario is None or self.datos is None:
+                return False
+            if not os.path.exists(diario_catalogo.obtener_ruta_diario(self.obtener_ruta())):
+                return False
+        # Primero los cambios pendientes (sobre lo que otra caja haya escrito)
+        self.escribir_pendiente()
+        with self.bloqueo:
+            self._cambios = None
+            self.modificado = True
+            self._compactando = True
+        return self.escribir_pendiente()
+
+    def obtener_estadisticas(self):
+        """Retorna los contadores de lecturas y escrituras en disco"""
+        return {
+            "lecturas_disco": self.lecturas_disco,
+            "lecturas_snapshot": self.lecturas_snapshot,
+            "escrituras_disco": self.escrituras_disco,
+            "registros_diario": self.registros_diario,
+            "cambios_pendientes": self.modificado
+        }
+
+    def invalidar(self):
+        """Descarta la copia en memoria para forzar una relectura del archivo"""
+        with self.bloqueo:
+            self.datos = None
+            self.firma = None
+            self.modificado = False
+            self._cambios = set()
+
+    def copiar_desde_instalacion(self, ruta):
+        """Si está instalado y el archivo no existe, intenta copiarlo desde la instalación"""
+        if not getattr(sys, 'frozen', False) or os.path.exists(ruta):
+            return
+
+        from utils.rutas import obtener_ruta_data_instalacion
+        ruta_instalacion = os.path.join(obtener_ruta_data_instalacion(), os.path.basename(ruta))
+        if os.path.exists(ruta_instalacion):
+            import shutil
+            try:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                shutil.copy2(ruta_instalacion, ruta)
+            except Exception:
+                pass  # Si falla, continuar y crear uno nuevo
+
+
+def _leer_json_con_diario(ruta, aplicar):
+    """Lee un JSON y le aplica los registros de su diario con `aplicar` (si se indica)"""
+    try:
+        with open(ruta, 'rb') as f:
+            contenido = f.read()
+        datos = codec_json.decodificar(contenido)
+    except (FileNotFoundError, codec_json.ErrorDecodificacion, UnicodeDecodeError):
+        return None
+    hash_base = snapshot_catalogo.calcular_hash(contenido)
+    if aplicar is not None:
+        for registro in diario_catalogo.leer_diario(ruta, hash_base):
+            aplicar(datos, registro)
+    return datos, hash_base
+
+
+def leer_json_con_diario(ruta, nombre):
+    """
+    Lee un JSON del catálogo con los cambios de su diario que todavía no se compactaron
+    (lo que vería la aplicación al cargarlo, sin pasar por un repositorio)
+
+    Args:
+        ruta: Ruta completa del JSON
+        nombre: "productos" o "ingredientes"
+
+    Returns:
+        dict: Los datos, o None si el JSON no existe o no es válido
+    """
+    funciones = diario_catalogo.CATALOGOS.get(nombre)
+    leido = _leer_json_con_diario(ruta, funciones[1] if funciones else None)
+    return leido[0] if leido is not None else None
+
+
+def crear_repositorio(nombre, obtener_ruta, crear_estructura_inicial, migrar=None, al_cargar=None):
+    """
+    Crea el repositorio de un catálogo con el almacenamiento configurado:
+    SQLite si existe data/catalogo.db (ver utils.catalogo_sqlite), los productos en un
+    archivo por categoría si existe data/productos/manifiesto.json (ver
+    utils.catalogo_particionado), JSON en caso contrario
+
+    Args:
+        nombre: "productos" o "ingredientes"
+        (el resto igual que RepositorioJSON)
+    """
+    # Importar aquí para evitar importación circular
+    from utils.catalogo_sqlite import sqlite_activo, RepositorioSQLite
+    if sqlite_activo():
+        return RepositorioSQLite(nombre, crear_estructura_inicial, migrar, al_cargar)
+    from utils.catalogo_particionado import particionado_activo, RepositorioParticionado
+    if nombre == "productos" and particionado_activo():
+        return RepositorioParticionado(crear_estructura_inicial, migrar, al_cargar)
+    return RepositorioJSON(obtener_ruta, crear_estructura_inicial, migrar, al_cargar, nombre)
+
+
+def compactar_diarios():
+    """
+    Compacta los diarios de cambios de todos los catálogos en sus JSON
+    (al cerrar la aplicación, para que los JSON queden al día)
+    """
+    for repositorio in list(_repositorios):
+        repositorio.compactar()
+
+
+def _adquirir_bloqueos(bloqueos):
+    """
+    Adquiere todos los bloqueos sin riesgo de deadlock: si alguno está tomado por otro
+    thread, libera los que consiguió y vuelve a intentar
+    """
+    while True:
+        adquiridos = []
+        for bloqueo in bloqueos:
+            if not bloqueo.acquire(blocking=not adquiridos):
+                break
+            adquiridos.append(bloqueo)
+        else:
+            return
+        for bloqueo in reversed(adquiridos):
+            bloqueo.release()
+        time.sleep(0.001)
+
+
+@contextmanager
+def transaccion():
+    """
+    Agrupa varias modificaciones del catálogo (productos e ingredientes) en una sola
+    edición en memoria y una sola escritura en disco al salir del bloque:
+
+        with catalogo.transaccion():
+            agregar_ingrediente_a_producto(...)
+            modificar_producto(...)
+
+    Si ocurre una excepción dentro del bloque se deshacen todos los cambios (en memoria
+    y en los índices) y no se escribe nada. Mientras dura, los demás threads esperan
+    para leer o modificar el catálogo. Las transacciones anidadas se suman a la exterior.
+    """
+    repositorios = list(_repositorios)
+    _adquirir_bloqueos([repositorio.bloqueo for repositorio in repositorios])
+    try:
+        estados = []
+        for repositorio in repositorios:
+            if repositorio.en_transaccion == 0:
+                repositorio.cargar()
+                estados.append((repositorio, repositorio._estado_transaccion()))
+        for repositorio in repositorios:
+            repositorio.en_transaccion += 1
+
+        try:
+            yield
+        except BaseException:
+            for repositorio, estado in estados:
+                repositorio._restaurar_estado(estado)
+            raise
+        finally:
+            for repositorio in repositorios:
+                repositorio.en_transaccion -= 1
+    finally:
+        for repositorio in reversed(repositorios):
+            repositorio.bloqueo.release()
+
+    # Confirmar: una sola escritura por catálogo modificado (fuera de los bloqueos,
+    # para no trabarse con el thread de escritura)
+    for repositorio, _ in estados:
+        if repositorio.modificado:
+            try:
+                repositorio.escribir_pendiente()
+            except Exception:
+                # Los cambios ya están confirmados en memoria: reintentar en segundo plano
+                persistidor.programar(repositorio)
+                raise
@@ -0,0 +1,398 @@
+"""
+Módulo del catálogo de productos particionado por categoría (opcional)
+En lugar de un solo productos.json, cada categoría se guarda en su propio archivo
+dentro de data/productos, con un manifiesto que indica el orden de las categorías,
+el archivo de cada una y la marca de agua de IDs:
+
+    data/productos/manifiesto.json   {"version": 1, "categorias": [{"nombre": "Hamburguesas",
+                                      "archivo": "hamburguesas.json"}, ...], "ultimo_id": 30}
+    data/productos/hamburguesas.json {"nombre": "Hamburguesas", "productos": [...]}
+
+Se activa cuando existe data/productos/manifiesto.json (ver particionar_productos.py).
+Las categorías se leen recién cuando se muestran por primera vez (cargar_categoria()),
+y al guardar solo se reescriben los archivos de las categorías que cambiaron (y el
+manifiesto si cambió el orden de las categorías o la marca de agua).
+"""
+import os
+import re
+import shutil
+import unicodedata
+
+from utils import codec_json
+from utils.catalogo import RepositorioJSON, obtener_firma_archivo
+from utils.esquema_catalogo import normalizar_categoria, informar_problemas
+from utils.persistencia import escribir_archivo_atomico
+
+
+NOMBRE_CARPETA = "productos"
+NOMBRE_MANIFIESTO = "manifiesto.json"
+
+# Versión del formato del manifiesto
+VERSION_FORMATO = 1
+
+
+def obtener_ruta_carpeta():
+    """Obtiene la ruta de la carpeta del catálogo particionado"""
+    from utils.rutas import obtener_ruta_data
+    return os.path.join(obtener_ruta_data(), NOMBRE_CARPETA)
+
+
+def particionado_activo():
+    """Indica si los productos se guardan particionados (existe data/productos/manifiesto.json)"""
+    return os.path.exists(os.path.join(obtener_ruta_carpeta(), NOMBRE_MANIFIESTO))
+
+
+def nombre_archivo_categoria(nombre, usados):
+    """
+    Arma el nombre de archivo de una categoría (sin acentos ni espacios)
+
+    Args:
+        nombre: Nombre de la categoría
+        usados: Nombres de archivo ya usados por otras categorías
+    """
+    base = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode("ascii").lower()
+    base = re.sub(r"[^a-z0-9]+", "_", base).strip("_") or "categoria"
+    archivo = f"{base}.json"
+    sufijo = 2
+    while archivo in usados or archivo == NOMBRE_MANIFIESTO:
+        archivo = f"{base}_{sufijo}.json"
+        sufijo += 1
+    return archivo
+
+
+def armar_manifiesto(datos, anterior=None):
+    """
+    Arma el manifiesto de los datos conservando los archivos de las categorías que ya tenían uno
+
+    Args:
+        datos: Datos de productos
+        anterior: Manifiesto actual en disco (o None)
+    """
+    archivos = {}
+    if anterior:
+        archivos = {entrada["nombre"]: entrada["archivo"] for entrada in anterior.get("categorias", [])}
+
+    usados = set()
+    categorias = []
+    for categoria in datos.get("categorias", []):
+        archivo = archivos.get(categoria["nombre"])
+        if archivo is None or archivo in usados:
+            archivo = nombre_archivo_categoria(categoria["nombre"], usados | set(archivos.values()))
+        usados.add(archivo)
+        categorias.append({"nombre": categoria["nombre"], "archivo": archivo})
+
+    return {
+        "version": VERSION_FORMATO,
+        "categorias": categorias,
+        "ultimo_id": datos.get("ultimo_id", 0)
+    }
+
+
+class RepositorioParticionado(RepositorioJSON):
+    """
+    Repositorio en memoria de los productos guardados en un archivo por categoría
+
+    Tiene la misma interfaz que RepositorioJSON: cargar() retorna todas las categorías
+    (leyendo las que falten). Además cargar_categoria() y obtener_nombres_categorias()
+    permiten mostrar una categoría leyendo solo su archivo y el manifiesto.
+    Los IDs modificados que recibe guardar() indican qué categorías reescribir.
+    """
+
+    def __init__(self, crear_estructura_inicial, migrar=None, al_cargar=None):
+        super().__init__(obtener_ruta_carpeta, crear_estructura_inicial, migrar, al_cargar)
+        self._manifiesto = None
+        self._firma_manifiesto = None
+        # Archivos de categorías ya leídos: archivo -> (firma, categoría)
+        self._particiones = {}
+        # Categoría en disco de cada producto (para saber qué archivo reescribir si se mueve o elimina)
+        self._categoria_en_disco = {}
+        self.particiones_escritas = 0
+
+    def _leer_manifiesto(self, carpeta):
+        """Retorna el manifiesto (releyéndolo solo si cambió en disco) o None si no existe"""
+        ruta = os.path.join(carpeta, NOMBRE_MANIFIESTO)
+        firma = obtener_firma_archivo(ruta)
+        if firma is None:
+            return None
+        if self._manifiesto is not None and firma == self._firma_manifiesto:
+            return self._manifiesto
+
+        try:
+            manifiesto = codec_json.leer_archivo(ruta)
+        except (OSError, codec_json.ErrorDecodificacion) as e:
+            print(f"Error: El manifiesto {ruta} no es válido: {e}")
+            return None
+        self._manifiesto = manifiesto
+        self._firma_manifiesto = firma
+        return manifiesto
+
+    def _leer_particion(self, carpeta, entrada):
+        """Retorna la categoría de una entrada del manifiesto, leyendo su archivo solo si cambió"""
+        ruta = os.path.join(carpeta, entrada["archivo"])
+        firma = obtener_firma_archivo(ruta)
+        leida = self._particiones.get(entrada["archivo"])
+        if leida is not None and firma is not None and leida[0] == firma:
+            return leida[1]
+
+        try:
+            categoria = codec_json.leer_archivo(ruta)
+            self.lecturas_disco += 1
+        except FileNotFoundError:
+            categoria = {"nombre": entrada["nombre"], "productos": []}
+        except codec_json.ErrorDecodificacion:
+            print(f"Error: El archivo {entrada['archivo']} no es válido. Se creará uno nuevo.")
+            categoria = {"nombre": entrada["nombre"], "productos": []}
+        if not isinstance(categoria, dict):
+            print(f"Error: El archivo {entrada['archivo']} no es válido. Se creará uno nuevo.")
+            categoria = {"nombre": entrada["nombre"], "productos": []}
+        categoria["nombre"] = entrada["nombre"]
+        # La lectura parcial no pasa por migrar: normalizar acá cada categoría
+        problemas = []
+        normalizar_categoria(categoria, problemas=problemas)
+        informar_problemas("productos", problemas)
+        self._particiones[entrada["archivo"]] = (firma, categoria)
+        return categoria
+
+    def _firma_actual(self, carpeta, manifiesto):
+        """Firma del manifiesto y de los archivos de todas sus categorías"""
+        if manifiesto is None:
+            return None
+        return (self._firma_manifiesto, tuple(
+            obtener_firma_archivo(os.path.join(carpeta, entrada["archivo"]))
+            for entrada in manifiesto.get("categorias", [])
+        ))
+
+    def cargar(self):
+        """Retorna todas las categorías, releyendo solo los archivos que cambiaron en disco"""
+        datos = self._datos_vigentes()
+        if datos is not None:
+            return datos
+
+        with self.bloqueo:
+            if self.datos is not None and (self.modificado or self.escribiendo):
+                return self.datos
+            if self._verificado_recientemente():
+                return self.datos
+
+            carpeta = self.obtener_ruta()
+            manifiesto = self._leer_manifiesto(carpeta)
+            firma = self._firma_actual(carpeta, manifiesto)
+            if self.datos is not None and firma is not None and firma == self.firma:
+                return self.datos
+
+            if manifiesto is None:
+                datos = self.crear_estructura_inicial()
+                self.modificado = True
+                self._cambios = None
+            else:
+                datos = {
+                    "categorias": [self._leer_particion(carpeta, entrada) for entrada in manifiesto.get("categorias", [])],
+                    "ultimo_id": manifiesto.get("ultimo_id", 0)
+                }
+
+            self.datos = datos
+            self.firma = firma
+            self._categoria_en_disco = {
+                producto.get("id"): categoria["nombre"]
+                for categoria in datos.get("categorias", []) for producto in categoria.get("productos", [])
+            }
+
+            if self.migrar and self.migrar(datos):
+                self.modificado = True
+                self._cambios = None
+            if self.al_cargar:
+                self.al_cargar(datos)
+            self._marcar_lectura()
+            if self.modificado:
+                self._programar()
+            return datos
+
+    def cargar_categoria(self, nombre):
+        """
+        Retorna una categoría leyendo solo su archivo si todavía no se cargaron todas
+
+        Returns:
+            dict: La categoría ({"nombre", "productos"}) o None si no existe
+        """
+        with self.bloqueo:
+            carpeta = self.obtener_ruta()
+            manifiesto = None if self.datos is not None else self._leer_manifiesto(carpeta)
+            if manifiesto is None:
+                datos = self.cargar()
+                return next((c for c in datos.get("categorias", []) if c["nombre"] == nombre), None)
+
+            for entrada in manifiesto.get("categorias", []):
+                if entrada["nombre"] == nombre:
+                    return self._leer_particion(carpeta, entrada)
+            return None
+
+    def obtener_nombres_categorias(self):
+        """Retorna los nombres de las categorías en orden (solo lee el manifiesto si hace falta)"""
+        with self.bloqueo:
+            manifiesto = None if self.datos is not None else self._leer_manifiesto(self.obtener_ruta())
+            if manifiesto is None:
+                return [categoria["nombre"] for categoria in self.cargar().get("categorias", [])]
+            return [entrada["nombre"] for entrada in manifiesto.get("categorias", [])]
+
+    def _restaurar_estado(self, estado):
+        super()._restaurar_estado(estado)
+        # Las categorías leídas quedaron con los cambios deshechos: volver a leerlas
+        self._particiones = {}
+        self.firma = None
+
+    def escribir_pendiente(self):
+        """
+        Escribe los archivos de las categorías modificadas y el manifiesto si cambió
+
+        Returns:
+            bool: True si escribió en disco
+        """
+        with self._bloqueo_escritura:
+            with self.bloqueo:
+                if not self.modificado or self.datos is None:
+                    return False
+                cambios = self._cambios
+                categorias = self.datos.get("categorias", [])
+
+                if cambios is None:
+                    ubicacion = {
+                        producto.get("id"): categoria["nombre"]
+                        for categoria in categorias for producto in categoria.get("productos", [])
+                    }
+                    nombres = {categoria["nombre"] for categoria in categorias}
+                else:
+                    ubicacion = dict(self._categoria_en_disco)
+                    nombres = {ubicacion.pop(producto_id) for producto_id in cambios if producto_id in ubicacion}
+                    for categoria in categorias:
+                        for producto in categoria.get("productos", []):
+                            if producto.get("id") in cambios:
+                                ubicacion[producto.get("id")] = categoria["nombre"]
+                                nombres.add(categoria["nombre"])
+
+                manifiesto = armar_manifiesto(self.datos, self._manifiesto)
+                archivos = {entrada["nombre"]: entrada["archivo"] for entrada in manifiesto["categorias"]}
+                # Categorías nuevas: su archivo todavía no existe
+                nombres.update(nombre for nombre, archivo in archivos.items() if archivo not in self._particiones)
+                particiones = [
+                    (archivos[categoria["nombre"]], categoria, codec_json.codificar(categoria, codec_json.obtener_modo()))
+                    for categoria in categorias if categoria["nombre"] in nombres
+                ]
+                escribir_manifiesto = manifiesto != self._manifiesto
+                obsoletos = set(self._particiones) - set(archivos.values())
+                self._cambios = set()
+                self.modificado = False
+                self.escribiendo = True
+
+            carpeta = self.obtener_ruta()
+            try:
+                os.makedirs(carpeta, exist_ok=True)
+                # Primero las categorías y después el manifiesto que las referencia
+                for archivo, _, contenido in particiones:
+                    escribir_archivo_atomico(os.path.join(carpeta, archivo), contenido)
+                if escribir_manifiesto:
+                    escribir_archivo_atomico(
+                        os.path.join(carpeta, NOMBRE_MANIFIESTO),
+                        codec_json.codificar(manifiesto, codec_json.MODO_LEGIBLE)
+                    )
+                for archivo in obsoletos:
+                    try:
+                        os.remove(os.path.join(carpeta, archivo))
+                    except OSError:
+                        pass
+            except Exception:
+                with self.bloqueo:
+                    # Reintentar con la próxima escritura
+                    if cambios is None or self._cambios is None:
+                        self._cambios = None
+                    else:
+                        self._cambios.update(cambios)
+                    self.modificado = True
+                    self.escribiendo = False
+                raise
+
+            with self.bloqueo:
+                self.escrituras_disco += 1
+                self.particiones_escritas += len(particiones)
+                for archivo in obsoletos:
+                    self._particiones.pop(archivo, None)
+                for archivo, categoria, _ in particiones:
+                    self._particiones[archivo] = (obtener_firma_archivo(os.path.join(carpeta, archivo)), categoria)
+                if escribir_manifiesto:
+                    self._manifiesto = manifiesto
+                    self._firma_manifiesto = obtener_firma_archivo(os.path.join(carpeta, NOMBRE_MANIFIESTO))
+                self._categoria_en_disco = ubicacion
+                self.firma = self._firma_actual(carpeta, self._manifiesto)
+                self.escribiendo = False
+            return True
+
+    def obtener_estadisticas(self):
+        estadisticas = super().obtener_estadisticas()
+        estadisticas["particiones_escritas"] = self.particiones_escritas
+        return estadisticas
+
+    def invalidar(self):
+        """Descarta la copia en memoria para forzar una relectura de los archivos"""
+        with self.bloqueo:
+            super().invalidar()
+            self._manifiesto = None
+            self._firma_manifiesto = None
+            self._particiones = {}
+
+
+def particionar_desde_json(reemplazar=False):
+    """
+    Pasa el catálogo de productos actual a un archivo por categoría
+
+    Args:
+        reemplazar: Si ya existe el catálogo particionado, volver a armarlo
+
+    Returns:
+        dict: {"categorias": n, "productos": n}, o None si ya existía y no se pidió reemplazar
+    """
+    if particionado_activo() and not reemplazar:
+        return None
+
+    # Catálogo actual (productos.json con su diario, SQLite o las categorías ya particionadas)
+    from utils.productos import cargar_productos
+    datos = cargar_productos()
+
+    carpeta = obtener_ruta_carpeta()
+    if os.path.isdir(carpeta):
+        shutil.rmtree(carpeta)
+    os.makedirs(carpeta)
+    manifiesto = armar_manifiesto(datos)
+    for entrada, categoria in zip(manifiesto["categorias"], datos["categorias"]):
+        escribir_archivo_atomico(
+            os.path.join(carpeta, entrada["archivo"]), codec_json.codificar(categoria, codec_json.obtener_modo())
+        )
+    escribir_archivo_atomico(
+        os.path.join(carpeta, NOMBRE_MANIFIESTO), codec_json.codificar(manifiesto, codec_json.MODO_LEGIBLE)
+    )
+    return {
+        "categorias": len(datos["categorias"]),
+        "productos": sum(len(categoria.get("productos", [])) for categoria in datos["categorias"])
+    }
+
+
+def unir_en_json():
+    """
+    Vuelve a guardar los productos en un solo productos.json y elimina la carpeta particionada
+
+    Returns:
+        int: Cantidad de productos, o None si el catálogo no estaba particionado
+    """
+    if not particionado_activo():
+        return None
+
+    from utils.rutas import obtener_ruta_json
+    from utils.productos import cargar_productos
+    from utils import diario_catalogo, snapshot_catalogo
+    datos = cargar_productos()
+
+    ruta_json = obtener_ruta_json('productos.json')
+    escribir_archivo_atomico(ruta_json, codec_json.codificar(datos, codec_json.obtener_modo()))
+    # El diario y el snapshot eran del productos.json anterior
+    diario_catalogo.eliminar_diario(ruta_json)
+    snapshot_catalogo.eliminar_snapshot(ruta_json)
+    shutil.rmtree(obtener_ruta_carpeta())
+    return sum(len(categoria.get("productos", [])) for categoria in datos.get("categorias", []))
@@ -0,0 +1,578 @@
+"""
+Módulo con el almacenamiento opcional del catálogo en SQLite
+Guarda productos e ingredientes en tablas indexadas (productos, ingredientes y
+producto_ingredientes) de una base en modo WAL, detrás de la misma API de
+utils.productos y utils.ingredientes.
+
+Se activa cuando existe data/catalogo.db (se crea con importar_desde_json o con el
+script importar_catalogo_sqlite.py). Mientras está activo, los JSON del catálogo
+dejan de actualizarse.
+
+Las modificaciones se siguen agrupando con el persistidor diferido, pero cada
+escritura toca solo las filas de los productos/ingredientes que cambiaron.
+El modo WAL permite que otro proceso (por ejemplo una segunda terminal) lea el
+catálogo mientras la caja escribe.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from utils.catalogo import RepositorioJSON, ajustar_ultimo_id, leer_json_con_diario
+from utils.esquema_catalogo import (
+    ids_apartados, normalizar_productos, normalizar_ingredientes, informar_problemas
+)
+
+
+NOMBRE_BASE_DATOS = 'catalogo.db'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS categorias (
+    nombre TEXT PRIMARY KEY,
+    posicion INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    categoria TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    precio REAL NOT NULL DEFAULT 0,
+    descripcion TEXT,
+    imagen TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos (categoria, posicion);
+CREATE TABLE IF NOT EXISTS ingredientes (
+    id INTEGER PRIMARY KEY,
+    posicion INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    categorias TEXT NOT NULL,
+    precio_extra REAL NOT NULL DEFAULT 0,
+    precio_resta REAL NOT NULL DEFAULT 0,
+    imagen TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ingredientes_nombre ON ingredientes (nombre);
+CREATE TABLE IF NOT EXISTS producto_ingredientes (
+    producto_id INTEGER NOT NULL REFERENCES productos (id) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    cantidad_base INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (producto_id, posicion)
+);
+CREATE INDEX IF NOT EXISTS idx_producto_ingredientes_nombre ON producto_ingredientes (nombre);
+"""
+
+# Claves con columna propia; el resto de las claves de cada fila se guarda como JSON en "extra"
+_CLAVES_PRODUCTO = ("id", "nombre", "precio", "descripcion", "imagen", "ingredientes")
+_CLAVES_INGREDIENTE = ("id", "nombre", "categorias", "precio_extra", "precio_resta", "imagen")
+
+
+def obtener_ruta_base_datos():
+    """Obtiene la ruta del archivo SQLite del catálogo"""
+    from utils.rutas import obtener_ruta_data
+    return os.path.join(obtener_ruta_data(), NOMBRE_BASE_DATOS)
+
+
+def sqlite_activo():
+    """Indica si el catálogo se guarda en SQLite (existe data/catalogo.db)"""
+    return os.path.exists(obtener_ruta_base_datos())
+
+
+def abrir_conexion(ruta):
+    """
+    Abre una conexión a la base del catálogo en modo WAL y crea las tablas si faltan
+    La conexión se comparte entre la interfaz y el thread de escritura (protegida con un lock)
+    """
+    conexion = sqlite3.connect(ruta, timeout=5.0, isolation_level=None, check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute("PRAGMA foreign_keys=ON")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+def _leer_meta(conexion, clave, por_defecto=None):
+    fila = conexion.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else por_defecto
+
+
+def _escribir_meta(conexion, clave, valor):
+    conexion.execute(
+        "INSERT INTO meta (clave, valor) VALUES (?, ?) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor",
+        (clave, valor)
+    )
+
+
+def _extra(fila, claves):
+    """Serializa las claves sin columna propia (None si no hay)"""
+    extra = {clave: valor for clave, valor in fila.items() if clave not in claves}
+    return json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+def _borrar_filas(conexion, tabla, columna, conservar):
+    """Borra todas las filas de una tabla menos las de los IDs a conservar"""
+    if not conservar:
+        conexion.execute(f"DELETE FROM {tabla}")
+        return
+    marcas = ", ".join("?" * len(conservar))
+    conexion.execute(f"DELETE FROM {tabla} WHERE {columna} NOT IN ({marcas})", tuple(conservar))
+
+
+# --- Productos -------------------------------------------------------------
+
+def _fila_producto(categoria_nombre, producto):
+    claves = _CLAVES_PRODUCTO
+    if producto.get("ingredientes") == []:
+        # Conservar la lista vacía (no tiene filas en producto_ingredientes)
+        claves = tuple(clave for clave in claves if clave != "ingredientes")
+    return (
+        producto.get("id"),
+        categoria_nombre,
+        producto.get("nombre", ""),
+        float(producto.get("precio", 0) or 0),
+        producto.get("descripcion"),
+        producto.get("imagen"),
+        _extra(producto, claves)
+    )
+
+
+def _filas_ingredientes_producto(producto):
+    return [
+        (producto.get("id"), posicion, ing.get("nombre", ""), ing.get("cantidad_base", 1))
+        for posicion, ing in enumerate(producto.get("ingredientes", []))
+    ]
+
+
+def leer_productos(conexion):
+    """Arma la estructura de productos.json a partir de las tablas (None si la base está vacía)"""
+    categorias = [
+        {"nombre": nombre, "productos": []}
+        for (nombre,) in conexion.execute("SELECT nombre FROM categorias ORDER BY posicion")
+    ]
+    ultimo_id = _leer_meta(conexion, "ultimo_id_productos")
+    if not categorias and ultimo_id is None:
+        return None
+
+    ingredientes_por_producto = {}
+    for producto_id, nombre, cantidad_base in conexion.execute(
+        "SELECT producto_id, nombre, cantidad_base FROM producto_ingredientes "
+        "ORDER BY producto_id, posicion"
+    ):
+        ingredientes_por_producto.setdefault(producto_id, []).append(
+            {"nombre": nombre, "cantidad_base": cantidad_base}
+        )
+
+    categorias_por_nombre = {categoria["nombre"]: categoria for categoria in categorias}
+    for producto_id, categoria_nombre, nombre, precio, descripcion, imagen, extra in conexion.execute(
+        "SELECT id, categoria, nombre, precio, descripcion, imagen, extra FROM productos "
+        "ORDER BY posicion, id"
+    ):
+        producto = {"id": producto_id, "nombre": nombre, "precio": precio}
+        if descripcion is not None:
+            producto["descripcion"] = descripcion
+        if imagen:
+            producto["imagen"] = imagen
+        if producto_id in ingredientes_por_producto:
+            producto["ingredientes"] = ingredientes_por_producto[producto_id]
+        if extra:
+            producto.update(json.loads(extra))
+
+        categoria = categorias_por_nombre.get(categoria_nombre)
+        if categoria is None:
+            categoria = {"nombre": categoria_nombre, "productos": []}
+            categorias_por_nombre[categoria_nombre] = categoria
+            categorias.append(categoria)
+        categoria["productos"].append(producto)
+
+    return {"categorias": categorias, "ultimo_id": ultimo_id or 0}
+
+
+def _sigue_en_orden(conexion, anterior_id, actual):
+    """Indica si el producto que lo precede en memoria también lo precede en la base"""
+    if anterior_id is None:
+        return True
+    fila = conexion.execute("SELECT categoria, posicion FROM productos WHERE id = ?", (anterior_id,)).fetchone()
+    return fila is not None and fila[0] == actual[0] and fila[1] < actual[1]
+
+
+def preparar_productos(datos, ids):
+    """
+    Serializa (bajo el bloqueo del repositorio) lo que hay que escribir de productos
+
+    Args:
+        datos: Datos en memoria
+        ids: IDs de los productos modificados, o None para reescribir todo
+    """
+    categorias = [(categoria["nombre"], posicion) for posicion, categoria in enumerate(datos.get("categorias", []))]
+    productos = {}
+    for categoria in datos.get("categorias", []):
+        anterior_id = None
+        for producto in categoria.get("productos", []):
+            if ids is None or producto.get("id") in ids:
+                productos[producto.get("id")] = (
+                    _fila_producto(categoria["nombre"], producto),
+                    _filas_ingredientes_producto(producto),
+                    anterior_id  # Producto que lo precede en la categoría (para conservar el orden)
+                )
+            anterior_id = producto.get("id")
+
+    if ids is not None:
+        # Los IDs modificados que ya no están en memoria fueron eliminados
+        for producto_id in ids:
+            productos.setdefault(producto_id, None)
+
+    return {
+        "completo": ids is None,
+        "categorias": categorias,
+        "productos": productos,
+        # Filas inválidas apartadas al cargar: quedan en la base tal cual (ver utils.esquema_catalogo)
+        "conservar": ids_apartados(datos) - set(productos) if ids is None else set(),
+        "ultimo_id": datos.get("ultimo_id", 0)
+    }
+
+
+def aplicar_productos(conexion, preparado):
+    """Escribe en la base lo preparado por preparar_productos (dentro de una transacción abierta)"""
+    if preparado["completo"]:
+        _borrar_filas(conexion, "producto_ingredientes", "producto_id", preparado["conservar"])
+        _borrar_filas(conexion, "productos", "id", preparado["conservar"])
+
+    existentes = [nombre for (nombre,) in conexion.execute("SELECT nombre FROM categorias ORDER BY posicion")]
+    if existentes != [nombre for nombre, _ in preparado["categorias"]]:
+        conexion.execute("DELETE FROM categorias")
+        conexion.executemany("INSERT INTO categorias (nombre, posicion) VALUES (?, ?)", preparado["categorias"])
+
+    for posicion, (producto_id, entrada) in enumerate(preparado["productos"].items()):
+        conexion.execute("DELETE FROM producto_ingredientes WHERE producto_id = ?", (producto_id,))
+        if entrada is None:
+            conexion.execute("DELETE FROM productos WHERE id = ?", (producto_id,))
+            continue
+
+        fila, filas_ingredientes, anterior_id = entrada
+        if preparado["completo"]:
+            conexion.execute(
+                "INSERT INTO productos (id, categoria, posicion, nombre, precio, descripcion, imagen, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fila[0], fila[1], posicion) + fila[2:]
+            )
+        else:
+            actual = conexion.execute(
+                "SELECT categoria, posicion FROM productos WHERE id = ?", (producto_id,)
+            ).fetchone()
+            if actual and actual[0] == fila[1] and _sigue_en_orden(conexion, anterior_id, actual):
+                # Sigue en la misma categoría y en el mismo lugar: conserva su posición
+                conexion.execute(
+                    "UPDATE productos SET nombre = ?, precio = ?, descripcion = ?, imagen = ?, extra = ? "
+                    "WHERE id = ?",
+                    fila[2:] + (producto_id,)
+                )
+            else:
+                # Alta o cambio de categoría: va al final de la categoría (igual que en memoria)
+                conexion.execute(
+                    "INSERT OR REPLACE INTO productos "
+                    "(id, categoria, posicion, nombre, precio, descripcion, imagen, extra) "
+                    "VALUES (?, ?, (SELECT COALESCE(MAX(posicion) + 1, 0) FROM productos WHERE categoria = ?), "
+                    "?, ?, ?, ?, ?)",
+                    (fila[0], fila[1], fila[1]) + fila[2:]
+                )
+        conexion.executemany(
+            "INSERT INTO producto_ingredientes (producto_id, posicion, nombre, cantidad_base) VALUES (?, ?, ?, ?)",
+            filas_ingredientes
+        )
+
+    _escribir_meta(conexion, "ultimo_id_productos", preparado["ultimo_id"])
+
+
+# --- Ingredientes ----------------------------------------------------------
+
+def _fila_ingrediente(ingrediente):
+    return (
+        ingrediente.get("id"),
+        ingrediente.get("nombre", ""),
+        json.dumps(ingrediente.get("categorias", []), ensure_ascii=False),
+        float(ingrediente.get("precio_extra", 0) or 0),
+        float(ingrediente.get("precio_resta", 0) or 0),
+        ingrediente.get("imagen"),
+        _extra(ingrediente, _CLAVES_INGREDIENTE)
+    )
+
+
+def leer_ingredientes(conexion):
+    """Arma la estructura de ingredientes.json a partir de las tablas (None si la base está vacía)"""
+    ultimo_id = _leer_meta(conexion, "ultimo_id_ingredientes")
+    if ultimo_id is None:
+        return None
+
+    ingredientes = []
+    for ingrediente_id, nombre, categorias, precio_extra, precio_resta, imagen, extra in conexion.execute(
+        "SELECT id, nombre, categorias, precio_extra, precio_resta, imagen, extra FROM ingredientes "
+        "ORDER BY posicion, id"
+    ):
+        ingrediente = {
+            "id": ingrediente_id,
+            "nombre": nombre,
+            "categorias": json.loads(categorias),
+            "precio_extra": precio_extra,
+            "precio_resta": precio_resta
+        }
+        if imagen:
+            ingrediente["imagen"] = imagen
+        if extra:
+            ingrediente.update(json.loads(extra))
+        ingredientes.append(ingrediente)
+
+    return {"ingredientes": ingredientes, "ultimo_id": ultimo_id}
+
+
+def preparar_ingredientes(datos, ids):
+    """
+    Serializa (bajo el bloqueo del repositorio) lo que hay que escribir de ingredientes
+
+    Args:
+        datos: Datos en memoria
+        ids: IDs de los ingredientes modificados, o None para reescribir todo
+    """
+    ingredientes = {}
+    for ingrediente in datos.get("ingredientes", []):
+        if ids is None or ingrediente.get("id") in ids:
+            ingredientes[ingrediente.get("id")] = _fila_ingrediente(ingrediente)
+
+    if ids is not None:
+        for ingrediente_id in ids:
+            ingredientes.setdefault(ingrediente_id, None)
+
+    return {
+        "completo": ids is None,
+        "ingredientes": ingredientes,
+        "conservar": ids_apartados(datos) - set(ingredientes) if ids is None else set(),
+        "ultimo_id": datos.get("ultimo_id", 0)
+    }
+
+
+def aplicar_ingredientes(conexion, preparado):
+    """Escribe en la base lo preparado por preparar_ingredientes (dentro de una transacción abierta)"""
+    if preparado["completo"]:
+        _borrar_filas(conexion, "ingredientes", "id", preparado["conservar"])
+
+    for posicion, (ingrediente_id, fila) in enumerate(preparado["ingredientes"].items()):
+        if fila is None:
+            conexion.execute("DELETE FROM ingredientes WHERE id = ?", (ingrediente_id,))
+        elif preparado["completo"]:
+            conexion.execute(
+                "INSERT INTO ingredientes "
+                "(id, posicion, nombre, categorias, precio_extra, precio_resta, imagen, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fila[0], posicion) + fila[1:]
+            )
+        else:
+            cursor = conexion.execute(
+                "UPDATE ingredientes SET nombre = ?, categorias = ?, precio_extra = ?, precio_resta = ?, "
+                "imagen = ?, extra = ? WHERE id = ?",
+                fila[1:] + (ingrediente_id,)
+            )
+            if cursor.rowcount == 0:
+                conexion.execute(
+                    "INSERT INTO ingredientes "
+                    "(id, posicion, nombre, categorias, precio_extra, precio_resta, imagen, extra) "
+                    "VALUES (?, (SELECT COALESCE(MAX(posicion) + 1, 0) FROM ingredientes), ?, ?, ?, ?, ?, ?)",
+                    fila
+                )
+
+    _escribir_meta(conexion, "ultimo_id_ingredientes", preparado["ultimo_id"])
+
+
+_TABLAS = {
+    "productos": (leer_productos, preparar_productos, aplicar_productos),
+    "ingredientes": (leer_ingredientes, preparar_ingredientes, aplicar_ingredientes)
+}
+
+
+class RepositorioSQLite(RepositorioJSON):
+    """
+    Repositorio en memoria de un catálogo respaldado por SQLite
+
+    Tiene la misma interfaz que RepositorioJSON (los datos en memoria siguen siendo
+    la estructura de los JSON) y los IDs modificados que recibe guardar() se escriben
+    como filas en lugar de registros del diario. Los cambios de otro proceso se
+    detectan con un número de versión por catálogo guardado en la tabla meta.
+    """
+
+    def __init__(self, nombre, crear_estructura_inicial, migrar=None, al_cargar=None):
+        """
+        Args:
+            nombre: "productos" o "ingredientes"
+            (el resto igual que RepositorioJSON)
+        """
+        super().__init__(obtener_ruta_base_datos, crear_estructura_inicial, migrar, al_cargar)
+        self.nombre = nombre
+        self.leer, self.preparar, self.aplicar = _TABLAS[nombre]
+        self.version = None
+        self._clave_version = f"version_{nombre}"
+        self._conexion = None
+        self._bloqueo_conexion = threading.Lock()
+
+    def _obtener_conexion(self):
+        if self._conexion is None:
+            self._conexion = abrir_conexion(self.obtener_ruta())
+        return self._conexion
+
+    def cargar(self):
+        """Retorna los datos del catálogo, releyendo la base solo si otro proceso la modificó"""
+        datos = self._datos_vigentes()
+        if datos is not None:
+            return datos
+
+        with self.bloqueo:
+            if self.datos is not None and (self.modificado or self.escribiendo):
+                return self.datos
+            if self._verificado_recientemente():
+                return self.datos
+
+            with self._bloqueo_conexion:
+                conexion = self._obtener_conexion()
+                version = _leer_meta(conexion, self._clave_version, 0)
+                if self.datos is not None and version == self.version:
+                    return self.datos
+
+                # Leer todas las tablas dentro de una misma transacción (lectura consistente)
+                conexion.execute("BEGIN")
+                try:
+                    version = _leer_meta(conexion, self._clave_version, 0)
+                    datos = self.leer(conexion)
+                finally:
+                    conexion.execute("COMMIT")
+                self.lecturas_disco += 1
+
+            if datos is None:
+                datos = self.crear_estructura_inicial()
+                self.modificado = True
+                self._cambios = None
+
+            self.datos = datos
+            self.version = version
+
+            if self.migrar and self.migrar(datos):
+                self.modificado = True
+                self._cambios = None
+            if self.al_cargar:
+                self.al_cargar(datos)
+            self._marcar_lectura()
+            if self.modificado:
+                self._programar()
+            return datos
+
+    def escribir_pendiente(self):
+        """
+        Escribe en una sola transacción las filas modificadas
+
+        Returns:
+            bool: True si escribió en la base
+        """
+        with self._bloqueo_escritura:
+            with self.bloqueo:
+                if not self.modificado or self.datos is None:
+                    return False
+                cambios = self._cambios
+                preparado = self.preparar(self.datos, cambios)
+                self._cambios = set()
+                self.modificado = False
+                self.escribiendo = True
+
+            try:
+                with self._bloqueo_conexion:
+                    conexion = self._obtener_conexion()
+                    conexion.execute("BEGIN IMMEDIATE")
+                    try:
+                        self.aplicar(conexion, preparado)
+                        version = _leer_meta(conexion, self._clave_version, 0) + 1
+                        _escribir_meta(conexion, self._clave_version, version)
+                        conexion.execute("COMMIT")
+                    except BaseException:
+                        conexion.execute("ROLLBACK")
+                        raise
+            except Exception:
+                with self.bloqueo:
+                    # Reintentar con la próxima escritura
+                    if cambios is None or self._cambios is None:
+                        self._cambios = None
+                    else:
+                        self._cambios.update(cambios)
+                    self.modificado = True
+                    self.escribiendo = False
+                raise
+
+            with self.bloqueo:
+                self.escrituras_disco += 1
+                self.version = version
+                self.escribiendo = False
+            return True
+
+    def invalidar(self):
+        """Descarta la copia en memoria para forzar una relectura de la base"""
+        with self.bloqueo:
+            super().invalidar()
+            self.version = None
+
+
+def importar_desde_json(reemplazar=False):
+    """
+    Importa productos.json e ingredientes.json a data/catalogo.db (una sola vez)
+    A partir de ahí la aplicación usa SQLite como almacenamiento del catálogo.
+    Se importa lo mismo que vería la aplicación: primero se escriben los cambios
+    pendientes en memoria y a cada JSON se le aplica su diario sin compactar.
+    Las filas inválidas (ver utils.esquema_catalogo) no se importan: quedan en los JSON.
+
+    Args:
+        reemplazar: Si la base ya existe, reemplazar su contenido con el de los JSON
+
+    Returns:
+        dict: Cantidad de productos e ingredientes importados, o None si la base ya existía
+    """
+    from utils.rutas import obtener_ruta_json
+    from utils import persistencia
+
+    ruta = obtener_ruta_base_datos()
+    if os.path.exists(ruta) and not reemplazar:
+        return None
+
+    # Los cambios que todavía no llegaron al disco van al diario de cada JSON
+    persistencia.flush()
+    catalogos = {}
+    for nombre, estructura_inicial, normalizar in (
+        ("productos", {"categorias": []}, normalizar_productos),
+        ("ingredientes", {"ingredientes": []}, normalizar_ingredientes)
+    ):
+        datos = leer_json_con_diario(obtener_ruta_json(f"{nombre}.json"), nombre)
+        if not isinstance(datos, dict):
+            datos = estructura_inicial
+        informar_problemas(nombre, normalizar(datos))
+        catalogos[nombre] = datos
+
+    productos = [p for cat in catalogos["productos"].get("categorias", []) for p in cat.get("productos", [])]
+    ingredientes = catalogos["ingredientes"].get("ingredientes", [])
+    ajustar_ultimo_id(catalogos["productos"], max([p.get("id") or 0 for p in productos], default=0))
+    ajustar_ultimo_id(catalogos["ingredientes"], max([i.get("id") or 0 for i in ingredientes], default=0))
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    conexion = abrir_conexion(ruta)
+    try:
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            for nombre, (_, preparar, aplicar) in _TABLAS.items():
+                aplicar(conexion, preparar(catalogos[nombre], None))
+                clave_version = f"version_{nombre}"
+                _escribir_meta(conexion, clave_version, _leer_meta(conexion, clave_version, 0) + 1)
+            conexion.execute("COMMIT")
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+    finally:
+        conexion.close()
+
+    return {"productos": len(productos), "ingredientes": len(ingredientes)}
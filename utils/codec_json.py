@@ -0,0 +1,145 @@
+"""
+Módulo de codificación JSON de los archivos de datos (productos.json, ingredientes.json
+y config.json)
+Usa orjson si está instalado (parsea y serializa bastante más rápido) y si no el módulo
+json de la biblioteca estándar; los dos leen y escriben exactamente el mismo formato.
+
+Hay dos modos de escritura:
+- "legible": indentado con 2 espacios, para editar los archivos a mano
+- "compacto": sin espacios ni saltos de línea, más chico y más rápido de leer y escribir
+
+El modo se configura en config.json ({"archivos": {"formato_json": "compacto"}}).
+Si no se indica, la aplicación instalada usa "compacto" y en desarrollo "legible".
+"""
+import json
+import sys
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+MODO_LEGIBLE = "legible"
+MODO_COMPACTO = "compacto"
+MODOS = (MODO_LEGIBLE, MODO_COMPACTO)
+
+# Error que se produce al decodificar un JSON inválido (orjson.JSONDecodeError es subclase)
+ErrorDecodificacion = json.JSONDecodeError
+
+_modo = None  # Modo de escritura de los catálogos (se lee de config.json la primera vez)
+
+
+def codificar(datos, modo=MODO_LEGIBLE, usar_orjson=None):
+    """
+    Serializa datos a JSON en UTF-8
+
+    Args:
+        datos: Objeto a serializar (dicts con claves str, listas, números, textos, bool, None)
+        modo: MODO_LEGIBLE o MODO_COMPACTO
+        usar_orjson: Forzar (True) o evitar (False) orjson; None lo usa si está instalado
+
+    Returns:
+        bytes: JSON codificado en UTF-8
+    """
+    if usar_orjson is None:
+        usar_orjson = ORJSON_AVAILABLE
+
+    if usar_orjson:
+        return orjson.dumps(datos, option=orjson.OPT_INDENT_2 if modo == MODO_LEGIBLE else 0)
+    if modo == MODO_LEGIBLE:
+        texto = json.dumps(datos, indent=2, ensure_ascii=False)
+    else:
+        texto = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+    return texto.encode('utf-8')
+
+
+def decodificar(contenido, usar_orjson=None):
+    """
+    Parsea un JSON (bytes en UTF-8 o texto)
+
+    Raises:
+        ErrorDecodificacion: Si el contenido no es un JSON válido
+    """
+    if usar_orjson is None:
+        usar_orjson = ORJSON_AVAILABLE
+
+    if usar_orjson:
+        return orjson.loads(contenido)
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8')
+    return json.loads(contenido)
+
+
+def leer_archivo(ruta):
+    """
+    Lee y parsea un archivo JSON
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe
+        ErrorDecodificacion: Si el archivo no es un JSON válido
+    """
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+    try:
+        return decodificar(contenido)
+    except UnicodeDecodeError as e:
+        # Mismo error que un JSON mal formado para quien lo llama
+        raise ErrorDecodificacion(f"UTF-8 inválido: {e}", "", 0)
+
+
+def escribir_archivo(ruta, datos, modo=None):
+    """
+    Escribe un archivo JSON de forma atómica (ver utils.persistencia)
+
+    Args:
+        ruta: Ruta completa del archivo
+        datos: Objeto a guardar
+        modo: MODO_LEGIBLE o MODO_COMPACTO (None usa el modo configurado)
+    """
+    # Importar aquí para evitar importación circular
+    from utils.persistencia import escribir_archivo_atomico
+    escribir_archivo_atomico(ruta, codificar(datos, modo or obtener_modo()))
+
+
+def obtener_modo():
+    """Retorna el modo de escritura de los catálogos (configurado o por defecto)"""
+    global _modo
+    if _modo is None:
+        _modo = _leer_modo_configurado() or (MODO_COMPACTO if getattr(sys, 'frozen', False) else MODO_LEGIBLE)
+    return _modo
+
+
+def establecer_modo(modo):
+    """
+    Cambia el modo de escritura de los catálogos para el resto de la ejecución
+    (los archivos se reescriben en el nuevo modo la próxima vez que se guarden)
+    """
+    global _modo
+    if modo not in MODOS:
+        raise ValueError(f"Modo de JSON desconocido: {modo}")
+    _modo = modo
+
+
+def recargar_modo():
+    """Vuelve a leer el modo de config.json la próxima vez que se use (config.json cambió)"""
+    global _modo
+    _modo = None
+
+
+def _leer_modo_configurado():
+    """Lee el modo de config.json (None si no está configurado o no es válido)"""
+    # Importar aquí para evitar importación circular
+    from utils.rutas import obtener_ruta_json
+    try:
+        config = leer_archivo(obtener_ruta_json('config.json'))
+    except (OSError, ErrorDecodificacion):
+        return None
+
+    archivos = config.get("archivos") if isinstance(config, dict) else None
+    modo = archivos.get("formato_json") if isinstance(archivos, dict) else None
+    if modo is not None and modo not in MODOS:
+        print(f"Advertencia: formato_json '{modo}' no es válido en config.json (use {' o '.join(MODOS)})")
+        return None
+    return modo
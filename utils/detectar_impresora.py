@@ -3,9 +3,12 @@ Script auxiliar para detectar y configurar la impresora por nombre
 Lista todas las impresoras disponibles en Windows y permite seleccionar una
 """
 import sys
-import json
 import os
 
+# Agregar el directorio raíz al path para importar módulos (se ejecuta como script)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import codec_json
+
 # Configurar encoding para Windows
 if sys.platform == 'win32':
     import io
@@ -68,9 +71,8 @@ def detectar_impresoras():
     ruta_config = obtener_ruta_config()
     nombre_actual = None
     try:
-        with open(ruta_config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            nombre_actual = config.get('impresora', {}).get('nombre_impresora')
+        config = codec_json.leer_archivo(ruta_config)
+        nombre_actual = config.get('impresora', {}).get('nombre_impresora')
     except:
         pass
     
@@ -114,9 +116,8 @@ def detectar_impresoras():
         }
     }
     
-    os.makedirs(os.path.dirname(ruta_config), exist_ok=True)
-    with open(ruta_config, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    # config.json siempre se escribe legible (se edita a mano)
+    codec_json.escribir_archivo(ruta_config, config, codec_json.MODO_LEGIBLE)
     
     print(f"\n[OK] Configuracion guardada en: {ruta_config}")
     print(f"  Impresora: {impresora_seleccionada}")
@@ -0,0 +1,268 @@
+"""
+Módulo del diario de cambios de los catálogos JSON (escritura proporcional al cambio)
+En lugar de reescribir el JSON completo por cada alta, baja o modificación, los cambios
+se agregan al final de un diario (productos.json -> productos.json.diario), un registro
+por línea en JSON compacto, con fsync por registro.
+
+Al cargar se lee el JSON (o su snapshot) y se le aplican los registros del diario.
+Cuando el diario supera TAMANIO_MAXIMO_DIARIO se compacta: se reescribe el JSON
+completo con los cambios incluidos y se elimina el diario.
+
+La primera línea del diario indica el hash del JSON sobre el que se aplica: si el JSON
+se reemplazó (compactación interrumpida, edición a mano, copia de otra máquina) el
+diario ya no corresponde: al cargar se ignora y el próximo registro lo reemplaza.
+Los registros se agregan con el bloqueo entre procesos del JSON tomado y solo si el
+JSON y el diario en disco son los que conoce quien escribe (ver utils.catalogo).
+Si la aplicación se corta a mitad de un registro, la línea incompleta se ignora y se
+recorta del archivo.
+"""
+import os
+
+from utils import codec_json
+
+
+EXTENSION_DIARIO = ".diario"
+
+# Versión del formato del diario (cambiarla descarta los diarios existentes)
+VERSION_FORMATO = 1
+
+# Tamaño (en bytes) a partir del cual el diario se compacta en el JSON
+TAMANIO_MAXIMO_DIARIO = 256 * 1024
+
+
+def obtener_ruta_diario(ruta_json):
+    """Retorna la ruta del diario de un archivo JSON"""
+    return ruta_json + EXTENSION_DIARIO
+
+
+def preparar_productos(datos, ids):
+    """
+    Arma (bajo el bloqueo del repositorio) el registro con los productos modificados
+
+    Cada producto va con su categoría y el ID del producto que lo precede en ella,
+    para conservar el orden al aplicarlo. Los IDs que ya no están en memoria fueron
+    eliminados (producto None).
+    """
+    eliminados = set(ids)
+    productos = []
+    for categoria in datos.get("categorias", []):
+        anterior_id = None
+        for producto in categoria.get("productos", []):
+            producto_id = producto.get("id")
+            if producto_id in ids:
+                eliminados.discard(producto_id)
+                productos.append({
+                    "id": producto_id,
+                    "categoria": categoria["nombre"],
+                    "anterior": anterior_id,
+                    "producto": producto
+                })
+            anterior_id = producto_id
+
+    return {
+        "categorias": [categoria["nombre"] for categoria in datos.get("categorias", [])],
+        "productos": [{"id": producto_id, "producto": None} for producto_id in eliminados] + productos,
+        "ultimo_id": datos.get("ultimo_id", 0)
+    }
+
+
+def aplicar_productos(datos, registro):
+    """Aplica a los datos un registro armado por preparar_productos"""
+    categorias = datos.setdefault("categorias", [])
+
+    # Categorías en el orden del registro (las que solo estén en los datos quedan al final)
+    por_nombre = {categoria["nombre"]: categoria for categoria in categorias}
+    nombres = registro.get("categorias", [])
+    ordenadas = [por_nombre.pop(nombre, None) or {"nombre": nombre, "productos": []} for nombre in nombres]
+    categorias[:] = ordenadas + [c for c in categorias if c["nombre"] in por_nombre]
+    por_nombre = {categoria["nombre"]: categoria for categoria in categorias}
+
+    for cambio in registro.get("productos", []):
+        producto_id = cambio["id"]
+        for categoria in categorias:
+            productos = categoria.setdefault("productos", [])
+            for indice, producto in enumerate(productos):
+                if producto.get("id") == producto_id:
+                    del productos[indice]
+                    break
+            else:
+                continue
+            break
+
+        producto = cambio["producto"]
+        if producto is None:
+            continue
+        categoria = por_nombre.get(cambio["categoria"])
+        if categoria is None:
+            categoria = {"nombre": cambio["categoria"], "productos": []}
+            categorias.append(categoria)
+            por_nombre[categoria["nombre"]] = categoria
+        productos = categoria.setdefault("productos", [])
+        posicion = 0
+        if cambio.get("anterior") is not None:
+            posicion = len(productos)
+            for indice, otro in enumerate(productos):
+                if otro.get("id") == cambio["anterior"]:
+                    posicion = indice + 1
+                    break
+        productos.insert(posicion, producto)
+
+    datos["ultimo_id"] = max(datos.get("ultimo_id", 0), registro.get("ultimo_id", 0))
+
+
+def preparar_ingredientes(datos, ids):
+    """Arma (bajo el bloqueo del repositorio) el registro con los ingredientes modificados"""
+    eliminados = set(ids)
+    ingredientes = []
+    for ingrediente in datos.get("ingredientes", []):
+        if ingrediente.get("id") in ids:
+            eliminados.discard(ingrediente.get("id"))
+            ingredientes.append({"id": ingrediente.get("id"), "ingrediente": ingrediente})
+
+    return {
+        "ingredientes": [{"id": ingrediente_id, "ingrediente": None} for ingrediente_id in eliminados] + ingredientes,
+        "ultimo_id": datos.get("ultimo_id", 0)
+    }
+
+
+def aplicar_ingredientes(datos, registro):
+    """Aplica a los datos un registro armado por preparar_ingredientes"""
+    ingredientes = datos.setdefault("ingredientes", [])
+    for cambio in registro.get("ingredientes", []):
+        posicion = next(
+            (indice for indice, ingrediente in enumerate(ingredientes) if ingrediente.get("id") == cambio["id"]),
+            None
+        )
+        if cambio["ingrediente"] is None:
+            if posicion is not None:
+                del ingredientes[posicion]
+        elif posicion is not None:
+            ingredientes[posicion] = cambio["ingrediente"]
+        else:
+            ingredientes.append(cambio["ingrediente"])
+
+    datos["ultimo_id"] = max(datos.get("ultimo_id", 0), registro.get("ultimo_id", 0))
+
+
+def elementos_productos(datos):
+    """Recorre los productos de todas las categorías"""
+    for categoria in datos.get("categorias", []):
+        yield from categoria.get("productos", [])
+
+
+def elementos_ingredientes(datos):
+    """Recorre los ingredientes"""
+    return iter(datos.get("ingredientes", []))
+
+
+# Funciones de cada catálogo: (preparar registro, aplicar registro, recorrer elementos)
+CATALOGOS = {
+    "productos": (preparar_productos, aplicar_productos, elementos_productos),
+    "ingredientes": (preparar_ingredientes, aplicar_ingredientes, elementos_ingredientes),
+}
+
+
+def codificar_registro(registro):
+    """Serializa un registro como una línea del diario (bytes)"""
+    return codec_json.codificar(registro, codec_json.MODO_COMPACTO) + b"\n"
+
+
+def leer_diario(ruta_json, hash_base):
+    """
+    Lee los registros del diario de un JSON
+
+    Args:
+        ruta_json: Ruta completa del archivo JSON
+        hash_base: Hash del JSON actual (ver utils.snapshot_catalogo.calcular_hash)
+
+    Returns:
+        list: Registros en orden (vacía si no hay diario o si es de otra versión del
+              JSON). Si termina en una línea incompleta se recorta.
+    """
+    ruta = obtener_ruta_diario(ruta_json)
+    try:
+        with open(ruta, 'rb') as f:
+            lineas = f.read().split(b"\n")
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        print(f"Advertencia: no se pudo leer el diario de {os.path.basename(ruta_json)}: {e}")
+        return []
+
+    try:
+        encabezado = codec_json.decodificar(lineas[0])
+    except (codec_json.ErrorDecodificacion, UnicodeDecodeError):
+        encabezado = None
+    if not _corresponde(encabezado, hash_base):
+        # El JSON ya incluye estos cambios (compactación interrumpida) o fue reemplazado.
+        # No se borra acá: otra caja puede estar reemplazando el JSON en este momento;
+        # el próximo registro (con el bloqueo tomado) lo reemplaza
+        if encabezado is not None:
+            print(f"Advertencia: el diario de {os.path.basename(ruta_json)} no corresponde al JSON actual, se ignora")
+        return []
+
+    registros = []
+    tamanio_valido = len(lineas[0]) + 1
+    for linea in lineas[1:]:
+        if not linea:
+            continue
+        try:
+            registros.append(codec_json.decodificar(linea))
+        except (codec_json.ErrorDecodificacion, UnicodeDecodeError):
+            # Registro a medio escribir (la aplicación se cortó): se descarta con lo que sigue
+            print(f"Advertencia: se descartó un registro incompleto del diario de {os.path.basename(ruta_json)}")
+            try:
+                os.truncate(ruta, tamanio_valido)
+            except OSError:
+                pass
+            break
+        tamanio_valido += len(linea) + 1
+    return registros
+
+
+def _corresponde(encabezado, hash_base):
+    """Indica si el encabezado de un diario es de esta versión del formato y de este JSON"""
+    return (isinstance(encabezado, dict) and encabezado.get("version") == VERSION_FORMATO
+            and encabezado.get("base") == hash_base)
+
+
+def agregar_registro(ruta_json, linea, hash_base):
+    """
+    Agrega un registro al diario de un JSON y espera a que llegue al disco (fsync)
+    Se llama con el bloqueo entre procesos del JSON tomado (ver utils.persistencia.bloqueo_archivo)
+
+    Args:
+        ruta_json: Ruta completa del archivo JSON
+        linea: Registro ya serializado con codificar_registro()
+        hash_base: Hash del JSON sobre el que se aplica; si el diario existente es de
+                   otro JSON (ya no corresponde) se reemplaza por uno nuevo
+
+    Returns:
+        int: Tamaño del diario después de agregar el registro
+    """
+    ruta = obtener_ruta_diario(ruta_json)
+    with open(ruta, 'a+b') as f:
+        f.seek(0)
+        primera = f.readline()
+        if primera:
+            try:
+                encabezado = codec_json.decodificar(primera)
+            except (codec_json.ErrorDecodificacion, UnicodeDecodeError):
+                encabezado = None
+            if not _corresponde(encabezado, hash_base):
+                f.truncate(0)
+                primera = b""
+        if not primera:
+            f.write(codificar_registro({"version": VERSION_FORMATO, "base": hash_base}))
+        f.write(linea)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def eliminar_diario(ruta_json):
+    """Elimina el diario de un JSON si existe (sus cambios ya están en el JSON)"""
+    try:
+        os.remove(obtener_ruta_diario(ruta_json))
+    except OSError:
+        pass
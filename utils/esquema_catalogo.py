@@ -0,0 +1,365 @@
+"""
+Módulo de validación y normalización de los catálogos (una sola pasada al cargar)
+Cada vez que se lee productos o ingredientes se revisan todas las filas:
+- Se completan los valores por defecto (descripción vacía, sin ingredientes,
+  cantidad base 1, precios de extra y resta 0.0, sin categorías)
+- Se convierten los tipos (IDs enteros, precios float, cantidades enteras), por
+  ejemplo un precio guardado como texto "1500"
+- Las filas que no se pueden usar (sin nombre, precio que no es un número, ID
+  repetido...) se apartan sin modificarlas a la lista "_filas_invalidas" de su
+  categoría, producto o catálogo, y se informan
+
+Así los cálculos de precios, el carrito y los tickets pueden leer las claves
+directamente (producto["precio"], ingrediente["cantidad_base"]) sin valores por
+defecto, y un JSON mal armado se detecta al arrancar y no en medio de un pedido.
+Las filas apartadas se vuelven a guardar tal cual con el resto del catálogo (no
+se pierden) y se revisan de nuevo en cada carga: si se corrigen a mano en el
+archivo, vuelven a su lista. Los problemas se anotan en data/problemas_catalogo.log
+y la aplicación los muestra al iniciar.
+"""
+import math
+import os
+from datetime import datetime
+
+
+class FilaInvalida(ValueError):
+    """Fila del catálogo que no se puede normalizar"""
+
+
+# Clave donde se apartan las filas inválidas (en los datos, en cada categoría y en cada producto)
+CLAVE_FILAS_INVALIDAS = "_filas_invalidas"
+
+NOMBRE_REGISTRO_PROBLEMAS = "problemas_catalogo.log"
+
+# Problemas encontrados en la última carga de cada catálogo ("productos", "ingredientes")
+_problemas = {}
+# Problemas ya anotados en el registro (para no repetirlos en cada relectura)
+_informados = set()
+
+
+def _entero(valor, campo):
+    """Convierte un valor a int (acepta 3, 3.0 y "3")"""
+    if isinstance(valor, bool):
+        raise FilaInvalida(f"{campo} no es un número: {valor!r}")
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise FilaInvalida(f"{campo} no es un número: {valor!r}")
+    if not numero.is_integer():
+        raise FilaInvalida(f"{campo} no es un número entero: {valor!r}")
+    return int(numero)
+
+
+def _precio(valor, campo):
+    """Convierte un valor a float (acepta números y textos como "1500" o "1500,50")"""
+    if isinstance(valor, bool):
+        raise FilaInvalida(f"{campo} no es un número: {valor!r}")
+    if isinstance(valor, str):
+        valor = valor.strip().replace(",", ".")
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        raise FilaInvalida(f"{campo} no es un número: {valor!r}")
+    if not math.isfinite(numero):
+        raise FilaInvalida(f"{campo} no es un número válido: {valor!r}")
+    return numero
+
+
+def _nombre(fila):
+    """Nombre obligatorio de una fila (texto no vacío, sin espacios en los extremos)"""
+    nombre = fila.get("nombre")
+    if not isinstance(nombre, str) or not nombre.strip():
+        raise FilaInvalida("falta el nombre")
+    return nombre.strip()
+
+
+def _filas(contenedor, clave):
+    """Filas de una lista más las apartadas en la carga anterior (para volver a revisarlas)"""
+    filas = contenedor.get(clave)
+    if not isinstance(filas, list):
+        filas = []
+    apartadas = contenedor.get(CLAVE_FILAS_INVALIDAS)
+    if isinstance(apartadas, list):
+        filas = filas + apartadas
+    return filas
+
+
+def _apartar(contenedor, invalidas):
+    """Guarda las filas inválidas en el contenedor (o quita la clave si no quedó ninguna)"""
+    if invalidas:
+        contenedor[CLAVE_FILAS_INVALIDAS] = invalidas
+    else:
+        contenedor.pop(CLAVE_FILAS_INVALIDAS, None)
+
+
+def normalizar_ingrediente_producto(ingrediente):
+    """
+    Normaliza la referencia a un ingrediente dentro de un producto ({nombre, cantidad_base})
+
+    Returns:
+        dict: La misma referencia, corregida
+
+    Raises:
+        FilaInvalida: Si no tiene nombre o la cantidad no es un entero (sin modificarla)
+    """
+    if not isinstance(ingrediente, dict):
+        raise FilaInvalida("ingrediente que no es un objeto")
+    nombre = _nombre(ingrediente)
+    cantidad = _entero(ingrediente.get("cantidad_base", 1), "cantidad_base")
+    if cantidad < 0:
+        raise FilaInvalida(f"cantidad_base negativa: {cantidad}")
+    ingrediente["nombre"] = nombre
+    ingrediente["cantidad_base"] = cantidad
+    return ingrediente
+
+
+def normalizar_producto(producto, problemas=None, ids=None):
+    """
+    Normaliza un producto en su lugar
+
+    Args:
+        producto: Producto del catálogo
+        problemas: Lista opcional donde se informan los ingredientes apartados
+        ids: Conjunto opcional con los IDs ya usados (un ID repetido es inválido)
+
+    Returns:
+        dict: El mismo producto, con id, nombre, precio, descripcion e ingredientes
+
+    Raises:
+        FilaInvalida: Si el producto no se puede usar (queda sin modificar)
+    """
+    if not isinstance(producto, dict):
+        raise FilaInvalida("producto que no es un objeto")
+    producto_id = _entero(producto.get("id"), "id")
+    if ids is not None and producto_id in ids:
+        raise FilaInvalida(f"ID {producto_id} repetido")
+    nombre = _nombre(producto)
+    precio = _precio(producto.get("precio"), "precio")
+
+    producto["id"] = producto_id
+    producto["nombre"] = nombre
+    producto["precio"] = precio
+    descripcion = producto.get("descripcion")
+    producto["descripcion"] = descripcion if isinstance(descripcion, str) else ""
+
+    validos = []
+    invalidos = []
+    for ingrediente in _filas(producto, "ingredientes"):
+        try:
+            validos.append(normalizar_ingrediente_producto(ingrediente))
+        except FilaInvalida as e:
+            invalidos.append(ingrediente)
+            if problemas is not None:
+                problemas.append(f"Producto {producto_id} ({nombre}): ingrediente inválido ({e}): {ingrediente!r}")
+    producto["ingredientes"] = validos
+    _apartar(producto, invalidos)
+    return producto
+
+
+def normalizar_ingrediente(ingrediente, ids=None):
+    """
+    Normaliza un ingrediente del catálogo en su lugar
+
+    Args:
+        ingrediente: Ingrediente del catálogo
+        ids: Conjunto opcional con los IDs ya usados (un ID repetido es inválido)
+
+    Returns:
+        dict: El mismo ingrediente, con id, nombre, categorias, precio_extra y precio_resta
+
+    Raises:
+        FilaInvalida: Si el ingrediente no se puede usar (queda sin modificar)
+    """
+    if not isinstance(ingrediente, dict):
+        raise FilaInvalida("ingrediente que no es un objeto")
+    ingrediente_id = _entero(ingrediente.get("id"), "id")
+    if ids is not None and ingrediente_id in ids:
+        raise FilaInvalida(f"ID {ingrediente_id} repetido")
+    nombre = _nombre(ingrediente)
+    precio_extra = _precio(ingrediente.get("precio_extra", 0.0), "precio_extra")
+    precio_resta = _precio(ingrediente.get("precio_resta", 0.0), "precio_resta")
+
+    categorias = ingrediente.get("categorias")
+    if isinstance(categorias, str):
+        categorias = [categorias]
+    elif not isinstance(categorias, list):
+        categorias = []
+
+    ingrediente["id"] = ingrediente_id
+    ingrediente["nombre"] = nombre
+    ingrediente["precio_extra"] = precio_extra
+    ingrediente["precio_resta"] = precio_resta
+    ingrediente["categorias"] = [categoria for categoria in categorias if isinstance(categoria, str)]
+    return ingrediente
+
+
+def normalizar_categoria(categoria, ids=None, problemas=None):
+    """
+    Normaliza una categoría y sus productos en su lugar (aparta los productos inválidos)
+
+    Args:
+        categoria: Categoría ({"nombre", "productos"})
+        ids: Conjunto opcional con los IDs ya vistos en otras categorías (se actualiza)
+        problemas: Lista opcional donde se informan los productos apartados
+
+    Returns:
+        dict: La misma categoría
+
+    Raises:
+        FilaInvalida: Si la categoría no tiene nombre (queda sin modificar)
+    """
+    if not isinstance(categoria, dict):
+        raise FilaInvalida("categoría que no es un objeto")
+    nombre = _nombre(categoria)
+    categoria["nombre"] = nombre
+    if ids is None:
+        ids = set()
+    if problemas is None:
+        problemas = []
+
+    validos = []
+    invalidos = []
+    for producto in _filas(categoria, "productos"):
+        try:
+            normalizar_producto(producto, problemas, ids)
+        except FilaInvalida as e:
+            invalidos.append(producto)
+            problemas.append(f"Categoría {nombre}: producto inválido ({e}): {producto!r}")
+            continue
+        ids.add(producto["id"])
+        validos.append(producto)
+    categoria["productos"] = validos
+    _apartar(categoria, invalidos)
+    return categoria
+
+
+def normalizar_productos(datos):
+    """
+    Valida y normaliza todos los productos en una pasada (aparta las filas inválidas)
+
+    Returns:
+        list: Descripción de cada problema encontrado (vacía si todo estaba bien)
+    """
+    problemas = []
+    categorias = datos.get("categorias")
+    invalidas = []
+    if categorias is not None and not isinstance(categorias, list):
+        problemas.append(f"'categorias' no es una lista: {categorias!r}")
+        invalidas.append(categorias)
+
+    ids = set()
+    validas = []
+    for categoria in _filas(datos, "categorias"):
+        try:
+            normalizar_categoria(categoria, ids, problemas)
+        except FilaInvalida as e:
+            invalidas.append(categoria)
+            problemas.append(f"Categoría inválida ({e}): {categoria!r}")
+            continue
+        validas.append(categoria)
+    if isinstance(categorias, list):
+        categorias[:] = validas
+    else:
+        datos["categorias"] = validas
+    _apartar(datos, invalidas)
+
+    _problemas["productos"] = problemas
+    return problemas
+
+
+def normalizar_ingredientes(datos):
+    """
+    Valida y normaliza todos los ingredientes en una pasada (aparta las filas inválidas)
+
+    Returns:
+        list: Descripción de cada problema encontrado (vacía si todo estaba bien)
+    """
+    problemas = []
+    ingredientes = datos.get("ingredientes")
+    invalidos = []
+    if ingredientes is not None and not isinstance(ingredientes, list):
+        problemas.append(f"'ingredientes' no es una lista: {ingredientes!r}")
+        invalidos.append(ingredientes)
+
+    ids = set()
+    validos = []
+    for ingrediente in _filas(datos, "ingredientes"):
+        try:
+            normalizar_ingrediente(ingrediente, ids)
+        except FilaInvalida as e:
+            invalidos.append(ingrediente)
+            problemas.append(f"Ingrediente inválido ({e}): {ingrediente!r}")
+            continue
+        ids.add(ingrediente["id"])
+        validos.append(ingrediente)
+    if isinstance(ingredientes, list):
+        ingredientes[:] = validos
+    else:
+        datos["ingredientes"] = validos
+    _apartar(datos, invalidos)
+
+    _problemas["ingredientes"] = problemas
+    return problemas
+
+
+def ids_apartados(datos):
+    """
+    IDs de las filas apartadas de un catálogo (para no reasignarlos ni borrarlos al reescribir)
+
+    Returns:
+        set: IDs enteros de los productos o ingredientes apartados en cualquier nivel
+    """
+    pendientes = []
+    for contenedor in [datos] + [c for c in datos.get("categorias", []) if isinstance(c, dict)]:
+        apartadas = contenedor.get(CLAVE_FILAS_INVALIDAS)
+        if isinstance(apartadas, list):
+            pendientes.extend(apartadas)
+
+    ids = set()
+    for fila in pendientes:
+        if not isinstance(fila, dict):
+            continue
+        try:
+            ids.add(_entero(fila.get("id"), "id"))
+        except FilaInvalida:
+            pass
+        productos = fila.get("productos")  # Categoría apartada entera
+        if isinstance(productos, list):
+            pendientes.extend(productos)
+    return ids
+
+
+def obtener_ruta_registro_problemas():
+    """Obtiene la ruta del archivo donde se anotan los problemas de los catálogos"""
+    from utils.rutas import obtener_ruta_data
+    return os.path.join(obtener_ruta_data(), NOMBRE_REGISTRO_PROBLEMAS)
+
+
+def informar_problemas(catalogo, problemas):
+    """
+    Anota en data/problemas_catalogo.log los problemas encontrados al cargar un catálogo
+    (cada problema una sola vez por sesión) y los suma a los de obtener_problemas()
+    """
+    nuevos = [problema for problema in problemas if (catalogo, problema) not in _informados]
+    if not nuevos:
+        return
+
+    registrados = _problemas.setdefault(catalogo, [])
+    registrados.extend(problema for problema in nuevos if problema not in registrados)
+
+    ruta = obtener_ruta_registro_problemas()
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            for problema in nuevos:
+                archivo.write(f"{fecha} ({catalogo}) {problema}\n")
+    except OSError as e:
+        print(f"Advertencia: No se pudo escribir {ruta}: {e}")
+        for problema in nuevos:
+            print(f"Advertencia ({catalogo}): {problema}")
+    _informados.update((catalogo, problema) for problema in nuevos)
+
+
+def obtener_problemas(catalogo):
+    """Retorna los problemas encontrados en la última carga de un catálogo ("productos" o "ingredientes")"""
+    return list(_problemas.get(catalogo, []))
@@ -2,8 +2,11 @@
 Módulo para gestión de ingredientes en el archivo JSON
 Maneja operaciones CRUD de ingredientes y su asignación a categorías
 """
-import json
-import os
+from utils.catalogo import (
+    crear_repositorio, ajustar_ultimo_id, asignar_id, CLAVE_ULTIMO_ID,
+    INGREDIENTE_AGREGADO, INGREDIENTE_MODIFICADO, INGREDIENTE_ELIMINADO
+)
+from utils.esquema_catalogo import normalizar_ingredientes, informar_problemas, ids_apartados
 
 
 def obtener_ruta_json():
@@ -12,61 +15,126 @@ def obtener_ruta_json():
     return obtener_ruta_json_helper('ingredientes.json')
 
 
+# Índices sobre los datos en memoria: id -> ingrediente, nombre -> ingrediente y
+# categoría -> lista de ingredientes (en el orden del archivo).
+# Se reconstruyen en cada parseo del archivo; agregar/modificar/eliminar los actualizan
+# en forma incremental
+_indice_por_id = {}
+_indice_por_nombre = {}
+_ingredientes_por_categoria = {}
+
+
+def _reconstruir_indices(data):
+    """
+    Reconstruye los índices de ingredientes (ante nombres repetidos gana el primero)
+    y ajusta la marca de agua de IDs
+    """
+    _indice_por_id.clear()
+    _indice_por_nombre.clear()
+    _ingredientes_por_categoria.clear()
+    max_id = 0
+    for ingrediente in data.get("ingredientes", []):
+        _indexar_ingrediente(ingrediente)
+        max_id = max(max_id, ingrediente.get("id") or 0)
+    # Las filas inválidas apartadas conservan su ID: no reasignarlo
+    ajustar_ultimo_id(data, max(max_id, max(ids_apartados(data), default=0)))
+
+
+def _indexar_ingrediente(ingrediente):
+    """Agrega un ingrediente a los índices (al final de la lista de cada categoría)"""
+    _indice_por_id.setdefault(ingrediente.get("id"), ingrediente)
+    _indice_por_nombre.setdefault(ingrediente.get("nombre"), ingrediente)
+    for categoria in ingrediente.get("categorias", []):
+        _ingredientes_por_categoria.setdefault(categoria, []).append(ingrediente)
+
+
+def _desindexar_ingrediente(data, ingrediente, nombre, categorias):
+    """
+    Quita un ingrediente de los índices usando el nombre y las categorías con que fue indexado
+    Si otro ingrediente comparte el nombre o el ID, pasa a ocupar su lugar
+    """
+    ingrediente_id = ingrediente.get("id")
+    if _indice_por_id.get(ingrediente_id) is ingrediente:
+        del _indice_por_id[ingrediente_id]
+        for otro in data.get("ingredientes", []):
+            if otro is not ingrediente and otro.get("id") == ingrediente_id:
+                _indice_por_id[ingrediente_id] = otro
+                break
+    _quitar_del_indice_por_nombre(data, ingrediente, nombre)
+    for categoria in categorias:
+        lista = _ingredientes_por_categoria.get(categoria)
+        if lista is None:
+            continue
+        lista[:] = [otro for otro in lista if otro is not ingrediente]
+        if not lista:
+            del _ingredientes_por_categoria[categoria]
+
+
+def _quitar_del_indice_por_nombre(data, ingrediente, nombre):
+    """Quita un nombre del índice si apunta al ingrediente; otro con el mismo nombre toma su lugar"""
+    if _indice_por_nombre.get(nombre) is not ingrediente:
+        return
+    del _indice_por_nombre[nombre]
+    for otro in data.get("ingredientes", []):
+        if otro is not ingrediente and otro.get("nombre") == nombre:
+            _indice_por_nombre[nombre] = otro
+            break
+
+
+def _reindexar_categorias(data, categorias):
+    """Recalcula la lista de ingredientes de las categorías indicadas respetando el orden del archivo"""
+    for categoria in categorias:
+        lista = [ing for ing in data.get("ingredientes", []) if categoria in ing.get("categorias", [])]
+        if lista:
+            _ingredientes_por_categoria[categoria] = lista
+        else:
+            _ingredientes_por_categoria.pop(categoria, None)
+
+
+def _migrar(data):
+    """Valida y normaliza los ingredientes (ver utils.esquema_catalogo) sin marcar el archivo como modificado"""
+    informar_problemas("ingredientes", normalizar_ingredientes(data))
+    return False
+
+
+# Repositorio en memoria compartido por todo el proceso (JSON o SQLite)
+_repositorio = crear_repositorio(
+    "ingredientes",
+    obtener_ruta_json,
+    lambda: {"ingredientes": []},
+    migrar=_migrar,
+    al_cargar=_reconstruir_indices
+)
+
+
 def cargar_ingredientes():
-    """Carga los ingredientes desde el archivo JSON"""
-    ruta = obtener_ruta_json()
-    
-    # Si está instalado y el archivo no existe, intentar copiarlo desde la instalación
-    import sys
-    if getattr(sys, 'frozen', False):
-        from utils.rutas import obtener_ruta_data_instalacion
-        ruta_instalacion = os.path.join(obtener_ruta_data_instalacion(), 'ingredientes.json')
-        if not os.path.exists(ruta) and os.path.exists(ruta_instalacion):
-            import shutil
-            try:
-                os.makedirs(os.path.dirname(ruta), exist_ok=True)
-                shutil.copy2(ruta_instalacion, ruta)
-            except Exception:
-                pass  # Si falla, continuar y crear uno nuevo
-    
-    try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data
-    except FileNotFoundError:
-        # Crear estructura inicial
-        data = {"ingredientes": []}
-        guardar_ingredientes(data)
-        return data
-    except json.JSONDecodeError:
-        print("Error: El archivo ingredientes.json no es válido. Se creará uno nuevo.")
-        data = {"ingredientes": []}
-        guardar_ingredientes(data)
-        return data
+    """
+    Carga los ingredientes desde el repositorio en memoria (sin escribir en disco)
+    El archivo JSON solo se vuelve a parsear si cambió en disco.
+    Los datos retornados son compartidos: si se modifican, deben guardarse con guardar_ingredientes
+    """
+    return _repositorio.cargar()
 
 
 def guardar_ingredientes(data):
-    """Guarda los ingredientes en el archivo JSON"""
-    ruta = obtener_ruta_json()
-    # Asegurar que el directorio existe
-    os.makedirs(os.path.dirname(ruta), exist_ok=True)
-    # Escribir con flush explícito para asegurar que se guarde
-    with open(ruta, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-        f.flush()
-        os.fsync(f.fileno())  # Forzar escritura al disco
+    """
+    Guarda los ingredientes en el archivo JSON
+    La escritura es diferida: se agrupa con otras modificaciones cercanas y se hace
+    en segundo plano (usar utils.persistencia.flush() para forzarla)
+    """
+    with _repositorio.bloqueo:
+        _repositorio.guardar(data)
+        # Invalidar los índices: una modificación puede cambiar nombres o quitar ingredientes
+        _reconstruir_indices(data)
 
 
 def obtener_siguiente_id():
-    """Obtiene el siguiente ID disponible para un nuevo ingrediente"""
+    """
+    Obtiene el siguiente ID disponible para un nuevo ingrediente (sin reservarlo)
+    Sale de la marca de agua del catálogo, por lo que nunca repite IDs de ingredientes eliminados
+    """
     data = cargar_ingredientes()
-    max_id = 0
-    
-    for ingrediente in data.get("ingredientes", []):
-        if ingrediente.get("id", 0) > max_id:
-            max_id = ingrediente.get("id", 0)
-    
-    return max_id + 1
+    return data.get(CLAVE_ULTIMO_ID, 0) + 1
 
 
 def obtener_todos_los_ingredientes():
@@ -77,147 +145,127 @@ def obtener_todos_los_ingredientes():
 
 def buscar_ingrediente_por_id(ingrediente_id):
     """Busca un ingrediente por su ID"""
-    data = cargar_ingredientes()
-    
-    for ingrediente in data.get("ingredientes", []):
-        if ingrediente.get("id") == ingrediente_id:
-            return ingrediente
-    
-    return None
+    cargar_ingredientes()  # Asegura que el índice esté al día con el archivo
+    return _indice_por_id.get(ingrediente_id)
 
 
 def buscar_ingrediente_por_nombre(nombre):
     """Busca un ingrediente por su nombre"""
-    data = cargar_ingredientes()
-    
-    for ingrediente in data.get("ingredientes", []):
-        if ingrediente.get("nombre") == nombre:
-            return ingrediente
-    
-    return None
+    cargar_ingredientes()  # Asegura que el índice esté al día con el archivo
+    return _indice_por_nombre.get(nombre)
+
+
+def obtener_ingredientes_por_nombre():
+    """
+    Retorna el índice nombre -> ingrediente para resolver muchos nombres seguidos
+    (precios, carrito, tickets) verificando el archivo una sola vez.
+    El diccionario es de solo lectura y se invalida con la próxima modificación de ingredientes.
+    """
+    cargar_ingredientes()
+    return _indice_por_nombre
 
 
 def agregar_ingrediente(nombre, categorias, precio_extra, precio_resta, imagen=None):
     """Agrega un nuevo ingrediente"""
-    data = cargar_ingredientes()
-    
-    nuevo_ingrediente = {
-        "id": obtener_siguiente_id(),
-        "nombre": nombre,
-        "categorias": categorias if isinstance(categorias, list) else [categorias],
-        "precio_extra": float(precio_extra),
-        "precio_resta": float(precio_resta)
-    }
-    
-    # Agregar imagen si se proporciona
-    if imagen:
-        nuevo_ingrediente["imagen"] = imagen
-    
-    data.setdefault("ingredientes", []).append(nuevo_ingrediente)
-    guardar_ingredientes(data)
-    return nuevo_ingrediente
+    with _repositorio.bloqueo:
+        data = cargar_ingredientes()
+        
+        nuevo_ingrediente = {
+            "id": asignar_id(data),
+            "nombre": nombre,
+            "categorias": categorias if isinstance(categorias, list) else [categorias],
+            "precio_extra": float(precio_extra),
+            "precio_resta": float(precio_resta)
+        }
+        
+        # Agregar imagen si se proporciona
+        if imagen:
+            nuevo_ingrediente["imagen"] = imagen
+        
+        data.setdefault("ingredientes", []).append(nuevo_ingrediente)
+        _repositorio.guardar(data, {nuevo_ingrediente["id"]}, INGREDIENTE_AGREGADO)
+        _indexar_ingrediente(nuevo_ingrediente)
+        return nuevo_ingrediente
 
 
 def modificar_ingrediente(ingrediente_id, nombre, categorias, precio_extra, precio_resta, imagen=None):
     """Modifica un ingrediente existente y actualiza el nombre en todos los productos que lo usan"""
-    data = cargar_ingredientes()
-    
-    # Buscar el ingrediente para obtener el nombre anterior
-    ingrediente_anterior = None
-    nombre_anterior = None
-    for ingrediente in data.get("ingredientes", []):
-        if ingrediente.get("id") == ingrediente_id:
-            ingrediente_anterior = ingrediente
-            nombre_anterior = ingrediente.get("nombre", "")
-            ingrediente["nombre"] = nombre
-            ingrediente["categorias"] = categorias if isinstance(categorias, list) else [categorias]
-            ingrediente["precio_extra"] = float(precio_extra)
-            ingrediente["precio_resta"] = float(precio_resta)
-            
-            # Actualizar imagen si se proporciona (None significa no cambiar, "" significa eliminar)
-            if imagen is not None:
-                if imagen:
-                    ingrediente["imagen"] = imagen
-                else:
-                    ingrediente.pop("imagen", None)
-            
-            guardar_ingredientes(data)
-            break
-    
-    if not ingrediente_anterior:
-        return False
-    
-    # Si el nombre cambió, actualizar el nombre en todos los productos que lo usan
-    if nombre_anterior and nombre_anterior != nombre:
-        from utils.productos import cargar_productos, guardar_productos
-        productos_data = cargar_productos()
-        productos_modificados = False
+    with _repositorio.bloqueo:
+        data = cargar_ingredientes()
+        
+        # Buscar el ingrediente para obtener el nombre anterior
+        ingrediente_anterior = None
+        nombre_anterior = None
+        for ingrediente in data.get("ingredientes", []):
+            if ingrediente.get("id") == ingrediente_id:
+                ingrediente_anterior = ingrediente
+                nombre_anterior = ingrediente.get("nombre", "")
+                categorias_anteriores = list(ingrediente.get("categorias", []))
+                ingrediente["nombre"] = nombre
+                ingrediente["categorias"] = categorias if isinstance(categorias, list) else [categorias]
+                ingrediente["precio_extra"] = float(precio_extra)
+                ingrediente["precio_resta"] = float(precio_resta)
+                
+                # Actualizar imagen si se proporciona (None significa no cambiar, "" significa eliminar)
+                if imagen is not None:
+                    if imagen:
+                        ingrediente["imagen"] = imagen
+                    else:
+                        ingrediente.pop("imagen", None)
+                
+                _repositorio.guardar(data, {ingrediente_id}, INGREDIENTE_MODIFICADO)
+                # Actualizar los índices solo en lo que cambió
+                if nombre_anterior != nombre:
+                    _quitar_del_indice_por_nombre(data, ingrediente, nombre_anterior)
+                    _indice_por_nombre.setdefault(nombre, ingrediente)
+                if categorias_anteriores != ingrediente["categorias"]:
+                    _reindexar_categorias(data, set(categorias_anteriores) | set(ingrediente["categorias"]))
+                break
         
-        for categoria in productos_data.get("categorias", []):
-            for producto in categoria.get("productos", []):
-                ingredientes = producto.get("ingredientes", [])
-                if ingredientes:
-                    for ing in ingredientes:
-                        if ing.get("nombre") == nombre_anterior:
-                            ing["nombre"] = nombre
-                            productos_modificados = True
+        if not ingrediente_anterior:
+            return False
         
-        if productos_modificados:
-            guardar_productos(productos_data)
-    
-    return True
+        # Si el nombre cambió, actualizar el nombre en todos los productos que lo usan
+        if nombre_anterior and nombre_anterior != nombre:
+            from utils.productos import renombrar_ingrediente_en_productos
+            renombrar_ingrediente_en_productos(nombre_anterior, nombre)
+        
+        return True
 
 
 def eliminar_ingrediente(ingrediente_id):
     """Elimina un ingrediente por su ID y también lo elimina de todos los productos que lo usan"""
-    data = cargar_ingredientes()
-    
-    # Buscar el ingrediente para obtener su nombre
-    ingrediente_a_eliminar = None
-    for idx, ingrediente in enumerate(data.get("ingredientes", [])):
-        if ingrediente.get("id") == ingrediente_id:
-            ingrediente_a_eliminar = ingrediente
-            data["ingredientes"].pop(idx)
-            guardar_ingredientes(data)
-            break
-    
-    if not ingrediente_a_eliminar:
-        return False
-    
-    # Eliminar el ingrediente de todos los productos que lo usan
-    nombre_ingrediente = ingrediente_a_eliminar.get("nombre")
-    if nombre_ingrediente:
-        from utils.productos import cargar_productos, guardar_productos
-        productos_data = cargar_productos()
-        productos_modificados = False
+    with _repositorio.bloqueo:
+        data = cargar_ingredientes()
+        
+        # Buscar el ingrediente para obtener su nombre
+        ingrediente_a_eliminar = None
+        for idx, ingrediente in enumerate(data.get("ingredientes", [])):
+            if ingrediente.get("id") == ingrediente_id:
+                ingrediente_a_eliminar = ingrediente
+                data["ingredientes"].pop(idx)
+                _repositorio.guardar(data, {ingrediente_id}, INGREDIENTE_ELIMINADO)
+                _desindexar_ingrediente(
+                    data, ingrediente, ingrediente.get("nombre"), ingrediente.get("categorias", [])
+                )
+                break
+        
+        if not ingrediente_a_eliminar:
+            return False
         
-        for categoria in productos_data.get("categorias", []):
-            for producto in categoria.get("productos", []):
-                ingredientes = producto.get("ingredientes", [])
-                if ingredientes:
-                    # Filtrar ingredientes que coincidan con el nombre
-                    ingredientes_originales = len(ingredientes)
-                    producto["ingredientes"] = [
-                        ing for ing in ingredientes 
-                        if ing.get("nombre") != nombre_ingrediente
-                    ]
-                    if len(producto["ingredientes"]) < ingredientes_originales:
-                        productos_modificados = True
+        # Eliminar el ingrediente de todos los productos que lo usan
+        nombre_ingrediente = ingrediente_a_eliminar.get("nombre")
+        if nombre_ingrediente:
+            from utils.productos import quitar_ingrediente_de_productos
+            quitar_ingrediente_de_productos(nombre_ingrediente)
         
-        if productos_modificados:
-            guardar_productos(productos_data)
-    
-    return True
+        return True
 
 
 def obtener_ingredientes_por_categoria(categoria_nombre):
-    """Obtiene todos los ingredientes disponibles para una categoría"""
-    data = cargar_ingredientes()
-    ingredientes = []
-    
-    for ingrediente in data.get("ingredientes", []):
-        categorias = ingrediente.get("categorias", [])
-        if categoria_nombre in categorias:
-            ingredientes.append(ingrediente)
-    
-    return ingredientes
+    """
+    Obtiene todos los ingredientes disponibles para una categoría
+    La lista sale del índice precalculado (sin recorrer el catálogo); es de solo lectura
+    """
+    cargar_ingredientes()  # Asegura que el índice esté al día con el archivo
+    return _ingredientes_por_categoria.get(categoria_nombre, [])
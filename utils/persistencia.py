@@ -0,0 +1,195 @@
+"""
+Módulo de persistencia diferida (write-behind) de los catálogos
+Agrupa las modificaciones que ocurren dentro de una ventana corta en una sola escritura,
+hecha en un thread separado para no bloquear la interfaz.
+Las escrituras son atómicas (archivo temporal + renombrado): un corte de luz o un cierre
+inesperado nunca deja un JSON escrito a medias.
+"""
+import atexit
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Tiempo (en segundos) durante el cual se agrupan las modificaciones antes de escribir
+VENTANA_AGRUPAMIENTO = 0.5
+
+# Extensión del archivo de bloqueo entre procesos (productos.json -> productos.json.lock)
+EXTENSION_BLOQUEO = ".lock"
+
+# Tiempo máximo (en segundos) de espera del bloqueo de otra caja antes de desistir
+ESPERA_MAXIMA_BLOQUEO = 10.0
+
+
+def escribir_archivo_atomico(ruta, contenido):
+    """
+    Escribe un archivo de forma atómica
+    Primero escribe un archivo temporal en el mismo directorio y luego lo renombra
+    sobre el destino, de modo que el archivo siempre contiene la versión anterior
+    completa o la nueva completa.
+
+    Args:
+        ruta: Ruta completa del archivo destino
+        contenido: Texto a escribir (se guarda en UTF-8) o bytes ya codificados
+    """
+    directorio = os.path.dirname(ruta)
+    # Asegurar que el directorio existe
+    os.makedirs(directorio, exist_ok=True)
+
+    fd, ruta_temporal = tempfile.mkstemp(
+        prefix=os.path.basename(ruta) + '.',
+        suffix='.tmp',
+        dir=directorio
+    )
+    try:
+        if isinstance(contenido, bytes):
+            archivo = os.fdopen(fd, 'wb')
+        else:
+            archivo = os.fdopen(fd, 'w', encoding='utf-8')
+        with archivo as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())  # Forzar escritura al disco antes de renombrar
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(ruta_temporal)
+        except OSError:
+            pass
+        raise
+
+
+def _intentar_bloquear(archivo):
+    """Intenta tomar el bloqueo exclusivo de un archivo abierto sin esperar"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _desbloquear(archivo):
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def bloqueo_archivo(ruta, espera=ESPERA_MAXIMA_BLOQUEO):
+    """
+    Bloqueo exclusivo entre procesos sobre un archivo (otras cajas que comparten la
+    carpeta de datos). Se toma con un archivo auxiliar junto al archivo protegido.
+
+    Args:
+        ruta: Ruta completa del archivo a proteger
+        espera: Segundos que se espera a que otro proceso lo libere
+
+    Raises:
+        TimeoutError: Si otro proceso lo tiene tomado más de `espera` segundos
+    """
+    ruta_bloqueo = ruta + EXTENSION_BLOQUEO
+    os.makedirs(os.path.dirname(ruta_bloqueo), exist_ok=True)
+    with open(ruta_bloqueo, 'a+b') as archivo:
+        limite = time.monotonic() + espera
+        while not _intentar_bloquear(archivo):
+            if time.monotonic() >= limite:
+                raise TimeoutError(f"{os.path.basename(ruta)} está bloqueado por otro proceso")
+            time.sleep(0.02)
+        try:
+            yield
+        finally:
+            _desbloquear(archivo)
+
+
+class PersistidorDiferido:
+    """
+    Thread de escritura diferida compartido por los repositorios del catálogo
+
+    Cada repositorio con cambios se programa para escribirse VENTANA_AGRUPAMIENTO
+    segundos después de su primera modificación; las modificaciones siguientes dentro
+    de esa ventana se agrupan en la misma escritura.
+    """
+
+    def __init__(self, ventana=VENTANA_AGRUPAMIENTO):
+        self.ventana = ventana
+        self._condicion = threading.Condition()
+        self._pendientes = {}  # repositorio -> instante límite para escribirlo
+        self._repositorios = []  # Todos los repositorios que alguna vez se programaron
+        self._hilo = None
+
+    def programar(self, repositorio):
+        """Programa la escritura diferida de un repositorio con cambios pendientes"""
+        with self._condicion:
+            if repositorio not in self._repositorios:
+                self._repositorios.append(repositorio)
+            if repositorio not in self._pendientes:
+                self._pendientes[repositorio] = time.monotonic() + self.ventana
+
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+
+    def _ejecutar(self):
+        """Loop del thread de escritura"""
+        while True:
+            with self._condicion:
+                while not self._pendientes:
+                    self._condicion.wait()
+
+                ahora = time.monotonic()
+                listos = [repo for repo, limite in self._pendientes.items() if limite <= ahora]
+                if not listos:
+                    # Esperar hasta que venza la ventana más próxima
+                    self._condicion.wait(min(self._pendientes.values()) - ahora)
+                    continue
+
+                for repositorio in listos:
+                    del self._pendientes[repositorio]
+
+            for repositorio in listos:
+                try:
+                    repositorio.escribir_pendiente()
+                except Exception as e:
+                    # Los datos quedan marcados como modificados: se reintentará
+                    # con la próxima modificación o con flush()
+                    print(f"Error al guardar {repositorio.obtener_ruta()}: {e}")
+
+    def flush(self):
+        """
+        Escribe inmediatamente todos los cambios pendientes (bloqueante)
+        Si el thread está escribiendo un repositorio, espera a que termine.
+        """
+        with self._condicion:
+            self._pendientes.clear()
+            repositorios = list(self._repositorios)
+
+        for repositorio in repositorios:
+            repositorio.escribir_pendiente()
+
+
+# Persistidor compartido por todo el proceso
+persistidor = PersistidorDiferido()
+
+
+def flush():
+    """Escribe inmediatamente todos los cambios pendientes del catálogo"""
+    persistidor.flush()
+
+
+# Última red de seguridad si la aplicación termina sin llamar a flush()
+atexit.register(flush)
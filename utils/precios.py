@@ -0,0 +1,455 @@
+"""
+Módulo de cálculo de precios con planes compilados
+Para cada producto se arma una sola vez por generación del catálogo un plan de precio:
+precio base más arreglos paralelos (una posición por ingrediente del producto) con la
+cantidad base y los precios de extra y de resta ya resueltos desde ingredientes.json.
+Calcular el precio de un item modificado recorre esos arreglos sin volver a buscar
+ingredientes ni armar diccionarios.
+
+También calcula precios en lote (carrito completo, tickets, pedidos históricos):
+una sola verificación del catálogo para todas las líneas y, si NumPy está instalado
+y hay muchas líneas, una sola pasada vectorizada.
+
+Los precios de items ya calculados se memorizan en un caché LRU con clave
+(id del producto, generación del catálogo, modificaciones congeladas en un frozenset): la misma
+configuración se repite entre redibujados del carrito, el total y los dos tickets.
+"""
+import threading
+from collections import OrderedDict
+
+from utils import catalogo
+from utils.ingredientes import cargar_ingredientes, obtener_ingredientes_por_nombre
+from utils.registros import Producto, LineaCarrito, producto_de_catalogo
+
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Desde cuántas líneas conviene el cálculo vectorizado con NumPy (por debajo, el costo
+# de armar los arreglos supera lo que se ahorra)
+UMBRAL_NUMPY = 200
+
+# Cantidad máxima de precios de items memorizados
+TAMANIO_MEMO = 1024
+
+
+class PlanPrecio:
+    """
+    Plan de precio compilado de un producto
+
+    Atributos:
+        precio_base: Precio del producto sin modificaciones
+        nombres: Nombre del ingrediente de cada posición
+        cantidades_base: Cantidad base de cada posición
+        precios_extra: Precio de cada unidad extra de cada posición
+        precios_resta: Descuento por cada unidad quitada de cada posición
+        posiciones: Dict nombre -> posición (primera aparición) para ubicar modificaciones
+    """
+
+    __slots__ = (
+        "producto_id", "precio_base", "nombres", "cantidades_base",
+        "precios_extra", "precios_resta", "posiciones", "_ingredientes"
+    )
+
+    def __init__(self, producto, ingredientes_por_nombre):
+        # producto es un Producto (utils.registros); los ingredientes del catálogo ya
+        # están normalizados (ver utils.esquema_catalogo)
+        ingredientes = producto.ingredientes
+        self.producto_id = producto.id
+        self.precio_base = producto.precio
+        self.nombres = tuple(ing.nombre for ing in ingredientes)
+        self.cantidades_base = tuple(ing.cantidad_base for ing in ingredientes)
+
+        precios_extra = []
+        precios_resta = []
+        for nombre in self.nombres:
+            ingrediente = ingredientes_por_nombre.get(nombre)
+            if ingrediente is None:
+                # Si el ingrediente no existe en el catálogo, sus precios son 0.0
+                precios_extra.append(0.0)
+                precios_resta.append(0.0)
+            else:
+                precios_extra.append(ingrediente["precio_extra"])
+                precios_resta.append(ingrediente["precio_resta"])
+        self.precios_extra = tuple(precios_extra)
+        self.precios_resta = tuple(precios_resta)
+
+        self.posiciones = {}
+        for posicion, nombre in enumerate(self.nombres):
+            self.posiciones.setdefault(nombre, posicion)
+
+        # Mantener viva la tupla de la que se compiló (su id() es parte de la clave del caché;
+        # para los productos en dict, _plan_compilado guarda acá la lista del dict)
+        self._ingredientes = ingredientes
+
+    def calcular(self, modificaciones_ingredientes, precios_extra_adicionales):
+        """
+        Calcula el precio unitario aplicando las modificaciones
+
+        Args:
+            modificaciones_ingredientes: Dict {nombre_ingrediente: cantidad_modificada}
+            precios_extra_adicionales: Dict nombre -> precio_extra de todo el catálogo
+                                       (para ingredientes que no son del producto)
+        """
+        if not modificaciones_ingredientes:
+            return self.precio_base
+
+        ajuste_total = 0.0
+        obtener = modificaciones_ingredientes.get
+
+        # Ingredientes del producto: solo enteros y precios ya resueltos
+        for nombre, cantidad_base, precio_extra, precio_resta in zip(
+            self.nombres, self.cantidades_base, self.precios_extra, self.precios_resta
+        ):
+            diferencia = obtener(nombre, cantidad_base) - cantidad_base
+            if diferencia > 0:
+                ajuste_total += diferencia * precio_extra
+            elif diferencia < 0:
+                ajuste_total += diferencia * precio_resta
+
+        # Ingredientes adicionales que no están en el producto (se cobran como extras)
+        posiciones = self.posiciones
+        if not modificaciones_ingredientes.keys() <= posiciones.keys():
+            for nombre, cantidad_adicional in modificaciones_ingredientes.items():
+                if nombre not in posiciones and cantidad_adicional > 0:
+                    ajuste_total += cantidad_adicional * precios_extra_adicionales.get(nombre, 0.0)
+
+        return self.precio_base + ajuste_total
+
+
+# Planes compilados de la generación actual del catálogo
+_generacion_planes = None
+_planes = {}  # (producto_id, id de su tupla de ingredientes) -> PlanPrecio
+_precios_extra_adicionales = {}
+
+# Precios de items ya calculados (LRU):
+# (producto_id, generación, modificaciones congeladas) -> (plan, precio)
+_memo = OrderedDict()
+_bloqueo_memo = threading.Lock()
+_aciertos_memo = 0
+_fallos_memo = 0
+
+
+def _asegurar_generacion():
+    """Descarta los planes si el catálogo cambió desde que se compilaron"""
+    global _generacion_planes, _precios_extra_adicionales
+
+    cargar_ingredientes()  # Verifica si el archivo cambió en disco
+    generacion = catalogo.obtener_generacion()
+    if generacion != _generacion_planes:
+        _planes.clear()
+        # Los precios memorizados de la generación anterior ya no pueden acertar
+        with _bloqueo_memo:
+            _memo.clear()
+        _precios_extra_adicionales = {
+            nombre: ingrediente["precio_extra"]
+            for nombre, ingrediente in obtener_ingredientes_por_nombre().items()
+        }
+        _generacion_planes = generacion
+
+
+def obtener_plan_precio(producto):
+    """
+    Retorna el plan de precio compilado de un producto (lo compila si hace falta)
+    Los items del carrito guardan el Producto de cuando se agregaron: si quedó con otro
+    precio u otros ingredientes que el catálogo actual, tiene su propio plan.
+
+    Args:
+        producto: Producto (utils.registros) o dict de un producto del catálogo
+    """
+    _asegurar_generacion()
+    return _plan_compilado(producto)
+
+
+def _cacheable(producto_id):
+    """
+    Indica si los planes y precios de un producto se pueden guardar en los cachés
+    (no si no tiene ID o es un producto personalizado: todos comparten el ID -1)
+    """
+    return isinstance(producto_id, int) and producto_id >= 0
+
+
+def _plan_compilado(producto):
+    """Busca o compila el plan de un producto (la generación ya debe estar verificada)"""
+    if isinstance(producto, Producto):
+        ingredientes = producto.ingredientes
+        clave = (producto.id, id(ingredientes))
+        precio = producto.precio
+    else:
+        # Los dicts que no salen del catálogo pueden no traer id ni ingredientes
+        ingredientes = producto.get("ingredientes", ())
+        clave = (producto.get("id"), id(ingredientes))
+        precio = producto.get("precio", 0.0)
+    if not _cacheable(clave[0]):
+        if not isinstance(producto, Producto):
+            producto = producto_de_catalogo(producto)
+        return PlanPrecio(producto, obtener_ingredientes_por_nombre())
+    # La tupla (o lista del dict) de ingredientes se identifica por identidad: el plan
+    # la mantiene viva, así que su id() no se reutiliza mientras el plan esté en el caché
+    plan = _planes.get(clave)
+    if plan is None or plan.precio_base != precio:
+        if not isinstance(producto, Producto):
+            producto = producto_de_catalogo(producto)
+        plan = PlanPrecio(producto, obtener_ingredientes_por_nombre())
+        plan._ingredientes = ingredientes
+        _planes[clave] = plan
+    return plan
+
+
+def calcular_precio(producto, modificaciones_ingredientes=None):
+    """
+    Calcula el precio final de un producto con modificaciones de ingredientes
+    (mismo resultado que utils.productos.calcular_precio_con_ingredientes)
+    """
+    if not modificaciones_ingredientes:
+        return producto.precio if isinstance(producto, Producto) else producto.get("precio", 0.0)
+    return _precio_memorizado(obtener_plan_precio(producto), modificaciones_ingredientes)
+
+
+def _precio_memorizado(plan, modificaciones_ingredientes):
+    """
+    Retorna el precio de un item desde el caché LRU o lo calcula con el plan
+    (la generación ya debe estar verificada)
+    """
+    global _aciertos_memo, _fallos_memo
+
+    if not _cacheable(plan.producto_id):
+        # Sin ID o personalizado: el ID no distingue al producto, no se memoriza
+        return plan.calcular(modificaciones_ingredientes, _precios_extra_adicionales)
+
+    # frozenset: la misma configuración da la misma clave sin importar el orden del dict
+    clave = (plan.producto_id, _generacion_planes, frozenset(modificaciones_ingredientes.items()))
+    entrada = _memo.get(clave)
+    # Una copia del producto con otro precio o ingredientes tiene otro plan: no sirve
+    if entrada is not None and entrada[0] is plan:
+        try:
+            _memo.move_to_end(clave)
+        except KeyError:
+            pass  # Otro hilo la descartó recién; el precio sigue siendo válido
+        _aciertos_memo += 1
+        return entrada[1]
+
+    _fallos_memo += 1
+    precio = plan.calcular(modificaciones_ingredientes, _precios_extra_adicionales)
+    _memo[clave] = (plan, precio)
+    if len(_memo) > TAMANIO_MEMO:
+        with _bloqueo_memo:
+            while len(_memo) > TAMANIO_MEMO:
+                _memo.popitem(last=False)
+    return precio
+
+
+def calcular_precios_lote(lineas):
+    """
+    Calcula en una sola pasada los precios de muchas líneas de pedido
+
+    Args:
+        lineas: Lista de LineaCarrito (utils.registros), como los items del carrito, o de
+                dicts con el formato JSON de los items:
+                {'producto': dict, 'cantidad': int, 'modificaciones_ingredientes': dict}
+                En lugar de 'producto' se puede indicar 'producto_id' (se busca en el catálogo)
+
+    Returns:
+        dict: {
+            'precios_unitarios': lista con el precio unitario de cada línea,
+            'subtotales': lista con precio_unitario * cantidad de cada línea,
+            'total': suma de los subtotales
+        }
+    """
+    _asegurar_generacion()
+
+    planes = []
+    modificaciones = []
+    cantidades = []
+    for linea in lineas:
+        if isinstance(linea, LineaCarrito):
+            planes.append(_plan_compilado(linea.producto))
+            modificaciones.append(linea.modificaciones)
+            cantidades.append(linea.cantidad)
+            continue
+        producto = linea.get('producto')
+        if producto is None:
+            producto = _buscar_producto(linea.get('producto_id'))
+        planes.append(_plan_compilado(producto))
+        modificaciones.append(linea.get('modificaciones_ingredientes') or {})
+        cantidades.append(linea.get('cantidad', 1))
+
+    if NUMPY_AVAILABLE and len(planes) >= UMBRAL_NUMPY:
+        precios_unitarios = _calcular_vectorizado(planes, modificaciones)
+    else:
+        precios_unitarios = [
+            _precio_memorizado(plan, modificaciones_linea) if modificaciones_linea else plan.precio_base
+            for plan, modificaciones_linea in zip(planes, modificaciones)
+        ]
+
+    subtotales = [precio * cantidad for precio, cantidad in zip(precios_unitarios, cantidades)]
+    return {
+        'precios_unitarios': precios_unitarios,
+        'subtotales': subtotales,
+        'total': sum(subtotales)
+    }
+
+
+def calcular_total_lote(lineas):
+    """Retorna solo el total de un conjunto de líneas (ver calcular_precios_lote)"""
+    return calcular_precios_lote(lineas)['total']
+
+
+def recalcular_pedidos(pedidos):
+    """
+    Recalcula con los precios actuales del catálogo el total de muchos pedidos
+    (por ejemplo para reportes), en un solo lote con todas sus líneas
+    Cada línea se calcula con el producto actual del catálogo (su precio e ingredientes
+    de hoy); los productos personalizados y los eliminados del catálogo se calculan
+    con el producto guardado en el pedido
+
+    Args:
+        pedidos: Lista de pedidos con el formato de pedido_info (clave 'items')
+
+    Returns:
+        list: Total recalculado de cada pedido, en el mismo orden
+    """
+    # Importar aquí para evitar importación circular
+    from utils.productos import buscar_producto_por_id
+
+    lineas = []
+    limites = []
+    for pedido in pedidos:
+        for linea in pedido.get('items', []):
+            lineas.append(_linea_con_producto_actual(linea, buscar_producto_por_id))
+        limites.append(len(lineas))
+
+    subtotales = calcular_precios_lote(lineas)['subtotales']
+    totales = []
+    inicio = 0
+    for fin in limites:
+        totales.append(sum(subtotales[inicio:fin]))
+        inicio = fin
+    return totales
+
+
+def _linea_con_producto_actual(linea, buscar_producto_por_id):
+    """
+    Línea de un pedido guardado con el producto actual del catálogo en lugar del guardado
+    (la misma línea si no tiene producto guardado, es personalizado o ya no existe)
+    """
+    if isinstance(linea, LineaCarrito):
+        producto = linea.producto
+        producto_id = producto.id
+    else:
+        producto = linea.get('producto')
+        if producto is None:
+            return linea  # Solo trae 'producto_id': ya se busca en el catálogo
+        producto_id = producto.id if isinstance(producto, Producto) else producto.get('id')
+    if not _cacheable(producto_id):
+        return linea
+    resultado = buscar_producto_por_id(producto_id)
+    if resultado is None:
+        return linea
+    if isinstance(linea, LineaCarrito):
+        return {
+            'producto': resultado['producto'],
+            'cantidad': linea.cantidad,
+            'modificaciones_ingredientes': linea.modificaciones
+        }
+    return {**linea, 'producto': resultado['producto']}
+
+
+def _buscar_producto(producto_id):
+    """Busca un producto del catálogo por ID para las líneas que solo traen el ID"""
+    # Importar aquí para evitar importación circular
+    from utils.productos import buscar_producto_por_id
+    resultado = buscar_producto_por_id(producto_id)
+    if resultado is None:
+        raise KeyError(f"Producto {producto_id} no encontrado")
+    return resultado['producto']
+
+
+def _calcular_vectorizado(planes, modificaciones):
+    """
+    Calcula los precios unitarios con NumPy: arma un arreglo plano con una posición por
+    ingrediente de cada línea y suma los ajustes por línea con bincount.
+    Cantidades base y precios se toman de una tabla con los ingredientes de cada producto
+    distinto del lote (indexada en bloque); en Python solo se leen las cantidades
+    modificadas. Da el mismo resultado que PlanPrecio.calcular.
+    """
+    adicionales = _precios_extra_adicionales
+    desplazamientos = {}  # plan -> primera posición de sus ingredientes en la tabla
+    tabla_bases = []
+    tabla_extras = []
+    tabla_restas = []
+    cantidades = []
+    lineas = []
+    inicios = []
+    largos = []
+    lineas_adicionales = []
+    ajustes_adicionales = []
+
+    for indice, (plan, modificaciones_linea) in enumerate(zip(planes, modificaciones)):
+        if modificaciones_linea and plan.nombres:
+            desplazamiento = desplazamientos.get(plan)
+            if desplazamiento is None:
+                desplazamiento = desplazamientos[plan] = len(tabla_bases)
+                tabla_bases.extend(plan.cantidades_base)
+                tabla_extras.extend(plan.precios_extra)
+                tabla_restas.extend(plan.precios_resta)
+            obtener = modificaciones_linea.get
+            cantidades.extend([obtener(nombre, base) for nombre, base in zip(plan.nombres, plan.cantidades_base)])
+            lineas.append(indice)
+            inicios.append(desplazamiento)
+            largos.append(len(plan.nombres))
+
+        if modificaciones_linea and not modificaciones_linea.keys() <= plan.posiciones.keys():
+            posiciones = plan.posiciones
+            for nombre, cantidad_adicional in modificaciones_linea.items():
+                if nombre not in posiciones and cantidad_adicional > 0:
+                    lineas_adicionales.append(indice)
+                    ajustes_adicionales.append(cantidad_adicional * adicionales.get(nombre, 0.0))
+
+    ajustes_por_linea = [0.0] * len(planes)
+    if lineas:
+        largos = numpy.array(largos, dtype=numpy.intp)
+        comienzos = numpy.cumsum(largos) - largos
+        # Posición en la tabla de cada ingrediente de cada línea
+        posiciones_tabla = numpy.repeat(numpy.array(inicios, dtype=numpy.intp) - comienzos, largos)
+        posiciones_tabla += numpy.arange(len(cantidades))
+        diferencias = numpy.array(cantidades, dtype=float) - numpy.array(tabla_bases, dtype=float)[posiciones_tabla]
+        ajustes = numpy.where(
+            diferencias > 0,
+            diferencias * numpy.array(tabla_extras, dtype=float)[posiciones_tabla],
+            diferencias * numpy.array(tabla_restas, dtype=float)[posiciones_tabla]
+        )
+        indices_lineas = numpy.repeat(numpy.array(lineas, dtype=numpy.intp), largos)
+        ajustes_por_linea = numpy.bincount(indices_lineas, weights=ajustes, minlength=len(planes)).tolist()
+
+    # Los adicionales se suman después de los ingredientes del producto, en el mismo
+    # orden que PlanPrecio.calcular (así el resultado es idéntico)
+    for indice, ajuste in zip(lineas_adicionales, ajustes_adicionales):
+        ajustes_por_linea[indice] += ajuste
+
+    return [
+        plan.precio_base + ajuste if modificaciones_linea else plan.precio_base
+        for plan, modificaciones_linea, ajuste in zip(planes, modificaciones, ajustes_por_linea)
+    ]
+
+
+def obtener_estadisticas_planes():
+    """Retorna la cantidad de planes compilados y la generación del catálogo que usan"""
+    return {"planes": len(_planes), "generacion": _generacion_planes}
+
+
+def obtener_estadisticas_memo():
+    """Retorna los aciertos y fallos del caché de precios y cuántos precios guarda"""
+    with _bloqueo_memo:
+        return {"aciertos": _aciertos_memo, "fallos": _fallos_memo, "tamanio": len(_memo)}
+
+
+def reiniciar_estadisticas_memo():
+    """Pone en cero los contadores de aciertos y fallos del caché de precios"""
+    global _aciertos_memo, _fallos_memo
+    with _bloqueo_memo:
+        _aciertos_memo = 0
+        _fallos_memo = 0
@@ -4,9 +4,12 @@ Ejecuta este script para diagnosticar problemas de impresión
 Usa Win32Raw para imprimir por nombre de impresora en Windows
 """
 import sys
-import json
 import os
 
+# Agregar el directorio raíz al path para importar módulos (se ejecuta como script)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import codec_json
+
 # Configurar encoding para Windows
 if sys.platform == 'win32':
     import io
@@ -34,8 +37,7 @@ def probar_impresora():
     # Cargar configuración
     try:
         ruta_config = obtener_ruta_config()
-        with open(ruta_config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = codec_json.leer_archivo(ruta_config)
         
         nombre_impresora = config.get('impresora', {}).get('nombre_impresora', 'XP-80C')
         
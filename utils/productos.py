@@ -2,8 +2,13 @@
 Módulo para gestión de productos en el archivo JSON
 Maneja operaciones CRUD y asegura que las categorías fijas existan
 """
-import json
-import os
+from utils.catalogo import (
+    crear_repositorio, ajustar_ultimo_id, asignar_id, CLAVE_ULTIMO_ID,
+    PRODUCTO_AGREGADO, PRODUCTO_MODIFICADO, PRODUCTO_ELIMINADO
+)
+from utils.catalogo_particionado import RepositorioParticionado
+from utils.esquema_catalogo import normalizar_productos, informar_problemas, ids_apartados
+from utils.precios import calcular_precio
 
 
 # Categorías fijas del sistema
@@ -23,59 +28,107 @@ def obtener_ruta_json():
     return obtener_ruta_json_helper('productos.json')
 
 
-def cargar_productos():
-    """Carga los productos desde el archivo JSON"""
-    ruta = obtener_ruta_json()
+# Índices sobre los datos en memoria (se reconstruyen en cada parseo del archivo
+# y se mantienen en cada alta, modificación y baja):
+# - id -> (categoría, producto)
+# - nombre de ingrediente -> IDs de los productos que lo usan (índice inverso)
+_indice_por_id = {}
+_productos_por_ingrediente = {}
+
+
+def _reconstruir_indice(data):
+    """Reconstruye los índices de productos por ID y por ingrediente y ajusta la marca de agua de IDs"""
+    _indice_por_id.clear()
+    _productos_por_ingrediente.clear()
+    max_id = 0
+    for categoria in data.get("categorias", []):
+        for producto in categoria.get("productos", []):
+            _indice_por_id[producto.get("id")] = (categoria, producto)
+            _actualizar_indice_ingredientes(producto.get("id"), (), _nombres_ingredientes(producto))
+            max_id = max(max_id, producto.get("id") or 0)
+    # Las filas inválidas apartadas conservan su ID: no reasignarlo
+    ajustar_ultimo_id(data, max(max_id, max(ids_apartados(data), default=0)))
+
+
+def _nombres_ingredientes(producto):
+    """Retorna el conjunto de nombres de ingredientes de un producto"""
+    return {ing.get("nombre") for ing in producto.get("ingredientes", [])}
+
+
+def _actualizar_indice_ingredientes(producto_id, nombres_anteriores, nombres_actuales):
+    """Actualiza el índice inverso cuando cambian los ingredientes de un producto"""
+    for nombre in set(nombres_anteriores) - set(nombres_actuales):
+        ids = _productos_por_ingrediente.get(nombre)
+        if ids is not None:
+            ids.discard(producto_id)
+            if not ids:
+                del _productos_por_ingrediente[nombre]
     
-    # Si está instalado y el archivo no existe, intentar copiarlo desde la instalación
-    import sys
-    if getattr(sys, 'frozen', False):
-        from utils.rutas import obtener_ruta_data_instalacion
-        ruta_instalacion = os.path.join(obtener_ruta_data_instalacion(), 'productos.json')
-        if not os.path.exists(ruta) and os.path.exists(ruta_instalacion):
-            import shutil
-            try:
-                os.makedirs(os.path.dirname(ruta), exist_ok=True)
-                shutil.copy2(ruta_instalacion, ruta)
-            except Exception:
-                pass  # Si falla, continuar y crear uno nuevo
+    for nombre in nombres_actuales:
+        _productos_por_ingrediente.setdefault(nombre, set()).add(producto_id)
+
+
+def _migrar(data):
+    """
+    Valida y normaliza los productos (ver utils.esquema_catalogo) y asegura las categorías fijas
+    La normalización no marca el archivo como modificado: solo se escribe si se agregó una categoría.
+    """
+    informar_problemas("productos", normalizar_productos(data))
+    return asegurar_categorias_fijas(data)
+
+
+# Repositorio en memoria compartido por todo el proceso (JSON o SQLite)
+# (los productos se normalizan y las categorías fijas se aseguran una sola vez
+# cada vez que se parsea el archivo)
+_repositorio = crear_repositorio(
+    "productos",
+    obtener_ruta_json,
+    lambda: {"categorias": []},
+    migrar=_migrar,
+    al_cargar=_reconstruir_indice
+)
+
+
+def cargar_productos():
+    """
+    Carga los productos desde el repositorio en memoria (sin escribir en disco)
+    El archivo JSON solo se vuelve a parsear si cambió en disco.
+    Los datos retornados son compartidos: si se modifican, deben guardarse con guardar_productos
+    """
+    return _repositorio.cargar()
+
+
+def guardar_productos(data, cambios=None, evento=None):
+    """
+    Guarda los productos en el archivo JSON
+    La escritura es diferida: se agrupa con otras modificaciones cercanas y se hace
+    en segundo plano (usar utils.persistencia.flush() para forzarla)
     
-    try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # Asegurar que todas las categorías fijas existan
-            asegurar_categorias_fijas(data)
-            guardar_productos(data)
-            return data
-    except FileNotFoundError:
-        # Crear estructura inicial con categorías fijas
-        data = {"categorias": []}
-        asegurar_categorias_fijas(data)
-        guardar_productos(data)
-        return data
-    except json.JSONDecodeError:
-        print("Error: El archivo productos.json no es válido. Se creará uno nuevo.")
-        data = {"categorias": []}
-        asegurar_categorias_fijas(data)
-        guardar_productos(data)
-        return data
-
-
-def guardar_productos(data):
-    """Guarda los productos en el archivo JSON"""
-    ruta = obtener_ruta_json()
-    # Asegurar que el directorio existe
-    os.makedirs(os.path.dirname(ruta), exist_ok=True)
-    # Escribir con flush explícito para asegurar que se guarde
-    with open(ruta, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-        f.flush()
-        os.fsync(f.fileno())  # Forzar escritura al disco
+    Args:
+        data: Datos de productos
+        cambios: IDs de los productos modificados; solo se escriben esos productos
+                 (registro del diario o filas de SQLite); None reescribe todo el catálogo
+        evento: Tipo de cambio que se notifica para cada ID (PRODUCTO_AGREGADO,
+                PRODUCTO_MODIFICADO o PRODUCTO_ELIMINADO de utils.catalogo);
+                sin evento se notifica una recarga completa
+    """
+    _repositorio.guardar(data, cambios, evento)
+
+
+def obtener_estadisticas_productos():
+    """Retorna los contadores de lecturas y escrituras en disco de productos.json"""
+    return _repositorio.obtener_estadisticas()
 
 
 def asegurar_categorias_fijas(data):
-    """Asegura que todas las categorías fijas existan en los datos"""
+    """
+    Asegura que todas las categorías fijas existan en los datos
+    
+    Returns:
+        bool: True si se agregó alguna categoría (los datos deben guardarse)
+    """
     categorias_existentes = {cat["nombre"] for cat in data.get("categorias", [])}
+    modificado = False
     
     for categoria_nombre in CATEGORIAS_FIJAS:
         if categoria_nombre not in categorias_existentes:
@@ -83,19 +136,57 @@ def asegurar_categorias_fijas(data):
                 "nombre": categoria_nombre,
                 "productos": []
             })
+            modificado = True
+    
+    return modificado
 
 
 def obtener_siguiente_id():
-    """Obtiene el siguiente ID disponible para un nuevo producto"""
+    """
+    Obtiene el siguiente ID disponible para un nuevo producto (sin reservarlo)
+    Sale de la marca de agua del catálogo, por lo que nunca repite IDs de productos eliminados
+    """
     data = cargar_productos()
-    max_id = 0
-    
-    for categoria in data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if producto.get("id", 0) > max_id:
-                max_id = producto.get("id", 0)
-    
-    return max_id + 1
+    return data.get(CLAVE_ULTIMO_ID, 0) + 1
+
+
+def obtener_nombres_categorias():
+    """
+    Retorna los nombres de las categorías en orden
+    Con el catálogo particionado solo lee el manifiesto (no los productos); si al
+    manifiesto le falta alguna categoría fija se carga el catálogo completo, que la agrega
+    """
+    if isinstance(_repositorio, RepositorioParticionado):
+        nombres = _repositorio.obtener_nombres_categorias()
+        if set(CATEGORIAS_FIJAS) <= set(nombres):
+            return nombres
+    return [categoria["nombre"] for categoria in cargar_productos().get("categorias", [])]
+
+
+def obtener_categorias():
+    """
+    Retorna las categorías ({"nombre", "productos"}) en orden, sin copiar
+    Con el catálogo particionado lee cada archivo de categoría solo si todavía no se
+    leyó o si cambió en disco, sin armar el catálogo completo
+    """
+    if isinstance(_repositorio, RepositorioParticionado):
+        categorias = (_repositorio.cargar_categoria(nombre) for nombre in obtener_nombres_categorias())
+        return [categoria for categoria in categorias if categoria is not None]
+    return cargar_productos().get("categorias", [])
+
+
+def obtener_productos_categoria(categoria_nombre):
+    """
+    Retorna los productos de una categoría (None si la categoría no existe)
+    Con el catálogo particionado solo lee el archivo de esa categoría la primera vez
+    """
+    if isinstance(_repositorio, RepositorioParticionado):
+        categoria = _repositorio.cargar_categoria(categoria_nombre)
+    else:
+        categoria = next(
+            (c for c in cargar_productos().get("categorias", []) if c["nombre"] == categoria_nombre), None
+        )
+    return categoria.get("productos", []) if categoria is not None else None
 
 
 def obtener_todos_los_productos():
@@ -115,125 +206,112 @@ def obtener_todos_los_productos():
 
 def buscar_producto_por_id(producto_id):
     """Busca un producto por su ID y retorna el producto con su categoría"""
-    data = cargar_productos()
-    
+    cargar_productos()  # Asegura que el índice esté al día con el archivo
+    entrada = _indice_por_id.get(producto_id)
+    if not entrada:
+        return None
+    
+    categoria, producto = entrada
+    return {
+        "producto": producto,
+        "categoria": categoria["nombre"]
+    }
+
+
+def _obtener_categoria(data, categoria_nombre):
+    """Busca una categoría por nombre y la crea si no existe"""
     for categoria in data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if producto.get("id") == producto_id:
-                return {
-                    "producto": producto,
-                    "categoria": categoria["nombre"]
-                }
+        if categoria["nombre"] == categoria_nombre:
+            return categoria
     
-    return None
+    # Si no existe, crearla (aunque debería existir por ser fija)
+    categoria = {"nombre": categoria_nombre, "productos": []}
+    data.setdefault("categorias", []).append(categoria)
+    return categoria
+
+
+def _quitar_de_categoria(categoria, producto):
+    """Quita un producto de la lista de su categoría (por identidad, no por igualdad)"""
+    productos = categoria.get("productos", [])
+    for idx, existente in enumerate(productos):
+        if existente is producto:
+            productos.pop(idx)
+            return
 
 
 def agregar_producto(categoria_nombre, nombre, precio, descripcion, imagen=None):
     """Agrega un nuevo producto a una categoría"""
-    data = cargar_productos()
-    
-    # Buscar la categoría
-    categoria = None
-    for cat in data.get("categorias", []):
-        if cat["nombre"] == categoria_nombre:
-            categoria = cat
-            break
-    
-    if not categoria:
-        # Si no existe, crearla (aunque debería existir por ser fija)
-        categoria = {"nombre": categoria_nombre, "productos": []}
-        data.setdefault("categorias", []).append(categoria)
-    
-    # Crear nuevo producto
-    nuevo_producto = {
-        "id": obtener_siguiente_id(),
-        "nombre": nombre,
-        "precio": float(precio),
-        "descripcion": descripcion
-    }
-    
-    # Agregar imagen si se proporciona
-    if imagen:
-        nuevo_producto["imagen"] = imagen
-    
-    categoria.setdefault("productos", []).append(nuevo_producto)
-    guardar_productos(data)
-    return nuevo_producto
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        categoria = _obtener_categoria(data, categoria_nombre)
+        
+        # Crear nuevo producto
+        nuevo_producto = {
+            "id": asignar_id(data),
+            "nombre": nombre,
+            "precio": float(precio),
+            "descripcion": descripcion or "",
+            "ingredientes": []
+        }
+        
+        # Agregar imagen si se proporciona
+        if imagen:
+            nuevo_producto["imagen"] = imagen
+        
+        categoria.setdefault("productos", []).append(nuevo_producto)
+        _indice_por_id[nuevo_producto["id"]] = (categoria, nuevo_producto)
+        guardar_productos(data, {nuevo_producto["id"]}, PRODUCTO_AGREGADO)
+        return nuevo_producto
 
 
 def modificar_producto(producto_id, categoria_nombre, nombre, precio, descripcion, imagen=None):
-    """Modifica un producto existente"""
-    data = cargar_productos()
-    
-    # Buscar y eliminar el producto de su categoría actual
-    producto_encontrado = None
-    categoria_original = None
-    
-    for categoria in data.get("categorias", []):
-        for idx, producto in enumerate(categoria.get("productos", [])):
-            if producto.get("id") == producto_id:
-                producto_encontrado = categoria["productos"].pop(idx)
-                categoria_original = categoria["nombre"]
-                break
-        if producto_encontrado:
-            break
-    
-    if not producto_encontrado:
-        return False
-    
-    # Actualizar datos del producto
-    producto_encontrado["nombre"] = nombre
-    producto_encontrado["precio"] = float(precio)
-    producto_encontrado["descripcion"] = descripcion
-    
-    # Actualizar imagen si se proporciona (None significa no cambiar, "" significa eliminar)
-    if imagen is not None:
-        if imagen:
-            producto_encontrado["imagen"] = imagen
-        else:
-            producto_encontrado.pop("imagen", None)
-    
-    # Si cambió de categoría, agregarlo a la nueva
-    if categoria_original != categoria_nombre:
-        # Buscar la nueva categoría
-        nueva_categoria = None
-        for cat in data.get("categorias", []):
-            if cat["nombre"] == categoria_nombre:
-                nueva_categoria = cat
-                break
+    """Modifica un producto existente (queda al final de su categoría, aunque no cambie de categoría)"""
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        entrada = _indice_por_id.get(producto_id)
+        if not entrada:
+            return False
+        
+        categoria_original, producto = entrada
         
-        if nueva_categoria:
-            nueva_categoria.setdefault("productos", []).append(producto_encontrado)
+        # Actualizar datos del producto
+        producto["nombre"] = nombre
+        producto["precio"] = float(precio)
+        producto["descripcion"] = descripcion or ""
+        
+        # Actualizar imagen si se proporciona (None significa no cambiar, "" significa eliminar)
+        if imagen is not None:
+            if imagen:
+                producto["imagen"] = imagen
+            else:
+                producto.pop("imagen", None)
+        
+        # Sacarlo de su categoría y agregarlo al final de la nueva (o de la misma)
+        _quitar_de_categoria(categoria_original, producto)
+        if categoria_original["nombre"] != categoria_nombre:
+            nueva_categoria = _obtener_categoria(data, categoria_nombre)
         else:
-            # Si no existe, crearla
-            nueva_categoria = {"nombre": categoria_nombre, "productos": [producto_encontrado]}
-            data.setdefault("categorias", []).append(nueva_categoria)
-    else:
-        # Si no cambió de categoría, volver a agregarlo
-        categoria_original_obj = None
-        for cat in data.get("categorias", []):
-            if cat["nombre"] == categoria_original:
-                categoria_original_obj = cat
-                break
-        if categoria_original_obj:
-            categoria_original_obj.setdefault("productos", []).append(producto_encontrado)
-    
-    guardar_productos(data)
-    return True
+            nueva_categoria = categoria_original
+        nueva_categoria.setdefault("productos", []).append(producto)
+        _indice_por_id[producto_id] = (nueva_categoria, producto)
+        
+        guardar_productos(data, {producto_id}, PRODUCTO_MODIFICADO)
+        return True
 
 
 def eliminar_producto(producto_id):
     """Elimina un producto por su ID"""
-    data = cargar_productos()
-    
-    for categoria in data.get("categorias", []):
-        for idx, producto in enumerate(categoria.get("productos", [])):
-            if producto.get("id") == producto_id:
-                categoria["productos"].pop(idx)
-                guardar_productos(data)
-                return True
-    
-    return False
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        entrada = _indice_por_id.pop(producto_id, None)
+        if not entrada:
+            return False
+        
+        categoria, producto = entrada
+        _quitar_de_categoria(categoria, producto)
+        _actualizar_indice_ingredientes(producto_id, _nombres_ingredientes(producto), ())
+        guardar_productos(data, {producto_id}, PRODUCTO_ELIMINADO)
+        return True
 
 
 def obtener_ingredientes_producto(producto_id):
@@ -246,74 +324,157 @@ def obtener_ingredientes_producto(producto_id):
     return []
 
 
+def _referencia_ingrediente(ingrediente_data):
+    """
+    Arma la referencia que se guarda en el producto (solo nombre y cantidad_base)
+    Retorna None si la cantidad base no es un entero mayor o igual a 0 (por ejemplo,
+    el campo vacío del formulario de administración).
+    """
+    cantidad_base = ingrediente_data.get("cantidad_base", 1)
+    try:
+        cantidad_base = int(cantidad_base)
+    except (TypeError, ValueError):
+        cantidad_base = -1
+    if cantidad_base < 0:
+        print(f"Advertencia: cantidad base inválida para {ingrediente_data.get('nombre', '')}: {ingrediente_data.get('cantidad_base')!r}")
+        return None
+    return {"nombre": ingrediente_data.get("nombre", ""), "cantidad_base": cantidad_base}
+
+
 def agregar_ingrediente_a_producto(producto_id, ingrediente_data):
     """
     Agrega un ingrediente a un producto
     ingrediente_data debe tener: nombre, cantidad_base
     NOTA: Los precios (precio_extra, precio_resta) se obtienen dinámicamente desde ingredientes.json
     """
-    data = cargar_productos()
-    
-    for categoria in data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if producto.get("id") == producto_id:
-                if "ingredientes" not in producto:
-                    producto["ingredientes"] = []
-                
-                # Solo guardar nombre y cantidad_base (sistema de referencias)
-                ingrediente_referencia = {
-                    "nombre": ingrediente_data.get("nombre", ""),
-                    "cantidad_base": ingrediente_data.get("cantidad_base", 1)
-                }
-                
-                producto["ingredientes"].append(ingrediente_referencia)
-                guardar_productos(data)
-                return True
-    
-    return False
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        entrada = _indice_por_id.get(producto_id)
+        if not entrada:
+            return False
+        
+        producto = entrada[1]
+        # Solo guardar nombre y cantidad_base (sistema de referencias)
+        ingrediente_referencia = _referencia_ingrediente(ingrediente_data)
+        if ingrediente_referencia is None:
+            return False
+        
+        producto.setdefault("ingredientes", []).append(ingrediente_referencia)
+        _actualizar_indice_ingredientes(producto_id, (), {ingrediente_referencia["nombre"]})
+        guardar_productos(data, {producto_id}, PRODUCTO_MODIFICADO)
+        return True
 
 
 def modificar_ingrediente_producto(producto_id, indice_ingrediente, ingrediente_data):
     """Modifica un ingrediente específico de un producto"""
-    data = cargar_productos()
-    
-    for categoria in data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if producto.get("id") == producto_id:
-                ingredientes = producto.get("ingredientes", [])
-                if 0 <= indice_ingrediente < len(ingredientes):
-                    # Solo guardar nombre y cantidad_base (sistema de referencias)
-                    ingrediente_referencia = {
-                        "nombre": ingrediente_data.get("nombre", ""),
-                        "cantidad_base": ingrediente_data.get("cantidad_base", 1)
-                    }
-                    ingredientes[indice_ingrediente] = ingrediente_referencia
-                    guardar_productos(data)
-                    return True
-    
-    return False
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        entrada = _indice_por_id.get(producto_id)
+        if not entrada:
+            return False
+        
+        producto = entrada[1]
+        ingredientes = producto.get("ingredientes", [])
+        if not 0 <= indice_ingrediente < len(ingredientes):
+            return False
+        
+        # Solo guardar nombre y cantidad_base (sistema de referencias)
+        ingrediente_referencia = _referencia_ingrediente(ingrediente_data)
+        if ingrediente_referencia is None:
+            return False
+        
+        nombres_anteriores = _nombres_ingredientes(producto)
+        ingredientes[indice_ingrediente] = ingrediente_referencia
+        _actualizar_indice_ingredientes(producto_id, nombres_anteriores, _nombres_ingredientes(producto))
+        guardar_productos(data, {producto_id}, PRODUCTO_MODIFICADO)
+        return True
 
 
 def eliminar_ingrediente_producto(producto_id, indice_ingrediente):
     """Elimina un ingrediente específico de un producto"""
-    data = cargar_productos()
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        entrada = _indice_por_id.get(producto_id)
+        if not entrada:
+            return False
+        
+        producto = entrada[1]
+        ingredientes = producto.get("ingredientes", [])
+        if not 0 <= indice_ingrediente < len(ingredientes):
+            return False
+        
+        nombres_anteriores = _nombres_ingredientes(producto)
+        ingredientes.pop(indice_ingrediente)
+        _actualizar_indice_ingredientes(producto_id, nombres_anteriores, _nombres_ingredientes(producto))
+        guardar_productos(data, {producto_id}, PRODUCTO_MODIFICADO)
+        return True
+
+
+def obtener_ids_productos_con_ingrediente(nombre_ingrediente):
+    """Retorna el conjunto de IDs de los productos que usan un ingrediente (no modificar)"""
+    cargar_productos()  # Asegura que el índice esté al día con el archivo
+    return _productos_por_ingrediente.get(nombre_ingrediente, set())
+
+
+def contar_productos_con_ingrediente(nombre_ingrediente):
+    """Retorna cuántos productos usan un ingrediente"""
+    return len(obtener_ids_productos_con_ingrediente(nombre_ingrediente))
+
+
+def renombrar_ingrediente_en_productos(nombre_anterior, nombre_nuevo):
+    """
+    Actualiza el nombre de un ingrediente en todos los productos que lo usan
+    Solo recorre los productos que lo usan (índice inverso)
     
-    for categoria in data.get("categorias", []):
-        for producto in categoria.get("productos", []):
-            if producto.get("id") == producto_id:
-                ingredientes = producto.get("ingredientes", [])
-                if 0 <= indice_ingrediente < len(ingredientes):
-                    ingredientes.pop(indice_ingrediente)
-                    guardar_productos(data)
-                    return True
+    Returns:
+        int: Cantidad de productos modificados
+    """
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        ids = _productos_por_ingrediente.pop(nombre_anterior, set())
+        
+        for producto_id in ids:
+            producto = _indice_por_id[producto_id][1]
+            for ing in producto.get("ingredientes", []):
+                if ing.get("nombre") == nombre_anterior:
+                    ing["nombre"] = nombre_nuevo
+        
+        if ids:
+            _productos_por_ingrediente.setdefault(nombre_nuevo, set()).update(ids)
+            guardar_productos(data, ids, PRODUCTO_MODIFICADO)
+        return len(ids)
+
+
+def quitar_ingrediente_de_productos(nombre_ingrediente):
+    """
+    Elimina un ingrediente de todos los productos que lo usan
+    Solo recorre los productos que lo usan (índice inverso)
     
-    return False
+    Returns:
+        int: Cantidad de productos modificados
+    """
+    with _repositorio.bloqueo:
+        data = cargar_productos()
+        ids = _productos_por_ingrediente.pop(nombre_ingrediente, set())
+        
+        for producto_id in ids:
+            producto = _indice_por_id[producto_id][1]
+            # Filtrar ingredientes que coincidan con el nombre
+            producto["ingredientes"] = [
+                ing for ing in producto.get("ingredientes", [])
+                if ing.get("nombre") != nombre_ingrediente
+            ]
+        
+        if ids:
+            guardar_productos(data, ids, PRODUCTO_MODIFICADO)
+        return len(ids)
 
 
 def calcular_precio_con_ingredientes(producto, modificaciones_ingredientes=None):
     """
     Calcula el precio final de un producto considerando modificaciones de ingredientes
     Los precios de los ingredientes se obtienen dinámicamente desde ingredientes.json
+    (a través del plan de precio compilado del producto, ver utils.precios)
     
     Args:
         producto: Diccionario del producto con precio base y opcionalmente ingredientes
@@ -323,57 +484,4 @@ def calcular_precio_con_ingredientes(producto, modificaciones_ingredientes=None)
     Returns:
         float: Precio final calculado
     """
-    precio_base = producto.get("precio", 0.0)
-    ingredientes = producto.get("ingredientes", [])
-    
-    # Si no hay modificaciones, retornar precio base
-    if not modificaciones_ingredientes:
-        return precio_base
-    
-    ajuste_total = 0.0
-    
-    # Importar aquí para evitar importación circular
-    from utils.ingredientes import buscar_ingrediente_por_nombre
-    
-    # Crear diccionario de ingredientes del producto por nombre
-    ingredientes_producto_dict = {ing.get("nombre", ""): ing for ing in ingredientes}
-    
-    # Procesar ingredientes del producto
-    for ingrediente in ingredientes:
-        nombre = ingrediente.get("nombre", "")
-        cantidad_base = ingrediente.get("cantidad_base", 1)
-        
-        # Buscar el ingrediente actualizado desde ingredientes.json para obtener precios
-        ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre)
-        if not ingrediente_actualizado:
-            # Si el ingrediente no existe, usar valores por defecto (0.0)
-            precio_extra = 0.0
-            precio_resta = 0.0
-        else:
-            precio_extra = ingrediente_actualizado.get("precio_extra", 0.0)
-            precio_resta = ingrediente_actualizado.get("precio_resta", 0.0)
-        
-        # Obtener cantidad modificada (usar cantidad_base si no se modificó)
-        cantidad_modificada = modificaciones_ingredientes.get(nombre, cantidad_base)
-        
-        if cantidad_modificada > cantidad_base:
-            # Se agregaron extras
-            extras = cantidad_modificada - cantidad_base
-            ajuste_total += extras * precio_extra
-        elif cantidad_modificada < cantidad_base:
-            # Se quitaron unidades
-            quitados = cantidad_base - cantidad_modificada
-            ajuste_total -= quitados * precio_resta
-        # Si cantidad_modificada == cantidad_base, no hay ajuste (ya está incluido en el precio base)
-    
-    # Procesar ingredientes adicionales que no están en el producto
-    for nombre, cantidad_adicional in modificaciones_ingredientes.items():
-        if nombre not in ingredientes_producto_dict and cantidad_adicional > 0:
-            # Este es un ingrediente adicional que no está en el producto
-            ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre)
-            if ingrediente_actualizado:
-                precio_extra = ingrediente_actualizado.get("precio_extra", 0.0)
-                # Los ingredientes adicionales se cobran como extras
-                ajuste_total += cantidad_adicional * precio_extra
-    
-    return precio_base + ajuste_total
\ No newline at end of file
+    return calcular_precio(producto, modificaciones_ingredientes)
@@ -0,0 +1,318 @@
+"""
+Módulo de registros inmutables para el carrito, los precios y los tickets
+Los productos del catálogo son diccionarios que modifica la administración; el carrito
+no puede guardar una referencia a ellos (cambiarían sus items) y antes los copiaba con
+.copy() por cada item agregado, y pedido_info['items'] volvía a copiar la lista.
+
+Estos registros usan __slots__ (sin __dict__ por instancia) y no se pueden modificar:
+- IngredienteBase: ingrediente de un producto (nombre y cantidad base)
+- Producto: producto con sus ingredientes (tupla de IngredienteBase) y su categoría
+- Ingrediente: ingrediente del catálogo con sus precios de extra y de resta
+- LineaCarrito: producto, cantidad y modificaciones de ingredientes de un item
+
+Al ser inmutables se comparten sin copiar: todos los items de un mismo producto usan
+el mismo Producto (producto_de_catalogo() lo arma una vez por generación del catálogo)
+y el pedido que va a los tickets comparte las líneas del carrito. Para cambiar un
+valor se arma un registro nuevo con reemplazar().
+
+a_dict() / desde_dict() convierten a y desde el formato JSON de siempre.
+"""
+from types import MappingProxyType
+
+from utils import catalogo
+
+
+# Los registros asignan sus campos una sola vez, al crearse (después son inmutables)
+_asignar = object.__setattr__
+
+
+class Registro:
+    """
+    Base de los registros: inmutables, comparables y convertibles a diccionario
+    Cada subclase indica sus campos en _CAMPOS (y en __slots__, que puede sumar cachés internos)
+    """
+
+    __slots__ = ()
+    _CAMPOS = ()
+
+    def __init__(self, *valores, **nombrados):
+        campos = self._CAMPOS
+        if not nombrados and len(valores) == len(campos):
+            for campo, valor in zip(campos, valores):
+                _asignar(self, campo, valor)
+            return
+        if len(valores) > len(campos):
+            raise TypeError(f"{type(self).__name__} recibe como máximo {len(campos)} valores")
+        for campo, valor in zip(campos, valores):
+            _asignar(self, campo, valor)
+        for campo, valor in nombrados.items():
+            if campo not in campos:
+                raise TypeError(f"{type(self).__name__} no tiene el campo {campo!r}")
+            _asignar(self, campo, valor)
+        for campo in campos[len(valores):]:
+            if campo not in nombrados:
+                _asignar(self, campo, self._valor_por_defecto(campo))
+
+    def _valor_por_defecto(self, campo):
+        raise TypeError(f"{type(self).__name__}: falta el campo {campo!r}")
+
+    def __setattr__(self, campo, valor):
+        raise AttributeError(f"{type(self).__name__} es inmutable (usar reemplazar())")
+
+    def __delattr__(self, campo):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def valores(self):
+        """Tupla con los valores de los campos en orden"""
+        return tuple(getattr(self, campo) for campo in self._CAMPOS)
+
+    def reemplazar(self, **cambios):
+        """Retorna un registro nuevo con algunos campos cambiados (el original no cambia)"""
+        valores = {campo: getattr(self, campo) for campo in self._CAMPOS}
+        valores.update(cambios)
+        return type(self)(**valores)
+
+    def __eq__(self, otro):
+        if type(otro) is not type(self):
+            return NotImplemented
+        return self.valores() == otro.valores()
+
+    def __hash__(self):
+        return hash((type(self), self.valores()))
+
+    def __reduce__(self):
+        # copy y pickle arman el registro con el constructor (no pueden asignar atributos)
+        return (type(self), self.valores())
+
+    def __repr__(self):
+        campos = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self._CAMPOS)
+        return f"{type(self).__name__}({campos})"
+
+
+class IngredienteBase(Registro):
+    """Ingrediente de un producto: nombre y cantidad que trae el producto sin modificar"""
+
+    __slots__ = _CAMPOS = ("nombre", "cantidad_base")
+
+    def _valor_por_defecto(self, campo):
+        if campo == "cantidad_base":
+            return 1
+        return super()._valor_por_defecto(campo)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos.get("nombre", ""), datos.get("cantidad_base", 1))
+
+    def a_dict(self):
+        return {"nombre": self.nombre, "cantidad_base": self.cantidad_base}
+
+
+class Producto(Registro):
+    """Producto con sus ingredientes (tupla de IngredienteBase) y la categoría en la que estaba"""
+
+    _CAMPOS = ("id", "nombre", "precio", "descripcion", "ingredientes", "imagen", "categoria")
+    __slots__ = _CAMPOS + ("_modificaciones_base",)
+
+    _POR_DEFECTO = {"descripcion": "", "ingredientes": (), "imagen": None, "categoria": ""}
+
+    def _valor_por_defecto(self, campo):
+        if campo in self._POR_DEFECTO:
+            return self._POR_DEFECTO[campo]
+        return super()._valor_por_defecto(campo)
+
+    @classmethod
+    def desde_dict(cls, datos, categoria=None):
+        """
+        Arma un Producto desde un producto del catálogo o cualquier dict de producto
+        (las claves que falten toman los mismos valores por defecto que el cálculo de precios)
+
+        Args:
+            datos: Producto del catálogo o dict generado por a_dict()
+            categoria: Categoría del producto (por defecto la de datos, si la tiene)
+        """
+        return cls(
+            datos.get("id"),
+            datos.get("nombre", ""),
+            datos.get("precio", 0.0),
+            datos.get("descripcion", ""),
+            tuple(IngredienteBase.desde_dict(ingrediente) for ingrediente in datos.get("ingredientes", ())),
+            datos.get("imagen"),
+            categoria if categoria is not None else datos.get("categoria", "")
+        )
+
+    def a_dict(self):
+        datos = {
+            "id": self.id,
+            "nombre": self.nombre,
+            "precio": self.precio,
+            "descripcion": self.descripcion,
+            "ingredientes": [ingrediente.a_dict() for ingrediente in self.ingredientes]
+        }
+        if self.imagen:
+            datos["imagen"] = self.imagen
+        if self.categoria:
+            datos["categoria"] = self.categoria
+        return datos
+
+    def modificaciones_base(self):
+        """
+        Mapeo de solo lectura {nombre_ingrediente: cantidad_base} de un item sin modificar
+        Se arma la primera vez y lo comparten todas las líneas nuevas de este producto.
+        """
+        try:
+            return self._modificaciones_base
+        except AttributeError:
+            base = MappingProxyType({ing.nombre: ing.cantidad_base for ing in self.ingredientes})
+            _asignar(self, "_modificaciones_base", base)
+            return base
+
+
+class Ingrediente(Registro):
+    """Ingrediente del catálogo con sus precios (categorías en una tupla)"""
+
+    __slots__ = _CAMPOS = ("id", "nombre", "categorias", "precio_extra", "precio_resta", "imagen")
+
+    _POR_DEFECTO = {"categorias": (), "precio_extra": 0.0, "precio_resta": 0.0, "imagen": None}
+
+    def _valor_por_defecto(self, campo):
+        if campo in self._POR_DEFECTO:
+            return self._POR_DEFECTO[campo]
+        return super()._valor_por_defecto(campo)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(
+            datos["id"],
+            datos["nombre"],
+            tuple(datos.get("categorias", ())),
+            datos.get("precio_extra", 0.0),
+            datos.get("precio_resta", 0.0),
+            datos.get("imagen")
+        )
+
+    def a_dict(self):
+        datos = {
+            "id": self.id,
+            "nombre": self.nombre,
+            "categorias": list(self.categorias),
+            "precio_extra": self.precio_extra,
+            "precio_resta": self.precio_resta
+        }
+        if self.imagen:
+            datos["imagen"] = self.imagen
+        return datos
+
+
+class LineaCarrito(Registro):
+    """
+    Item del carrito o de un pedido
+
+    Atributos:
+        producto: Producto
+        cantidad: Cantidad de unidades
+        modificaciones: Mapeo de solo lectura {nombre_ingrediente: cantidad} (vacío si no hay)
+    """
+
+    __slots__ = _CAMPOS = ("producto", "cantidad", "modificaciones")
+
+    _SIN_MODIFICACIONES = MappingProxyType({})
+
+    def __init__(self, producto, cantidad=1, modificaciones=None):
+        if not modificaciones:
+            modificaciones = self._SIN_MODIFICACIONES
+        elif not isinstance(modificaciones, MappingProxyType):
+            # Copia propia: quien armó el dict lo puede seguir modificando
+            modificaciones = MappingProxyType(dict(modificaciones))
+        _asignar(self, "producto", producto)
+        _asignar(self, "cantidad", cantidad)
+        _asignar(self, "modificaciones", modificaciones)
+
+    def __hash__(self):
+        return hash((type(self), self.producto, self.cantidad, frozenset(self.modificaciones.items())))
+
+    def __eq__(self, otro):
+        if type(otro) is not type(self):
+            return NotImplemented
+        return (self.producto == otro.producto and self.cantidad == otro.cantidad
+                and dict(self.modificaciones) == dict(otro.modificaciones))
+
+    def __reduce__(self):
+        return (type(self), (self.producto, self.cantidad, dict(self.modificaciones)))
+
+    @classmethod
+    def nueva(cls, producto, cantidad=1):
+        """Línea de un producto sin modificar (cada ingrediente en su cantidad base)"""
+        return cls(producto, cantidad, producto.modificaciones_base())
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """
+        Arma una línea desde el formato JSON de los items
+        ({'producto': dict, 'cantidad': int, 'modificaciones_ingredientes': dict}; en lugar
+        de 'producto' puede venir 'producto_id', que se busca en el catálogo)
+        """
+        producto = datos.get("producto")
+        if producto is None:
+            producto = _buscar_producto(datos.get("producto_id"))
+        else:
+            producto = producto_de_catalogo(producto)
+        return cls(producto, datos.get("cantidad", 1), datos.get("modificaciones_ingredientes"))
+
+    def a_dict(self):
+        return {
+            "producto": self.producto.a_dict(),
+            "cantidad": self.cantidad,
+            "modificaciones_ingredientes": dict(self.modificaciones)
+        }
+
+
+def _buscar_producto(producto_id):
+    """Producto del catálogo por ID (para las líneas que solo traen el ID)"""
+    # Importar aquí para evitar importación circular
+    from utils.productos import buscar_producto_por_id
+    resultado = buscar_producto_por_id(producto_id)
+    if resultado is None:
+        raise KeyError(f"Producto {producto_id} no encontrado")
+    return producto_de_catalogo(resultado['producto'], resultado['categoria'])
+
+
+# Cantidad máxima de productos convertidos que se recuerdan (al superarla se empieza de nuevo)
+TAMANIO_MAXIMO_PRODUCTOS = 4096
+
+# Productos ya convertidos en la generación actual del catálogo:
+# id() del dict del catálogo -> (dict, categoría, Producto)
+_generacion_productos = None
+_productos = {}
+
+
+def producto_de_catalogo(producto, categoria=None):
+    """
+    Retorna el Producto de un producto del catálogo, compartido mientras el catálogo no cambie
+    (también sirve para cualquier dict de producto, por ejemplo los de pedidos guardados)
+
+    Args:
+        producto: Dict del producto (normalizado) o un Producto (se retorna igual)
+        categoria: Categoría del producto (opcional)
+    """
+    global _generacion_productos
+
+    if isinstance(producto, Producto):
+        return producto
+    generacion = catalogo.obtener_generacion()
+    if generacion != _generacion_productos or len(_productos) >= TAMANIO_MAXIMO_PRODUCTOS:
+        _productos.clear()
+        _generacion_productos = generacion
+
+    # El dict queda referenciado en la entrada: su id() no se reutiliza mientras esté acá
+    entrada = _productos.get(id(producto))
+    if entrada is not None and entrada[0] is producto and (categoria is None or entrada[1] == categoria):
+        return entrada[2]
+
+    registro = Producto.desde_dict(producto, categoria)
+    _productos[id(producto)] = (producto, categoria, registro)
+    return registro
+
+
+def obtener_lineas(items):
+    """Convierte una lista de items (LineaCarrito o dicts con el formato JSON) en LineaCarrito"""
+    return [item if isinstance(item, LineaCarrito) else LineaCarrito.desde_dict(item) for item in items]
@@ -0,0 +1,136 @@
+"""
+Módulo de snapshots binarios de los catálogos JSON (arranque en frío rápido)
+Junto a cada JSON del catálogo se guarda una copia de los datos ya parseados en formato
+marshal (productos.json -> productos.json.snapshot), que se carga varias veces más rápido
+que parsear el JSON. marshal alcanza para los tipos del catálogo (dict, list, str,
+números) y es el formato que Python carga más rápido; es un formato interno de Python
+(puede cambiar entre versiones: un snapshot que no se puede leer se ignora).
+
+marshal no es seguro frente a datos armados a propósito: un archivo manipulado puede
+hacer fallar al intérprete. El snapshot es un caché local de los JSON, no un formato de
+intercambio: el hash de los datos del encabezado detecta snapshots dañados o cortados,
+pero no protege contra alguien que pueda escribir en la carpeta de datos.
+
+Formato: una línea con el identificador del formato, una línea con el encabezado en
+JSON (versión, firma y hash del JSON, hash de los datos) y después los datos.
+
+El snapshot lleva la firma del JSON del que salió (fecha de modificación, tamaño y hash
+del contenido) y solo se usa si sigue correspondiendo al JSON actual: si el JSON se editó
+a mano, se copió o se reemplazó, se vuelve a parsear el JSON y se regenera el snapshot.
+"""
+import hashlib
+import marshal
+import os
+
+from utils import codec_json
+from utils.persistencia import escribir_archivo_atomico
+
+
+EXTENSION_SNAPSHOT = ".snapshot"
+
+# Versión del formato del snapshot (cambiarla descarta los snapshots existentes)
+VERSION_FORMATO = 3
+
+# Primera línea de cada snapshot (los de otro formato, como los pickle anteriores, se ignoran)
+IDENTIFICADOR = b"PAPUCHO-SNAPSHOT\n"
+
+
+def obtener_ruta_snapshot(ruta_json):
+    """Retorna la ruta del snapshot de un archivo JSON"""
+    return ruta_json + EXTENSION_SNAPSHOT
+
+
+def calcular_hash(contenido):
+    """Hash del contenido de un JSON (bytes)"""
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+def leer_snapshot(ruta_json, firma):
+    """
+    Carga los datos del snapshot de un JSON si corresponde a su versión actual
+
+    Args:
+        ruta_json: Ruta completa del archivo JSON
+        firma: Firma actual del JSON (fecha de modificación en ns, tamaño), ver
+               utils.catalogo.obtener_firma_archivo
+
+    Returns:
+        tuple: (datos del catálogo, hash del JSON), o None si no hay snapshot o está desactualizado
+    """
+    if firma is None:
+        return None
+
+    try:
+        with open(obtener_ruta_snapshot(ruta_json), 'rb') as f:
+            if f.readline() != IDENTIFICADOR:
+                return None
+            encabezado = codec_json.decodificar(f.readline())
+            if not isinstance(encabezado, dict) or encabezado.get("version") != VERSION_FORMATO:
+                return None
+
+            if tuple(encabezado.get("firma", ())) != tuple(firma):
+                if encabezado.get("firma", (None, None))[1] != firma[1]:
+                    return None
+                # Mismo tamaño pero otra fecha (archivo copiado o tocado): comparar el contenido
+                with open(ruta_json, 'rb') as archivo_json:
+                    if calcular_hash(archivo_json.read()) != encabezado.get("hash"):
+                        return None
+
+            serializado = f.read()
+            if calcular_hash(serializado) != encabezado.get("hash_datos"):
+                # Dañado o cortado: no se le pasa a marshal
+                return None
+            datos = marshal.loads(serializado)
+            if not isinstance(datos, dict):
+                return None
+            return datos, encabezado.get("hash")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Snapshot dañado o de otra versión: se usa el JSON
+        print(f"Advertencia: no se pudo leer el snapshot de {os.path.basename(ruta_json)}: {e}")
+        return None
+
+
+def serializar_datos(datos):
+    """
+    Serializa los datos para el snapshot
+    Se hace aparte de escribir_snapshot() para poder tomar la copia mientras se tiene
+    el bloqueo del catálogo y escribir el archivo después, sin bloquear a nadie.
+    """
+    return marshal.dumps(datos)
+
+
+def escribir_snapshot(ruta_json, datos_serializados, firma, contenido):
+    """
+    Guarda el snapshot de un JSON (atómico, igual que los JSON)
+
+    Args:
+        ruta_json: Ruta completa del archivo JSON
+        datos_serializados: Datos del JSON serializados con serializar_datos()
+        firma: Firma del JSON con ese contenido
+        contenido: Contenido del JSON (bytes), para el hash
+    """
+    if firma is None or datos_serializados is None:
+        return
+
+    encabezado = {
+        "version": VERSION_FORMATO,
+        "firma": list(firma),
+        "hash": calcular_hash(contenido),
+        "hash_datos": calcular_hash(datos_serializados)
+    }
+    try:
+        blob = IDENTIFICADOR + codec_json.codificar(encabezado, codec_json.MODO_COMPACTO) + b"\n" + datos_serializados
+        escribir_archivo_atomico(obtener_ruta_snapshot(ruta_json), blob)
+    except Exception as e:
+        # El snapshot es solo un acelerador: sin él se parsea el JSON
+        print(f"Advertencia: no se pudo guardar el snapshot de {os.path.basename(ruta_json)}: {e}")
+
+
+def eliminar_snapshot(ruta_json):
+    """Elimina el snapshot de un JSON si existe"""
+    try:
+        os.remove(obtener_ruta_snapshot(ruta_json))
+    except OSError:
+        pass
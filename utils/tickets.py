@@ -6,9 +6,11 @@ Usa Win32Raw para imprimir por nombre de impresora en Windows
 """
 import os
 import sys
-import json
 from datetime import datetime
 
+from utils import codec_json
+from utils.registros import obtener_lineas, producto_de_catalogo
+
 try:
     from escpos.printer import Win32Raw
     from escpos.exceptions import Error
@@ -34,9 +36,7 @@ def cargar_configuracion():
     """Carga la configuración desde el archivo JSON"""
     ruta_config = obtener_ruta_config()
     try:
-        with open(ruta_config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config
+        return codec_json.leer_archivo(ruta_config)
     except FileNotFoundError:
         # Configuración por defecto si no existe el archivo
         config_default = {
@@ -50,10 +50,8 @@ def cargar_configuracion():
                 "lineas_corte": 3
             }
         }
-        # Crear el archivo de configuración
-        os.makedirs(os.path.dirname(ruta_config), exist_ok=True)
-        with open(ruta_config, 'w', encoding='utf-8') as f:
-            json.dump(config_default, f, indent=2, ensure_ascii=False)
+        # Crear el archivo de configuración (siempre legible: se edita a mano)
+        codec_json.escribir_archivo(ruta_config, config_default, codec_json.MODO_LEGIBLE)
         return config_default
     except Exception as e:
         print(f"Error al cargar configuración: {e}")
@@ -198,7 +196,7 @@ def tiene_modificaciones_reales(producto, modificaciones):
     (es decir, si alguna cantidad difiere de la cantidad base o si hay ingredientes adicionales)
     
     Args:
-        producto: Diccionario del producto con ingredientes
+        producto: Producto (utils.registros) o dict del producto
         modificaciones: Dict con {nombre_ingrediente: cantidad_actual}
     
     Returns:
@@ -207,13 +205,14 @@ def tiene_modificaciones_reales(producto, modificaciones):
     if not modificaciones:
         return False
     
-    ingredientes = producto.get('ingredientes', [])
-    ingredientes_producto_dict = {ing.get('nombre', '') for ing in ingredientes}
+    producto = producto_de_catalogo(producto)
+    ingredientes = producto.ingredientes
+    ingredientes_producto_dict = {ing.nombre for ing in ingredientes}
     
     # Verificar modificaciones en ingredientes del producto
     for ingrediente in ingredientes:
-        nombre = ingrediente.get('nombre', '')
-        cantidad_base = ingrediente.get('cantidad_base', 1)
+        nombre = ingrediente.nombre
+        cantidad_base = ingrediente.cantidad_base
         cantidad_actual = modificaciones.get(nombre, cantidad_base)
         
         if cantidad_actual != cantidad_base:
@@ -412,23 +411,28 @@ def imprimir_ticket_escpos(pedido_info, tipo_ticket):
         printer.text("PEDIDO:\n")
         printer.set(bold=False)
         
+        # Precios unitarios de todos los items en un solo lote
+        from utils.precios import calcular_precios_lote
+        # (los items son LineaCarrito compartidas con el carrito; ver utils.registros)
+        items = obtener_lineas(pedido_info['items'])
+        precios_unitarios = calcular_precios_lote(items)['precios_unitarios']
+        
         # Items del pedido
-        for item in pedido_info['items']:
-            producto = item['producto']
-            nombre = producto['nombre']
-            cantidad = item['cantidad']
-            modificaciones = item.get('modificaciones_ingredientes', {})
+        for idx, item in enumerate(items):
+            producto = item.producto
+            nombre = producto.nombre
+            cantidad = item.cantidad
+            modificaciones = item.modificaciones
             
-            # Calcular precio unitario y subtotal considerando ingredientes
-            from utils.productos import calcular_precio_con_ingredientes
-            precio_unitario = calcular_precio_con_ingredientes(producto, modificaciones)
+            # Precio unitario y subtotal considerando ingredientes
+            precio_unitario = precios_unitarios[idx]
             subtotal = precio_unitario * cantidad
             
             # Verificar si tiene modificaciones reales
             tiene_modificaciones = tiene_modificaciones_reales(producto, modificaciones)
             
             # Precio base del producto (sin modificaciones)
-            precio_base = producto.get('precio', 0.0)
+            precio_base = producto.precio
             
             if tiene_modificaciones:
                 # Formato especial para productos editados
@@ -438,21 +442,22 @@ def imprimir_ticket_escpos(pedido_info, tipo_ticket):
                 printer.text(linea_producto + "\n")
                 
                 # Mostrar modificaciones de ingredientes
-                ingredientes = producto.get('ingredientes', [])
-                # Importar función para buscar ingrediente por nombre
-                from utils.ingredientes import buscar_ingrediente_por_nombre
+                ingredientes = producto.ingredientes
+                # Índice de ingredientes por nombre para obtener precios
+                from utils.ingredientes import obtener_ingredientes_por_nombre
+                ingredientes_por_nombre = obtener_ingredientes_por_nombre()
                 
                 if ingredientes and modificaciones:
                     for ingrediente in ingredientes:
-                        nombre_ing = ingrediente.get('nombre', '')
-                        cantidad_base = ingrediente.get('cantidad_base', 1)
+                        nombre_ing = ingrediente.nombre
+                        cantidad_base = ingrediente.cantidad_base
                         cantidad_actual = modificaciones.get(nombre_ing, cantidad_base)
                         
                         # Buscar el ingrediente actualizado desde ingredientes.json para obtener precios
-                        ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                        ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                         if ingrediente_actualizado:
-                            precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
-                            precio_resta = ingrediente_actualizado.get('precio_resta', 0.0)
+                            precio_extra = ingrediente_actualizado['precio_extra']
+                            precio_resta = ingrediente_actualizado['precio_resta']
                         else:
                             # Si el ingrediente no existe, usar 0.0
                             precio_extra = 0.0
@@ -475,13 +480,13 @@ def imprimir_ticket_escpos(pedido_info, tipo_ticket):
                 
                 # Procesar ingredientes adicionales que no están en el producto (siempre, incluso si no hay ingredientes principales)
                 if modificaciones:
-                    ingredientes_producto_dict = {ing.get('nombre', '') for ing in ingredientes}
+                    ingredientes_producto_dict = {ing.nombre for ing in ingredientes}
                     for nombre_ing, cantidad_actual in modificaciones.items():
                         if nombre_ing not in ingredientes_producto_dict and cantidad_actual > 0:
                             # Este es un ingrediente adicional que no está en el producto
-                            ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                            ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                             if ingrediente_actualizado:
-                                precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
+                                precio_extra = ingrediente_actualizado['precio_extra']
                             else:
                                 precio_extra = 0.0
                             
@@ -646,19 +651,24 @@ def guardar_ticket_texto(pedido_info, tipo_ticket):
     
     contenido.append("PEDIDO:")
     
-    for item in pedido_info['items']:
-        producto = item['producto']
-        nombre = producto['nombre']
-        cantidad = item['cantidad']
-        modificaciones = item.get('modificaciones_ingredientes', {})
+    # Precios unitarios de todos los items en un solo lote
+    from utils.precios import calcular_precios_lote
+    # (los items son LineaCarrito compartidas con el carrito; ver utils.registros)
+    items = obtener_lineas(pedido_info['items'])
+    precios_unitarios = calcular_precios_lote(items)['precios_unitarios']
+    
+    for idx, item in enumerate(items):
+        producto = item.producto
+        nombre = producto.nombre
+        cantidad = item.cantidad
+        modificaciones = item.modificaciones
         
-        # Calcular precio unitario y subtotal considerando ingredientes
-        from utils.productos import calcular_precio_con_ingredientes
-        precio_unitario = calcular_precio_con_ingredientes(producto, modificaciones)
+        # Precio unitario y subtotal considerando ingredientes
+        precio_unitario = precios_unitarios[idx]
         subtotal = precio_unitario * cantidad
         
         # Precio base del producto (sin modificaciones)
-        precio_base = producto.get('precio', 0.0)
+        precio_base = producto.precio
         
         # Verificar si tiene modificaciones reales
         tiene_modificaciones = tiene_modificaciones_reales(producto, modificaciones)
@@ -671,21 +681,22 @@ def guardar_ticket_texto(pedido_info, tipo_ticket):
             contenido.append(linea_producto)
             
             # Mostrar modificaciones de ingredientes
-            ingredientes = producto.get('ingredientes', [])
-            # Importar función para buscar ingrediente por nombre
-            from utils.ingredientes import buscar_ingrediente_por_nombre
+            ingredientes = producto.ingredientes
+            # Índice de ingredientes por nombre para obtener precios
+            from utils.ingredientes import obtener_ingredientes_por_nombre
+            ingredientes_por_nombre = obtener_ingredientes_por_nombre()
             
             if ingredientes and modificaciones:
                 for ingrediente in ingredientes:
-                    nombre_ing = ingrediente.get('nombre', '')
-                    cantidad_base = ingrediente.get('cantidad_base', 1)
+                    nombre_ing = ingrediente.nombre
+                    cantidad_base = ingrediente.cantidad_base
                     cantidad_actual = modificaciones.get(nombre_ing, cantidad_base)
                     
                     # Buscar el ingrediente actualizado desde ingredientes.json para obtener precios
-                    ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                    ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                     if ingrediente_actualizado:
-                        precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
-                        precio_resta = ingrediente_actualizado.get('precio_resta', 0.0)
+                        precio_extra = ingrediente_actualizado['precio_extra']
+                        precio_resta = ingrediente_actualizado['precio_resta']
                     else:
                         # Si el ingrediente no existe, usar 0.0
                         precio_extra = 0.0
@@ -708,13 +719,13 @@ def guardar_ticket_texto(pedido_info, tipo_ticket):
             
             # Procesar ingredientes adicionales que no están en el producto (siempre, incluso si no hay ingredientes principales)
             if modificaciones:
-                ingredientes_producto_dict = {ing.get('nombre', '') for ing in ingredientes}
+                ingredientes_producto_dict = {ing.nombre for ing in ingredientes}
                 for nombre_ing, cantidad_actual in modificaciones.items():
                     if nombre_ing not in ingredientes_producto_dict and cantidad_actual > 0:
                         # Este es un ingrediente adicional que no está en el producto
-                        ingrediente_actualizado = buscar_ingrediente_por_nombre(nombre_ing)
+                        ingrediente_actualizado = ingredientes_por_nombre.get(nombre_ing)
                         if ingrediente_actualizado:
-                            precio_extra = ingrediente_actualizado.get('precio_extra', 0.0)
+                            precio_extra = ingrediente_actualizado['precio_extra']
                         else:
                             precio_extra = 0.0
                         
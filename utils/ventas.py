@@ -0,0 +1,208 @@
+"""
+Módulo de ventas recientes por producto (popularidad para ordenar la búsqueda)
+Cada pedido confirmado suma las unidades vendidas de cada producto en el día, en
+data/ventas.json ({"dias": {"2026-10-18": {"12": 3, ...}}}). Solo se guardan los
+últimos DIAS_POPULARIDAD días: los más viejos se descartan al registrar una venta.
+Registrar una venta solo actualiza la memoria: la escritura la hace el persistidor
+diferido de utils.persistencia, sumando las ventas pendientes a lo que haya en disco
+(otra caja puede haber registrado las suyas).
+"""
+import os
+import threading
+from datetime import date, timedelta
+
+from utils import codec_json
+from utils.catalogo import obtener_firma_archivo
+from utils.persistencia import persistidor, bloqueo_archivo
+
+
+# Cantidad de días que se tienen en cuenta para la popularidad
+DIAS_POPULARIDAD = 14
+
+_bloqueo = threading.Lock()
+_bloqueo_escritura = threading.Lock()  # Serializa el thread del persistidor y flush()
+_dias = None  # {"AAAA-MM-DD": {producto_id (str): unidades}}, lo del disco más lo pendiente
+_pendientes = {}  # Ventas registradas que todavía no se escribieron (mismo formato)
+_desde = None  # Primer día que se conserva (según la última venta registrada)
+_firma_archivo = None  # (mtime, tamaño) del archivo leído: otra caja puede haberlo cambiado
+_popularidad = None  # Caché de obtener_popularidad()
+_dia_popularidad = None  # Día con el que se calculó la caché
+
+
+def obtener_ruta_ventas():
+    """Obtiene la ruta del archivo de ventas"""
+    from utils.rutas import obtener_ruta_data
+    return os.path.join(obtener_ruta_data(), 'ventas.json')
+
+
+def _leer(ruta):
+    """Lee los días del archivo de ventas ({} si no existe o no se puede leer)"""
+    try:
+        datos = codec_json.leer_archivo(ruta)
+    except FileNotFoundError:
+        return {}
+    except (OSError, codec_json.ErrorDecodificacion) as e:
+        print(f"Advertencia: No se pudo leer {ruta}: {e}")
+        return {}
+    dias = datos.get("dias", {}) if isinstance(datos, dict) else {}
+    return dias if isinstance(dias, dict) else {}
+
+
+def _sumar(dias, ventas):
+    """Suma ventas ({dia: {producto_id: unidades}}) a dias"""
+    for clave_dia, ventas_dia in ventas.items():
+        destino = dias.get(clave_dia)
+        if not isinstance(destino, dict):
+            destino = dias[clave_dia] = {}
+        for clave, unidades in ventas_dia.items():
+            anterior = destino.get(clave, 0)
+            destino[clave] = (anterior if isinstance(anterior, (int, float)) else 0) + unidades
+
+
+def _restar(ventas, escritas):
+    """Descuenta de ventas las que ya se escribieron (y borra lo que queda en cero)"""
+    for clave_dia, ventas_dia in escritas.items():
+        pendientes_dia = ventas.get(clave_dia, {})
+        for clave, unidades in ventas_dia.items():
+            restantes = pendientes_dia.get(clave, 0) - unidades
+            if restantes > 0:
+                pendientes_dia[clave] = restantes
+            else:
+                pendientes_dia.pop(clave, None)
+        if not pendientes_dia:
+            ventas.pop(clave_dia, None)
+
+
+def _descartar_viejos(dias, desde):
+    """Descarta los días anteriores a desde (si se indicó)"""
+    if desde is not None:
+        for clave in [clave for clave in dias if clave < desde]:
+            del dias[clave]
+
+
+def _cargar():
+    """Lee el archivo de ventas si no se leyó o si cambió en disco (con el bloqueo tomado)"""
+    global _dias, _firma_archivo, _popularidad
+
+    ruta = obtener_ruta_ventas()
+    firma = obtener_firma_archivo(ruta)
+    if _dias is not None and firma == _firma_archivo:
+        return
+
+    dias = _leer(ruta) if firma is not None else {}
+    _sumar(dias, _pendientes)
+    _descartar_viejos(dias, _desde)
+    _dias = dias
+    _firma_archivo = firma
+    _popularidad = None
+
+
+class _EscrituraVentas:
+    """Escritura de las ventas pendientes, programada en el persistidor diferido"""
+
+    def obtener_ruta(self):
+        return obtener_ruta_ventas()
+
+    def escribir_pendiente(self):
+        """Suma las ventas pendientes al archivo de ventas (si hay)"""
+        global _dias, _firma_archivo, _popularidad
+
+        with _bloqueo_escritura:
+            with _bloqueo:
+                if not _pendientes:
+                    return
+                ventas = {clave_dia: dict(ventas_dia) for clave_dia, ventas_dia in _pendientes.items()}
+                desde = _desde
+
+            # Leer y escribir fuera de _bloqueo: la interfaz puede seguir registrando ventas
+            ruta = obtener_ruta_ventas()
+            with bloqueo_archivo(ruta):
+                dias = _leer(ruta)
+                _sumar(dias, ventas)
+                _descartar_viejos(dias, desde)
+                codec_json.escribir_archivo(ruta, {"dias": dias}, codec_json.MODO_COMPACTO)
+                firma = obtener_firma_archivo(ruta)
+
+            with _bloqueo:
+                _restar(_pendientes, ventas)
+                _sumar(dias, _pendientes)  # Ventas registradas mientras se escribía
+                _dias = dias
+                _firma_archivo = firma
+                _popularidad = None
+
+
+_escritura = _EscrituraVentas()
+
+
+def registrar_venta(items, dia=None):
+    """
+    Suma las unidades vendidas de un pedido confirmado
+    Solo actualiza la memoria; el archivo se escribe en el thread del persistidor
+
+    Args:
+        items: Líneas del pedido (LineaCarrito o dicts con el formato JSON)
+        dia: Fecha de la venta (por defecto hoy)
+    """
+    global _desde, _popularidad
+
+    # Importar aquí para evitar importación circular
+    from utils.registros import obtener_lineas
+
+    dia = dia or date.today()
+    clave_dia = dia.isoformat()
+
+    ventas_dia = {}
+    for linea in obtener_lineas(items):
+        producto_id = linea.producto.id
+        if producto_id < 0:
+            continue  # Productos personalizados: no están en el catálogo
+        clave = str(producto_id)
+        ventas_dia[clave] = ventas_dia.get(clave, 0) + linea.cantidad
+    if not ventas_dia:
+        return
+
+    with _bloqueo:
+        _cargar()
+        _sumar(_pendientes, {clave_dia: ventas_dia})
+        _sumar(_dias, {clave_dia: ventas_dia})
+
+        # Descartar los días que quedaron fuera del período
+        _desde = (dia - timedelta(days=DIAS_POPULARIDAD - 1)).isoformat()
+        _descartar_viejos(_dias, _desde)
+        _popularidad = None
+
+    persistidor.programar(_escritura)
+
+
+def obtener_popularidad(dia=None):
+    """
+    Unidades vendidas de cada producto en los últimos DIAS_POPULARIDAD días
+
+    Returns:
+        dict: {producto_id: unidades} (solo los productos con ventas; no modificar)
+    """
+    global _popularidad, _dia_popularidad
+
+    dia = dia or date.today()
+    with _bloqueo:
+        _cargar()
+        if _popularidad is not None and _dia_popularidad == dia:
+            return _popularidad
+
+        desde = (dia - timedelta(days=DIAS_POPULARIDAD - 1)).isoformat()
+        hasta = dia.isoformat()
+        popularidad = {}
+        for clave_dia, ventas_dia in _dias.items():
+            if not desde <= clave_dia <= hasta or not isinstance(ventas_dia, dict):
+                continue
+            for clave, unidades in ventas_dia.items():
+                try:
+                    producto_id = int(clave)
+                except ValueError:
+                    continue
+                if isinstance(unidades, (int, float)) and unidades > 0:
+                    popularidad[producto_id] = popularidad.get(producto_id, 0) + unidades
+
+        _popularidad = popularidad
+        _dia_popularidad = dia
+        return popularidad
@@ -0,0 +1,238 @@
+"""
+Módulo que vigila la carpeta de datos para detectar cambios hechos por otra caja
+Cuando dos cajas usan la misma carpeta data (carpeta de red o sincronizada), los cambios
+que hace la administración en una no se veían en la otra hasta reiniciarla.
+
+Un thread en segundo plano revisa la carpeta y, si productos, ingredientes o config.json
+cambiaron en disco, los vuelve a leer fuera del thread de la interfaz. La relectura
+notifica una RECARGA por los eventos del catálogo (utils.catalogo), igual que cualquier
+otro cambio: la interfaz marca el cambio y lo aplica desde su propio thread.
+
+En Linux se usa inotify para enterarse enseguida de los cambios locales. Solo despiertan
+al vigilante los archivos del catálogo y la configuración: los temporales, snapshots,
+bloqueos, ventas o tickets que escribe la propia aplicación no provocan una revisión.
+Además, en todos los sistemas se revisan las firmas (fecha y tamaño) cada INTERVALO_SONDEO
+segundos: en una carpeta de red inotify no ve lo que escribe otra máquina.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _libc.inotify_init1  # Solo existe en Linux
+    INOTIFY_AVAILABLE = sys.platform.startswith("linux")
+except (OSError, AttributeError):
+    INOTIFY_AVAILABLE = False
+
+
+# Tiempo (en segundos) entre dos revisiones de los archivos en disco
+INTERVALO_SONDEO = 2.0
+
+# Tiempo (en segundos) que se espera después de un aviso de inotify para agrupar
+# los avisos de una misma escritura (temporal, renombrado, diario...)
+ESPERA_AGRUPAMIENTO = 0.2
+
+# Constantes de inotify (sys/inotify.h)
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASCARA = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+# Encabezado de cada evento (struct inotify_event: wd, mask, cookie, len), seguido del nombre
+_ENCABEZADO_EVENTO = struct.Struct("iIII")
+
+
+def _archivos_vigilados():
+    """Nombres de los archivos de la carpeta de datos que pueden cambiar el catálogo o la configuración"""
+    from utils import catalogo
+    from utils.catalogo_sqlite import obtener_ruta_base_datos
+    from utils.diario_catalogo import EXTENSION_DIARIO
+
+    nombres = {"config.json"}
+    for repositorio in list(catalogo._repositorios):
+        nombre = os.path.basename(repositorio.obtener_ruta())
+        nombres.update((nombre, nombre + EXTENSION_DIARIO))
+    base_datos = os.path.basename(obtener_ruta_base_datos())
+    nombres.update((base_datos, base_datos + "-wal"))
+    return nombres
+
+
+class VigilanteDatos:
+    """
+    Thread que detecta cambios externos en la carpeta de datos y relee el catálogo
+
+    Solo relee lo que la aplicación ya había leído y no tiene cambios propios
+    pendientes de guardar (ver RepositorioJSON.verificar_cambios).
+    """
+
+    def __init__(self, intervalo=INTERVALO_SONDEO):
+        self.intervalo = intervalo
+        self.revisiones = 0
+        self.recargas = 0
+        self._detener = threading.Event()
+        self._hilo = None
+        self._inotify = None
+        self._carpeta_particiones = None  # Descriptor de vigilancia de la carpeta de particiones
+        self._firma_config = None
+
+    def iniciar(self):
+        """Inicia el thread (si ya está corriendo no hace nada)"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._firma_config = self._obtener_firma_config()
+        self._inotify = self._abrir_inotify() if INOTIFY_AVAILABLE else None
+        self._hilo = threading.Thread(target=self._ejecutar, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el thread (termina a más tardar en INTERVALO_SONDEO segundos)"""
+        self._detener.set()
+
+    def _abrir_inotify(self):
+        """Crea el descriptor de inotify sobre la carpeta de datos (None si no se puede)"""
+        from utils.rutas import obtener_ruta_data
+        from utils.catalogo_particionado import obtener_ruta_carpeta
+
+        descriptor = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if descriptor < 0:
+            return None
+        carpeta = obtener_ruta_data()
+        if os.path.isdir(carpeta):
+            _libc.inotify_add_watch(descriptor, os.fsencode(carpeta), _MASCARA)
+        carpeta = obtener_ruta_carpeta()
+        if os.path.isdir(carpeta):
+            self._carpeta_particiones = _libc.inotify_add_watch(descriptor, os.fsencode(carpeta), _MASCARA)
+        return descriptor
+
+    def _leer_eventos(self):
+        """Lee los avisos pendientes de inotify: lista de (descriptor de vigilancia, nombre)"""
+        eventos = []
+        try:
+            while True:
+                datos = os.read(self._inotify, 65536)
+                if not datos:
+                    break
+                posicion = 0
+                while posicion + _ENCABEZADO_EVENTO.size <= len(datos):
+                    vigilancia, _, _, largo = _ENCABEZADO_EVENTO.unpack_from(datos, posicion)
+                    posicion += _ENCABEZADO_EVENTO.size
+                    nombre = datos[posicion:posicion + largo].rstrip(b"\0")
+                    posicion += largo
+                    eventos.append((vigilancia, os.fsdecode(nombre)))
+        except BlockingIOError:
+            pass
+        return eventos
+
+    def _afectan_al_catalogo(self, eventos):
+        """Indica si algún aviso es de un archivo del catálogo o de la configuración"""
+        vigilados = None
+        for vigilancia, nombre in eventos:
+            if vigilancia == self._carpeta_particiones:
+                # Manifiesto y archivos de categoría (no los temporales)
+                if nombre.endswith(".json"):
+                    return True
+                continue
+            if vigilados is None:
+                vigilados = _archivos_vigilados()
+            if nombre in vigilados:
+                return True
+        return False
+
+    def _esperar_aviso(self):
+        """
+        Espera un aviso de inotify o a que pase el intervalo de sondeo
+
+        Returns:
+            bool: True si llegó un aviso de inotify
+        """
+        if self._inotify is None:
+            self._detener.wait(self.intervalo)
+            return False
+
+        limite = time.monotonic() + self.intervalo
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0 or self._detener.is_set():
+                return False
+            listos, _, _ = select.select([self._inotify], [], [], restante)
+            if not listos:
+                return False
+            # Los avisos de otros archivos (temporales, snapshots, ventas...) no despiertan
+            if self._afectan_al_catalogo(self._leer_eventos()):
+                break
+        # Agrupar los avisos de la misma escritura y descartarlos (se revisa todo igual)
+        self._detener.wait(ESPERA_AGRUPAMIENTO)
+        self._leer_eventos()
+        return True
+
+    def _obtener_firma_config(self):
+        from utils.catalogo import obtener_firma_archivo
+        from utils.rutas import obtener_ruta_data
+        return obtener_firma_archivo(os.path.join(obtener_ruta_data(), 'config.json'))
+
+    def revisar(self):
+        """
+        Relee los catálogos y la configuración que cambiaron en disco
+
+        Returns:
+            int: Cantidad de catálogos releídos
+        """
+        from utils import catalogo, codec_json
+
+        recargados = 0
+        for repositorio in list(catalogo._repositorios):
+            try:
+                if repositorio.verificar_cambios():
+                    recargados += 1
+            except Exception as e:
+                print(f"Error al releer {repositorio.obtener_ruta()}: {e}")
+
+        firma_config = self._obtener_firma_config()
+        if firma_config != self._firma_config:
+            self._firma_config = firma_config
+            # config.json se lee en cada uso; solo el modo de los JSON queda en memoria
+            codec_json.recargar_modo()
+
+        self.revisiones += 1
+        self.recargas += recargados
+        return recargados
+
+    def _ejecutar(self):
+        """Loop del thread de vigilancia"""
+        try:
+            while not self._detener.is_set():
+                self._esperar_aviso()
+                if self._detener.is_set():
+                    break
+                self.revisar()
+        finally:
+            if self._inotify is not None:
+                os.close(self._inotify)
+                self._inotify = None
+
+
+# Vigilante compartido por todo el proceso
+vigilante = VigilanteDatos()
+
+
+def iniciar():
+    """Empieza a vigilar la carpeta de datos en segundo plano"""
+    vigilante.iniciar()
+
+
+def detener():
+    """Deja de vigilar la carpeta de datos"""
+    vigilante.detener()